@@ -1,5 +1,6 @@
 import { defineStore } from 'pinia';
 import { ref, computed } from 'vue';
+import { useAuthStore } from './auth';
 
 export interface DiscoverItem {
   id: number;
@@ -10,10 +11,13 @@ export interface DiscoverItem {
   example_sentences?: string[];
   created_at?: string;
   story_title?: string;
+  story_snippet?: string;
   story_content?: string;
   story_theme?: string;
   target_age_range?: string;
   image_url?: string;
+  thumbnail_url?: string; // Small WebP rendition for grids
+  medium_url?: string;
   translation?: string;
   explanation?: string;
   user?: {
@@ -58,6 +62,10 @@ export const useDiscoverStore = defineStore('discover', () => {
   
   const stats = ref<DiscoverStats | null>(null);
   const trendingItems = ref<DiscoverItem[]>([]);
+  // Stories whose view was already recorded this session
+  const viewedStoryIds = new Set<number>();
+
+  const authStore = useAuthStore();
 
   const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000';
 
@@ -178,6 +186,47 @@ export const useDiscoverStore = defineStore('discover', () => {
     }
   };
 
+  // Count a view of a story; signed-in viewers send their token so they
+  // are counted once as unique viewers
+  const recordStoryView = async (storyId: number) => {
+    if (viewedStoryIds.has(storyId)) return;
+    viewedStoryIds.add(storyId);
+
+    try {
+      const headers: Record<string, string> = {};
+      if (authStore.isAuthenticated) {
+        headers['Authorization'] = `Bearer ${await authStore.getIdToken()}`;
+      }
+      await fetch(`${API_BASE}/api/discover/stories/${storyId}/view`, {
+        method: 'POST',
+        headers
+      });
+    } catch (err: any) {
+      console.error('Failed to record story view:', err);
+    }
+  };
+
+  // Open a story from the feed: load its full text (feed items only carry
+  // story_snippet) and record the view
+  const openStory = async (item: DiscoverItem) => {
+    if (item.content_type !== 'story') return;
+    recordStoryView(item.id);
+    if (item.story_content) return;
+
+    try {
+      const response = await fetch(`${API_BASE}/api/discover/stories/${item.id}`);
+
+      if (!response.ok) {
+        throw new Error('Failed to fetch story');
+      }
+
+      const story = await response.json();
+      item.story_content = story.story_content;
+    } catch (err: any) {
+      console.error('Failed to load story:', err);
+    }
+  };
+
   // Computed properties for filtered content
   const filteredItems = computed(() => {
     return items.value;
@@ -230,6 +279,7 @@ export const useDiscoverStore = defineStore('discover', () => {
     clearFilters,
     fetchTrending,
     fetchStats,
+    openStory,
     initialize,
     
     // Computed
@@ -9,11 +9,14 @@ export interface Image {
   translated_word: string
   target_language: string
   image_url?: string
-  generation_prompt: string
+  thumbnail_url?: string // Small WebP rendition for grids
+  medium_url?: string
+  generation_prompt?: string // Not included in list responses
   custom_instructions?: string
   status: 'pending' | 'completed' | 'failed'
   child_age?: number
   title?: string
+  trace_id?: string // Generation trace id, for matching server logs and metrics
   created_at: string
   updated_at: string
 }
@@ -25,6 +28,7 @@ export interface ImageGenerationRequest {
   custom_instructions?: string
   child_age?: number
   title?: string
+  number_of_images?: number // Variants generated in one call, each stored as its own image
 }
 
 export const useImageStore = defineStore('images', () => {
@@ -37,6 +41,12 @@ export const useImageStore = defineStore('images', () => {
 
   const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000'
 
+  // Event stream reconnects before polling, and how long to poll for
+  const WATCH_ATTEMPTS = 5
+  const POLL_ATTEMPTS = 30
+  const POLL_INTERVAL_MS = 10000
+  const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
   // Computed properties
   const pendingImages = computed(() => 
     images.value.filter(img => img.status === 'pending')
@@ -83,6 +93,36 @@ export const useImageStore = defineStore('images', () => {
     }
   }
 
+  // Add rows for images returned by a generate call and watch the pending ones
+  const addGeneratedImages = (
+    request: ImageGenerationRequest,
+    ids: number[],
+    data: { status?: Image['status']; image_url?: string; thumbnail_url?: string }
+  ) => {
+    for (const id of [...ids].reverse()) {
+      const newImage: Image = {
+        id,
+        user_id: authStore.user!.uid,
+        original_word: request.original_word,
+        translated_word: request.translated_word,
+        target_language: request.target_language,
+        generation_prompt: '',
+        custom_instructions: request.custom_instructions,
+        image_url: data.image_url,
+        thumbnail_url: data.thumbnail_url,
+        status: data.status || 'pending', // 'completed' when an existing image was reused
+        child_age: request.child_age,
+        title: request.title,
+        created_at: new Date().toISOString(),
+        updated_at: new Date().toISOString()
+      }
+      images.value.unshift(newImage)
+      if (newImage.status === 'pending') {
+        watchImage(newImage.id)
+      }
+    }
+  }
+
   // Generate a new image
   const generateImage = async (request: ImageGenerationRequest) => {
     if (!authStore.isAuthenticated) {
@@ -114,24 +154,7 @@ export const useImageStore = defineStore('images', () => {
       }
 
       const data = await response.json()
-      
-      // Add the new image to the list
-      const newImage: Image = {
-        id: data.id,
-        user_id: authStore.user!.uid,
-        original_word: request.original_word,
-        translated_word: request.translated_word,
-        target_language: request.target_language,
-        generation_prompt: '',
-        custom_instructions: request.custom_instructions,
-        status: 'pending',
-        child_age: request.child_age,
-        title: request.title,
-        created_at: new Date().toISOString(),
-        updated_at: new Date().toISOString()
-      }
-      
-      images.value.unshift(newImage)
+      addGeneratedImages(request, data.ids || [data.id], data)
       
       return data
     } catch (err) {
@@ -143,6 +166,50 @@ export const useImageStore = defineStore('images', () => {
     }
   }
 
+  // Generate images for several words at once; quota is reserved for the whole batch
+  const generateImageBatch = async (requests: ImageGenerationRequest[]) => {
+    if (!authStore.isAuthenticated) {
+      error.value = 'User not authenticated'
+      return null
+    }
+
+    generating.value = true
+    error.value = null
+
+    try {
+      const token = await authStore.getIdToken()
+      const response = await fetch(`${API_BASE}/api/images/generate/batch`, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ requests })
+      })
+
+      if (!response.ok) {
+        if (response.status === 429) {
+          const errorData = await response.json().catch(() => ({}))
+          throw new Error(errorData.detail || 'Daily image generation limit reached. Please try again tomorrow.')
+        }
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+
+      const data = await response.json()
+      for (const result of data.images) {
+        addGeneratedImages(requests[result.index], result.ids, result)
+      }
+
+      return data
+    } catch (err) {
+      error.value = err instanceof Error ? err.message : 'Failed to generate images'
+      console.error('Error generating images:', err)
+      return null
+    } finally {
+      generating.value = false
+    }
+  }
+
   // Update image metadata
   const updateImage = async (imageId: number, updates: { title?: string; custom_instructions?: string }) => {
     if (!authStore.isAuthenticated) {
@@ -213,6 +280,60 @@ export const useImageStore = defineStore('images', () => {
     }
   }
 
+  // Wait for a pending image to finish via server-sent events, then update it in place.
+  // The server holds the request until the image completes, or sends `timeout` to reconnect.
+  // If the stream keeps failing or ending without a status, fall back to polling.
+  const watchImage = async (imageId: number) => {
+    for (let attempt = 0; attempt < WATCH_ATTEMPTS; attempt++) {
+      try {
+        const token = await authStore.getIdToken()
+        const response = await fetch(`${API_BASE}/api/images/${imageId}/events`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        })
+        if (!response.ok || !response.body) {
+          throw new Error(`HTTP error! status: ${response.status}`)
+        }
+
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+        while (true) {
+          const { done, value } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true })
+          const events = buffer.split('\n\n')
+          buffer = events.pop() || ''
+          for (const event of events) {
+            const name = event.match(/^event: (.*)$/m)?.[1]
+            const data = event.match(/^data: (.*)$/m)?.[1]
+            if (name === 'status' && data) {
+              const update = JSON.parse(data)
+              const index = images.value.findIndex(img => img.id === imageId)
+              if (index !== -1) {
+                images.value[index] = { ...images.value[index], ...update }
+              }
+              return
+            }
+          }
+        }
+      } catch (err) {
+        console.error('Error watching image status:', err)
+        await sleep(POLL_INTERVAL_MS)
+      }
+    }
+    await pollImage(imageId)
+  }
+
+  // Reload the image list until the image is no longer pending
+  const pollImage = async (imageId: number) => {
+    for (let poll = 0; poll < POLL_ATTEMPTS; poll++) {
+      await refreshImages()
+      const image = images.value.find(img => img.id === imageId)
+      if (!image || image.status !== 'pending') return
+      await sleep(POLL_INTERVAL_MS)
+    }
+  }
+
   // Refresh images (useful for checking generation status)
   const refreshImages = async () => {
     await loadImages()
@@ -238,8 +359,10 @@ export const useImageStore = defineStore('images', () => {
     // Actions
     loadImages,
     generateImage,
+    generateImageBatch,
     updateImage,
     deleteImage,
+    watchImage,
     refreshImages,
     clearError
   }
@@ -6,7 +6,8 @@ interface Story {
   id: number;
   original_words: string[];
   story_title: string;
-  story_content: string;
+  story_snippet?: string;
+  story_content?: string; // Not included in list responses; see loadStoryContent
   story_theme?: string;
   story_length?: string;
   target_age_range?: string;
@@ -153,6 +154,29 @@ export const useStoriesStore = defineStore('stories', () => {
     }
   };
 
+  // Load the full text of a listed story (lists only carry story_snippet)
+  const loadStoryContent = async (storyId: number) => {
+    const story = stories.value.find(s => s.id === storyId);
+    if (!story || story.story_content !== undefined) return;
+
+    try {
+      const token = await authStore.getIdToken();
+      const response = await fetch(`${API_BASE}/api/stories/${storyId}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json'
+        }
+      });
+
+      if (!response.ok) throw new Error('Failed to fetch story');
+
+      const fullStory = await response.json();
+      story.story_content = fullStory.story_content;
+    } catch (err: any) {
+      console.error('Error loading story content:', err);
+    }
+  };
+
   // Clear stories (useful for logout)
   const clearStories = () => {
     stories.value = [];
@@ -176,6 +200,7 @@ export const useStoriesStore = defineStore('stories', () => {
     createStory,
     deleteStory,
     getStory,
+    loadStoryContent,
     clearStories,
     storiesByLanguage,
     storiesByTheme
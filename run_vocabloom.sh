@@ -156,11 +156,7 @@ else:
 EOF
     fi
     
-    # Create and run migration if needed
-    if [ ! -f "alembic/versions/initial_migration.py" ]; then
-        poetry run alembic revision --autogenerate -m "Initial migration"
-    fi
-    
+    # Create missing tables and apply the committed revisions
     poetry run alembic upgrade head
     cd ..
     echo "✅ Database migrations complete"
@@ -2,6 +2,7 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
 
@@ -10,13 +11,17 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import Base
+from app.database import Base, DATABASE_URL
 from app.models import User, Flashcard, Translation
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# Migrate the database the app is configured for (DB_* env vars and the
+# database-password secret) rather than the URL in alembic.ini
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -31,6 +36,10 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Every instance runs "alembic upgrade head" before it starts serving (see the
+# Dockerfile); this session lock lets only one of them migrate at a time
+MIGRATION_LOCK_ID = 7_261_004
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -70,6 +79,12 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        # The revisions alter existing tables, so a new database gets the
+        # current tables first (the revisions skip what already exists)
+        target_metadata.create_all(bind=connection)
+        connection.commit()
+
         context.configure(
             connection=connection, target_metadata=target_metadata
         )
@@ -0,0 +1,40 @@
+"""story full-text search vector
+
+Revision ID: 0001_story_fts
+Revises:
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.fts import STORY_SEARCH_VECTOR_SQL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_story_fts'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Adding a stored generated column rewrites the stories table once
+    op.execute(
+        "ALTER TABLE stories ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({STORY_SEARCH_VECTOR_SQL}) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stories_search_vector "
+            "ON stories USING gin (search_vector)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_stories_search_vector")
+    op.execute("ALTER TABLE stories DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,44 @@
+"""pg_trgm indexes on word columns
+
+Revision ID: 0002_word_trgm
+Revises: 0001_story_fts
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_word_trgm'
+down_revision: Union[str, Sequence[str], None] = '0001_story_fts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_INDEXES = [
+    ("ix_flashcards_original_word_trgm", "flashcards", "original_word"),
+    ("ix_flashcards_translated_word_trgm", "flashcards", "translated_word"),
+    ("ix_images_original_word_trgm", "images", "original_word"),
+    ("ix_images_translated_word_trgm", "images", "translated_word"),
+    ("ix_translations_original_term_trgm", "translations", "original_term"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for index_name, table, column in TRIGRAM_INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The pg_trgm extension is left installed
+    with op.get_context().autocommit_block():
+        for index_name, _, _ in TRIGRAM_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
@@ -0,0 +1,32 @@
+"""Generated story_snippet column for list views
+
+Revision ID: 0003_story_snippet
+Revises: 0002_word_trgm
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.projections import STORY_SNIPPET_SQL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_story_snippet'
+down_revision: Union[str, Sequence[str], None] = '0002_word_trgm'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "ALTER TABLE stories ADD COLUMN IF NOT EXISTS story_snippet text "
+        f"GENERATED ALWAYS AS ({STORY_SNIPPET_SQL}) STORED"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('stories', 'story_snippet')
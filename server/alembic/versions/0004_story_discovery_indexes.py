@@ -0,0 +1,36 @@
+"""Composite indexes for filtered story discovery
+
+Revision ID: 0004_story_discovery
+Revises: 0003_story_snippet
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_story_discovery'
+down_revision: Union[str, Sequence[str], None] = '0003_story_snippet'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STORY_DISCOVERY_INDEXES = [
+    ("ix_stories_language_age_created", "stories", "target_language, target_age_range, created_at"),
+    ("ix_stories_story_theme", "stories", "story_theme"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name, table, columns in STORY_DISCOVERY_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {table} ({columns})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name, _, _ in STORY_DISCOVERY_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
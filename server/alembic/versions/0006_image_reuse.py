@@ -0,0 +1,33 @@
+"""Image reuse cache key and blob-sharing indexes
+
+Revision ID: 0006_image_reuse
+Revises: 0005_image_jobs
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_image_reuse'
+down_revision: Union[str, Sequence[str], None] = '0005_image_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS cache_key VARCHAR(64)")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_cache_key ON images (cache_key)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_image_url ON images (image_url)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_images_image_url")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_images_cache_key")
+    op.drop_column('images', 'cache_key')
@@ -0,0 +1,31 @@
+"""Image thumbnail and medium renditions
+
+Revision ID: 0007_image_renditions
+Revises: 0006_image_reuse
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_image_renditions'
+down_revision: Union[str, Sequence[str], None] = '0006_image_reuse'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS thumbnail_url VARCHAR(500)")
+    op.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS medium_url VARCHAR(500)")
+    op.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS renditions JSONB")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('images', 'renditions')
+    op.drop_column('images', 'medium_url')
+    op.drop_column('images', 'thumbnail_url')
@@ -0,0 +1,31 @@
+"""Image perceptual hash for sharing near-duplicate blobs
+
+Revision ID: 0008_image_phash
+Revises: 0007_image_renditions
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008_image_phash'
+down_revision: Union[str, Sequence[str], None] = '0007_image_renditions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS phash BIGINT")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_phash ON images (phash)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_images_phash")
+    op.drop_column('images', 'phash')
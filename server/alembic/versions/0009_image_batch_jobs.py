@@ -0,0 +1,27 @@
+"""Image jobs that fill several images from one Imagen call
+
+Revision ID: 0009_image_batch_jobs
+Revises: 0008_image_phash
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_image_batch_jobs'
+down_revision: Union[str, Sequence[str], None] = '0008_image_phash'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE image_jobs ADD COLUMN IF NOT EXISTS image_ids JSONB")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('image_jobs', 'image_ids')
@@ -0,0 +1,33 @@
+"""Generation trace id on images and image jobs
+
+Revision ID: 0010_image_trace_id
+Revises: 0009_image_batch_jobs
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010_image_trace_id'
+down_revision: Union[str, Sequence[str], None] = '0009_image_batch_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS trace_id VARCHAR(64)")
+    op.execute("ALTER TABLE image_jobs ADD COLUMN IF NOT EXISTS trace_id VARCHAR(64)")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_trace_id ON images (trace_id)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_images_trace_id")
+    op.drop_column('image_jobs', 'trace_id')
+    op.drop_column('images', 'trace_id')
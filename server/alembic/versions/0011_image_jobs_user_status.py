@@ -0,0 +1,32 @@
+"""Index for finding a user's unfinished image jobs
+
+Revision ID: 0011_image_jobs_user_status
+Revises: 0010_image_trace_id
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011_image_jobs_user_status'
+down_revision: Union[str, Sequence[str], None] = '0010_image_trace_id'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_image_jobs_user_id_status "
+            "ON image_jobs (user_id, status)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_image_jobs_user_id_status")
@@ -5,6 +5,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from .database import get_db
 from .models import User
+from .secrets import get_firebase_admin_key
 import os
 from dotenv import load_dotenv
 
@@ -31,14 +32,9 @@ def initialize_firebase():
             return
         
         # For production, use Secret Manager for Firebase credentials
-        from google.cloud import secretmanager
         import json
-        client = secretmanager.SecretManagerServiceClient()
-        project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "vocabloom-467020")
-        name = f"projects/{project_id}/secrets/firebase-admin-key/versions/latest"
-        response = client.access_secret_version(request={"name": name})
         # Parse the JSON string into a dictionary
-        service_account_info = json.loads(response.payload.data.decode("UTF-8"))
+        service_account_info = json.loads(get_firebase_admin_key())
         cred = credentials.Certificate(service_account_info)
         firebase_admin.initialize_app(cred)
     except Exception as e:
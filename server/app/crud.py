@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from . import models, schemas
-from typing import List, Optional
+from .projections import load_fields
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -163,13 +165,37 @@ def update_translation_bookmark(db: Session, translation_id: int, user_id: str,
 
 
 # Story CRUD operations
-def get_stories(db: Session, skip: int = 0, limit: int = 100, user_id: Optional[str] = None):
+def get_stories(db: Session, skip: int = 0, limit: int = 100, user_id: Optional[str] = None, fields: Optional[List[str]] = None):
     query = db.query(models.Story)
+    if fields:
+        query = query.options(load_fields(models.Story, fields))
     if user_id:
         query = query.filter(models.Story.user_id == user_id)
     return query.order_by(models.Story.created_at.desc()).offset(skip).limit(limit).all()
 
 
+def discover_stories(
+    db: Session,
+    theme: Optional[str] = None,
+    age_range: Optional[str] = None,
+    language: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    fields: Optional[List[str]] = None
+):
+    """Newest stories matching every given filter"""
+    query = db.query(models.Story)
+    if fields:
+        query = query.options(load_fields(models.Story, fields))
+    if language:
+        query = query.filter(models.Story.target_language == language)
+    if age_range:
+        query = query.filter(models.Story.target_age_range == age_range)
+    if theme:
+        query = query.filter(models.Story.story_theme == theme)
+    return query.order_by(models.Story.created_at.desc()).offset(skip).limit(limit).all()
+
+
 def get_story(db: Session, story_id: int, user_id: Optional[str] = None):
     query = db.query(models.Story).filter(models.Story.id == story_id)
     if user_id:
@@ -208,18 +234,26 @@ def delete_story(db: Session, story_id: int, user_id: Optional[str] = None):
     return False
 
 
-def increment_story_view_count(db: Session, story_id: int):
-    story = db.query(models.Story).filter(models.Story.id == story_id).first()
-    if story:
-        story.view_count += 1
-        db.commit()
-        db.refresh(story)
-    return story
+def increment_story_view_count(db: Session, story_id: int, amount: int = 1):
+    """
+    Add views directly in the database with a single atomic UPDATE.
+
+    Views are normally counted through view_counter, which batches them;
+    this is the write-through path used when Redis is unavailable.
+    """
+    db.query(models.Story).filter(models.Story.id == story_id).update(
+        {models.Story.view_count: func.coalesce(models.Story.view_count, 0) + amount},
+        synchronize_session=False
+    )
+    db.commit()
 
 
 # Image CRUD operations
-def get_images(db: Session, user_id: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Image).filter(
+def get_images(db: Session, user_id: str, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = None):
+    query = db.query(models.Image)
+    if fields:
+        query = query.options(load_fields(models.Image, fields))
+    return query.filter(
         models.Image.user_id == user_id
     ).order_by(models.Image.created_at.desc()).offset(skip).limit(limit).all()
 
@@ -231,11 +265,20 @@ def get_image(db: Session, image_id: int, user_id: str):
     ).first()
 
 
-def create_image(db: Session, image: schemas.ImageCreate, user_id: str):
+def create_image(db: Session, image: schemas.ImageCreate, user_id: str, cache_key: Optional[str] = None, **generated):
+    """
+    Create an image row. Reused images (see image_cache.py) are created
+    already completed, with the status, URLs and renditions passed as
+    keyword arguments.
+    """
     db_image = models.Image(
         **image.dict(),
-        user_id=user_id
+        user_id=user_id,
+        cache_key=cache_key
     )
+    for field, value in generated.items():
+        if value is not None:
+            setattr(db_image, field, value)
     db.add(db_image)
     db.commit()
     db.refresh(db_image)
@@ -256,8 +299,13 @@ def update_image(db: Session, image_id: int, image: schemas.ImageUpdate, user_id
     return db_image
 
 
-def update_image_status(db: Session, image_id: int, status: str, image_url: Optional[str] = None, title: Optional[str] = None):
-    """Update image status and optionally set the image URL and title when generation is complete"""
+def update_image_status(db: Session, image_id: int, status: str, image_url: Optional[str] = None, title: Optional[str] = None,
+                        renditions: Optional[Dict[str, Dict[str, Any]]] = None, phash: Optional[int] = None):
+    """
+    Update image status and optionally set the image URL, title, resized
+    renditions and perceptual hash (see image_derivatives.py) when
+    generation is complete
+    """
     image = db.query(models.Image).filter(models.Image.id == image_id).first()
     if image:
         image.status = status
@@ -265,6 +313,12 @@ def update_image_status(db: Session, image_id: int, status: str, image_url: Opti
             image.image_url = image_url
         if title:
             image.title = title
+        if renditions:
+            image.renditions = renditions
+            image.thumbnail_url = renditions.get("thumbnail", {}).get("webp")
+            image.medium_url = renditions.get("medium", {}).get("webp")
+        if phash is not None:
+            image.phash = phash
         image.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(image)
@@ -275,17 +329,41 @@ def delete_image(db: Session, image_id: int, user_id: str) -> bool:
     """Delete an image and its file from Google Cloud Storage"""
     image = db.query(models.Image).filter(models.Image.id == image_id, models.Image.user_id == user_id).first()
     if image:
-        # Delete from Google Cloud Storage if URL exists
-        if image.image_url:
-            try:
-                from app.storage import storage_manager
-                # Extract filename from URL
-                filename = image.image_url.split('/')[-1]
-                storage_manager.delete_image(filename)
-            except Exception as e:
-                print(f"Error deleting image from GCS: {e}")
-                # Continue with database deletion even if GCS deletion fails
-        
+        # Delete from Google Cloud Storage if URL exists and no other image
+        # (e.g. a reused one, see image_cache.py) still points at the blob
+        shared = image.image_url and db.query(models.Image.id).filter(
+            models.Image.image_url == image.image_url,
+            models.Image.id != image.id
+        ).first() is not None
+        if image.image_url and not shared:
+            from app.storage import storage_manager
+            # The original and every resized rendition
+            urls = [image.image_url] + [
+                url
+                for rendition in (image.renditions or {}).values()
+                for key, url in rendition.items()
+                if key not in ("width", "height")
+            ]
+            for url in urls:
+                try:
+                    # Extract filename from URL
+                    filename = url.split('/')[-1]
+                    storage_manager.delete_image(filename)
+                except Exception as e:
+                    print(f"Error deleting image from GCS: {e}")
+                    # Continue with database deletion even if GCS deletion fails
+
+        # A job filling several images (see image_queue.py) hangs off its first
+        # image with ON DELETE CASCADE; hand it to a remaining sibling so the
+        # others are still generated
+        jobs = db.query(models.ImageJob).filter(models.ImageJob.image_id == image.id).all()
+        for job in jobs:
+            siblings = [sibling_id for sibling_id in (job.image_ids or []) if sibling_id != image.id]
+            if siblings:
+                job.image_id = siblings[0]
+                job.image_ids = siblings
+        db.flush()
+
         db.delete(image)
         db.commit()
         return True
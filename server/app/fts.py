@@ -0,0 +1,73 @@
+"""
+Postgres full-text search configuration.
+
+Kept free of model imports so models.py can build its generated tsvector
+columns from it. The query side lives in search.py.
+"""
+from typing import Dict, List
+
+# Target language (lowercased) -> Postgres text search configuration.
+# Languages without a built-in stemmer (Chinese, Japanese, Korean, ...) use
+# 'simple', which indexes whitespace/punctuation separated tokens as-is.
+TS_CONFIGS: Dict[str, str] = {
+    "english": "english",
+    "spanish": "spanish",
+    "french": "french",
+    "german": "german",
+    "italian": "italian",
+    "portuguese": "portuguese",
+    "dutch": "dutch",
+    "swedish": "swedish",
+    "norwegian": "norwegian",
+    "danish": "danish",
+    "finnish": "finnish",
+    "russian": "russian",
+    "turkish": "turkish",
+    "hungarian": "hungarian",
+    "romanian": "romanian",
+}
+DEFAULT_TS_CONFIG = "simple"
+
+
+def ts_config_for(language: str) -> str:
+    """Text search configuration for a target language"""
+    if not language:
+        return DEFAULT_TS_CONFIG
+    return TS_CONFIGS.get(language.strip().lower(), DEFAULT_TS_CONFIG)
+
+
+def search_configs() -> List[str]:
+    """Every configuration a search vector may have been built with"""
+    return sorted(set(TS_CONFIGS.values()) | {DEFAULT_TS_CONFIG})
+
+
+def _weighted_vector(config: str, weighted_columns: List[tuple]) -> str:
+    return " || ".join(
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in weighted_columns
+    )
+
+
+def search_vector_sql(language_column: str, weighted_columns: List[tuple]) -> str:
+    """
+    SQL expression for a generated tsvector column.
+
+    Picks the configuration from the row's language with a CASE over
+    constant configs, which keeps the expression immutable as generated
+    columns require.
+    """
+    branches = "\n".join(
+        f"    WHEN '{language}' THEN {_weighted_vector(config, weighted_columns)}"
+        for language, config in TS_CONFIGS.items()
+    )
+    return (
+        f"CASE lower(coalesce({language_column}, ''))\n{branches}\n"
+        f"    ELSE {_weighted_vector(DEFAULT_TS_CONFIG, weighted_columns)}\nEND"
+    )
+
+
+# Stories: title ranks above theme, theme above body text
+STORY_SEARCH_VECTOR_SQL = search_vector_sql(
+    "target_language",
+    [("story_title", "A"), ("story_theme", "B"), ("story_content", "C")],
+)
@@ -0,0 +1,214 @@
+import os
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from pydantic import BaseModel, TypeAdapter
+
+# Overridable so load tests can point at a local stand-in (see benchmarks/)
+GEMINI_API_BASE = os.getenv(
+    "GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta/models"
+)
+
+# Models used by the different endpoints
+TRANSLATE_MODEL = "gemini-1.5-flash"
+STORY_MODEL = "gemini-2.0-flash-exp"
+
+# Structured output asks Gemini for JSON matching a declared schema instead of
+# free text, so responses can be decoded strictly without regex scanning.
+# Set GEMINI_STRUCTURED_OUTPUT=false to fall back to free-text parsing.
+STRUCTURED_OUTPUT_ENABLED = os.getenv("GEMINI_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+
+# One pooled HTTP client is shared by every Gemini call, so concurrent
+# requests (e.g. batch generation) reuse keep-alive connections instead of
+# opening a new connection per call.
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_CONNECTIONS
+            )
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared client (application shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+class GeminiAPIError(Exception):
+    """Raised when the Gemini API returns a non-200 response"""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"Gemini API error: {status_code} - {body}")
+        self.status_code = status_code
+        self.body = body
+
+
+# Typed structs for structured responses
+class TranslationResult(BaseModel):
+    translation: str
+    explanation: str
+    examples: List[str]
+
+
+class RelatedWord(BaseModel):
+    english: str
+    translation: str
+
+
+# Response schemas in the OpenAPI subset accepted by Gemini's responseSchema
+TRANSLATION_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "translation": {"type": "STRING"},
+        "explanation": {"type": "STRING"},
+        "examples": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["translation", "explanation", "examples"],
+    "propertyOrdering": ["translation", "explanation", "examples"],
+}
+
+RELATED_WORDS_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "english": {"type": "STRING"},
+            "translation": {"type": "STRING"},
+        },
+        "required": ["english", "translation"],
+        "propertyOrdering": ["english", "translation"],
+    },
+}
+
+# Validators are built once at import time; validate_json parses and validates
+# in a single pass in pydantic-core without an intermediate json.loads.
+TRANSLATION_DECODER = TypeAdapter(TranslationResult)
+RELATED_WORDS_DECODER = TypeAdapter(List[RelatedWord])
+
+
+def structured_generation_config(
+    response_schema: Dict[str, Any],
+    generation_config: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Return a generationConfig that requests JSON output matching the schema"""
+    config = dict(generation_config or {})
+    config["responseMimeType"] = "application/json"
+    config["responseSchema"] = response_schema
+    return config
+
+
+def decode_structured(text: str, decoder: TypeAdapter) -> Any:
+    """
+    Strictly decode a structured Gemini response into typed structs.
+
+    Raises pydantic.ValidationError if the text is not valid JSON or does not
+    match the declared types.
+    """
+    return decoder.validate_json(text, strict=True)
+
+
+def extract_text(data: Dict[str, Any]) -> Optional[str]:
+    """Extract the text of the first candidate from a generateContent response"""
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return None
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    if not parts:
+        return None
+    return parts[0].get("text")
+
+
+async def generate_content(
+    model: str,
+    prompt: str,
+    api_key: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+    timeout: float = 30.0
+) -> Dict[str, Any]:
+    """
+    Call the Gemini generateContent endpoint.
+
+    Args:
+        model: Gemini model name
+        prompt: Prompt text
+        api_key: Gemini API key
+        generation_config: Optional generationConfig block
+        timeout: Request timeout in seconds
+
+    Returns:
+        The decoded response body
+
+    Raises:
+        GeminiAPIError: If Gemini returns a non-200 status
+        httpx.TimeoutException: If the request times out
+    """
+    body: Dict[str, Any] = {"contents": [{"parts": [{"text": prompt}]}]}
+    if generation_config:
+        body["generationConfig"] = generation_config
+
+    response = await get_client().post(
+        f"{GEMINI_API_BASE}/{model}:generateContent",
+        params={"key": api_key},
+        json=body,
+        timeout=timeout
+    )
+
+    if response.status_code != 200:
+        raise GeminiAPIError(response.status_code, response.text)
+
+    return response.json()
+
+
+async def stream_generate_content(
+    model: str,
+    prompt: str,
+    api_key: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+    timeout: float = 30.0
+) -> AsyncIterator[str]:
+    """
+    Call the Gemini streamGenerateContent endpoint and yield text as it arrives.
+
+    Uses the server-sent events variant (alt=sse), where each event carries a
+    partial response in the generateContent shape. The timeout applies to
+    each read, so long generations are not cut off while tokens keep flowing.
+
+    Raises:
+        GeminiAPIError: If Gemini returns a non-200 status
+        httpx.TimeoutException: If the connection or a read times out
+    """
+    body: Dict[str, Any] = {"contents": [{"parts": [{"text": prompt}]}]}
+    if generation_config:
+        body["generationConfig"] = generation_config
+
+    async with get_client().stream(
+        "POST",
+        f"{GEMINI_API_BASE}/{model}:streamGenerateContent",
+        params={"key": api_key, "alt": "sse"},
+        json=body,
+        timeout=timeout
+    ) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise GeminiAPIError(response.status_code, response.text)
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            text = extract_text(json.loads(line[5:]))
+            if text:
+                yield text
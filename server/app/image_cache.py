@@ -0,0 +1,97 @@
+import os
+import json
+import random
+import hashlib
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from .models import Image
+from .schemas import ImageGenerationRequest
+from .lexicon import normalize_term
+from .related_words_cache import age_bucket
+
+# Generated images are shared between identical requests: a request whose
+# normalized inputs match completed images gets a new Image row pointing at
+# one of their blobs instead of a new Imagen call. Up to IMAGE_CACHE_VARIANTS
+# distinct images are generated per key before requests are served from them.
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() == "true"
+IMAGE_CACHE_VARIANTS = int(os.getenv("IMAGE_CACHE_VARIANTS", "1"))
+# Whether a cache hit uses one of the user's daily images
+IMAGE_CACHE_HITS_COUNT_QUOTA = os.getenv("IMAGE_CACHE_HITS_COUNT_QUOTA", "false").lower() == "true"
+
+# Newly generated images whose perceptual hash is within this many bits of a
+# stored image generated from the same inputs (cache_key) reuse its blob
+# instead of uploading another copy. Candidates are looked up through
+# ix_images_cache_key, at most IMAGE_DEDUP_CANDIDATES of them. Images from
+# other inputs are only shared on an identical hash, looked up through
+# ix_images_phash. The hash needs the generated pixels, so this saves storage,
+# not Imagen calls; identical requests skip generation via find_cached_image.
+IMAGE_DEDUP_ENABLED = os.getenv("IMAGE_DEDUP_ENABLED", "true").lower() == "true"
+IMAGE_DEDUP_MAX_DISTANCE = int(os.getenv("IMAGE_DEDUP_MAX_DISTANCE", "0"))
+IMAGE_DEDUP_CANDIDATES = int(os.getenv("IMAGE_DEDUP_CANDIDATES", "20"))
+
+
+def normalize_instructions(custom_instructions: Optional[str]) -> str:
+    return " ".join((custom_instructions or "").lower().split())
+
+
+def image_cache_key(request: ImageGenerationRequest) -> str:
+    """Digest of the inputs that determine a generated image"""
+    instructions = normalize_instructions(request.custom_instructions)
+    canonical = {
+        "original_word": normalize_term(request.original_word),
+        "translated_word": normalize_term(request.translated_word),
+        "target_language": request.target_language.strip().lower(),
+        "age": age_bucket(request.child_age),
+        "instructions": hashlib.sha256(instructions.encode()).hexdigest() if instructions else None,
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+def find_cached_image(db: Session, cache_key: str) -> Optional[Image]:
+    """
+    A completed image to reuse for this key, picked at random among the
+    variants once IMAGE_CACHE_VARIANTS distinct ones exist.
+    """
+    if not IMAGE_CACHE_ENABLED:
+        return None
+    variants = (
+        db.query(Image)
+        .filter(Image.cache_key == cache_key, Image.status == "completed", Image.image_url.isnot(None))
+        .distinct(Image.image_url)
+        .order_by(Image.image_url, Image.id)
+        .limit(IMAGE_CACHE_VARIANTS)
+        .all()
+    )
+    if len(variants) < IMAGE_CACHE_VARIANTS:
+        return None
+    return random.choice(variants)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two 64-bit hashes"""
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+
+def find_duplicate_image(db: Session, phash: int, cache_key: Optional[str], exclude_id: Optional[int] = None) -> Optional[Image]:
+    """
+    A completed image that looks the same as one with this hash, if any:
+    one generated from the same inputs within IMAGE_DEDUP_MAX_DISTANCE bits,
+    else one from any inputs with exactly the same hash.
+    """
+    if not IMAGE_DEDUP_ENABLED:
+        return None
+    query = db.query(Image).filter(
+        Image.status == "completed",
+        Image.image_url.isnot(None),
+        Image.phash.isnot(None)
+    )
+    if exclude_id is not None:
+        query = query.filter(Image.id != exclude_id)
+    if cache_key:
+        candidates = query.filter(Image.cache_key == cache_key).order_by(Image.id).limit(IMAGE_DEDUP_CANDIDATES)
+        for candidate in candidates:
+            if hamming_distance(candidate.phash, phash) <= IMAGE_DEDUP_MAX_DISTANCE:
+                return candidate
+    return query.filter(Image.phash == phash).order_by(Image.id).first()
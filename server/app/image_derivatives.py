@@ -0,0 +1,119 @@
+import os
+import io
+from typing import List, NamedTuple, Tuple
+
+from PIL import Image as PILImage, features
+
+# Imagen PNGs are recompressed losslessly before upload. Palette quantization
+# is lossy but suits flat cartoon art; the smaller of the two is kept.
+IMAGE_PNG_QUANTIZE = os.getenv("IMAGE_PNG_QUANTIZE", "false").lower() == "true"
+IMAGE_PNG_QUANTIZE_COLORS = int(os.getenv("IMAGE_PNG_QUANTIZE_COLORS", "256"))
+
+# Smaller renditions of each generated image for grids and previews. Sizes
+# are the longest side in pixels. WebP is always produced; AVIF is added when
+# enabled and supported by the installed Pillow.
+IMAGE_THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "256"))
+IMAGE_MEDIUM_SIZE = int(os.getenv("IMAGE_MEDIUM_SIZE", "768"))
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+IMAGE_AVIF_ENABLED = os.getenv("IMAGE_AVIF_ENABLED", "false").lower() == "true"
+IMAGE_AVIF_QUALITY = int(os.getenv("IMAGE_AVIF_QUALITY", "60"))
+
+RENDITIONS = {
+    "thumbnail": IMAGE_THUMBNAIL_SIZE,
+    "medium": IMAGE_MEDIUM_SIZE,
+}
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": IMAGE_WEBP_QUALITY, "method": 6}),
+    "avif": ("AVIF", "image/avif", {"quality": IMAGE_AVIF_QUALITY}),
+}
+
+
+class Derivative(NamedTuple):
+    rendition: str  # 'thumbnail' or 'medium'
+    format: str  # 'webp' or 'avif'
+    content_type: str
+    data: bytes
+    width: int
+    height: int
+
+
+def derivative_formats() -> List[str]:
+    formats = ["webp"]
+    if IMAGE_AVIF_ENABLED:
+        if features.check("avif"):
+            formats.append("avif")
+        else:
+            print("AVIF renditions are enabled but not supported by this Pillow build")
+    return formats
+
+
+def build_derivatives(image_bytes: bytes) -> List[Derivative]:
+    """Resize an image into every rendition and format"""
+    with PILImage.open(io.BytesIO(image_bytes)) as source:
+        source.load()
+        # Keep transparency if there is any
+        mode = "RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB"
+        source = source.convert(mode)
+
+        derivatives = []
+        for rendition, size in RENDITIONS.items():
+            resized = source.copy()
+            # Never upscale: thumbnail() only shrinks
+            resized.thumbnail((size, size), PILImage.Resampling.LANCZOS)
+            for format_name in derivative_formats():
+                pil_format, content_type, options = FORMATS[format_name]
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                derivatives.append(Derivative(
+                    rendition, format_name, content_type, buffer.getvalue(), resized.width, resized.height
+                ))
+        return derivatives
+
+
+def derivative_filename(filename: str, derivative: Derivative) -> str:
+    """imagen_1_2.png -> imagen_1_2_thumbnail.webp"""
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}_{derivative.rendition}.{derivative.format}"
+
+
+def _encode_png(image: PILImage.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def optimize_png(image_bytes: bytes) -> Tuple[bytes, int]:
+    """
+    Recompress a PNG, returning (bytes, perceptual hash). An alpha channel
+    that is fully opaque is dropped; with IMAGE_PNG_QUANTIZE the image is
+    also reduced to a palette. The original is returned if nothing is smaller.
+    """
+    with PILImage.open(io.BytesIO(image_bytes)) as source:
+        source.load()
+        phash = dhash(source)
+        image = source
+        if image.mode == "RGBA" and image.getextrema()[3] == (255, 255):
+            image = image.convert("RGB")
+
+        candidates = [image_bytes, _encode_png(image)]
+        if IMAGE_PNG_QUANTIZE:
+            quantized = image.quantize(IMAGE_PNG_QUANTIZE_COLORS, method=PILImage.Quantize.FASTOCTREE)
+            candidates.append(_encode_png(quantized))
+        return min(candidates, key=len), phash
+
+
+def dhash(image: PILImage.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: each bit says whether a pixel of the shrunk grayscale
+    image is brighter than its right neighbour. Near-identical images differ
+    in a few bits. Returned as a signed 64-bit integer to fit a BIGINT column.
+    """
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size), PILImage.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value - (1 << 64) if value >= (1 << 63) else value
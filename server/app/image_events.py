@@ -0,0 +1,125 @@
+import os
+import json
+import asyncio
+from typing import AsyncIterator, Optional
+
+import redis.asyncio
+
+from .database import SessionLocal
+from .models import Image
+from .redis_quota import redis_client
+
+# Image status changes are published on a Redis channel per image, so a
+# client waiting on GET /api/images/{id}/events hears about completion from
+# whichever instance's worker ran the job. The database is re-checked every
+# IMAGE_EVENTS_POLL_INTERVAL seconds in case a message is missed or Redis is
+# unavailable, and the wait gives up after IMAGE_EVENTS_TIMEOUT seconds.
+IMAGE_EVENTS_TIMEOUT = int(os.getenv("IMAGE_EVENTS_TIMEOUT", "120"))
+IMAGE_EVENTS_POLL_INTERVAL = float(os.getenv("IMAGE_EVENTS_POLL_INTERVAL", "10"))
+
+FINAL_STATUSES = ("completed", "failed", "deleted")
+
+_async_redis: Optional[redis.asyncio.Redis] = None
+
+
+def get_image_status_channel(image_id: int) -> str:
+    return f"image_status:{image_id}"
+
+
+def image_status_payload(image: Image) -> dict:
+    return {
+        "id": image.id,
+        "status": image.status,
+        "image_url": image.image_url,
+        "thumbnail_url": image.thumbnail_url,
+        "medium_url": image.medium_url,
+        "title": image.title,
+    }
+
+
+def publish_image_status(db, image_id: int):
+    """Announce an image's current status to anyone waiting on it"""
+    try:
+        image = db.query(Image).filter(Image.id == image_id).first()
+        if image is not None:
+            redis_client.publish(get_image_status_channel(image_id), json.dumps(image_status_payload(image)))
+    except Exception as e:
+        print(f"Error publishing status of image {image_id}: {e}")
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Asyncio client for subscriptions, so waiting requests don't hold threads"""
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = redis.asyncio.Redis(
+            host=os.getenv('REDIS_HOST', 'localhost'),
+            port=int(os.getenv('REDIS_PORT', 6379)),
+            db=int(os.getenv('REDIS_DB', 0)),
+            decode_responses=True,
+            socket_connect_timeout=10
+        )
+    return _async_redis
+
+
+async def close_image_events():
+    global _async_redis
+    if _async_redis is not None:
+        await _async_redis.close()
+        _async_redis = None
+
+
+def _load_image_status(image_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        image = db.query(Image).filter(Image.id == image_id).first()
+        return image_status_payload(image) if image else {"id": image_id, "status": "deleted"}
+    finally:
+        db.close()
+
+
+async def watch_image_status(image_id: int, timeout: int = IMAGE_EVENTS_TIMEOUT) -> AsyncIterator[Optional[dict]]:
+    """
+    Wait for an image to finish. Yields None after each idle interval (for
+    keepalives), then the final status payload. Ends without a payload if
+    the image is still pending after `timeout` seconds.
+    """
+    pubsub = None
+    try:
+        pubsub = get_async_redis().pubsub()
+        await pubsub.subscribe(get_image_status_channel(image_id))
+    except Exception as e:
+        print(f"Redis error subscribing to image {image_id}, falling back to polling: {e}")
+        pubsub = None
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        # Subscribed before this check, so a completion in between is not lost
+        payload = await asyncio.to_thread(_load_image_status, image_id)
+        while payload["status"] not in FINAL_STATUSES:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            wait = min(IMAGE_EVENTS_POLL_INTERVAL, remaining)
+            message = None
+            if pubsub is not None:
+                try:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=wait)
+                except Exception as e:
+                    print(f"Redis error waiting on image {image_id}, falling back to polling: {e}")
+                    pubsub = None
+            else:
+                await asyncio.sleep(wait)
+
+            if message is not None:
+                payload = json.loads(message["data"])
+            else:
+                yield None
+                payload = await asyncio.to_thread(_load_image_status, image_id)
+        yield payload
+    finally:
+        if pubsub is not None:
+            try:
+                await pubsub.reset()
+            except Exception as e:
+                print(f"Redis error unsubscribing from image {image_id}: {e}")
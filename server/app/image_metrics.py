@@ -0,0 +1,138 @@
+import uuid
+import threading
+from typing import Any, Dict, List, Optional
+
+from .redis_quota import redis_client
+
+# Timing and outcome of every image pipeline stage, broken down by Imagen
+# model. Counters live in Redis so the report covers every instance's
+# workers; each process also keeps its own copy, used when Redis is down.
+IMAGE_METRICS_STAGES = (
+    "queue_wait",   # Job enqueued (or due for retry) until a worker claimed it
+    "model_load",   # Vertex AI init and from_pretrained (SDK init)
+    "generate",     # Imagen call
+    "extract",      # Reading the image bytes from the SDK response
+    "optimize",     # PNG recompression and perceptual hash
+    "dedup",        # Near-duplicate lookup
+    "upload",       # GCS upload of the original
+    "derivatives",  # Resizing and uploading renditions
+    "db_update",    # Recording the result on the image row
+    "total",        # Whole job; outcome is completed, retried or dead
+)
+
+# Upper bounds of the latency histogram buckets (milliseconds)
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+IMAGE_METRICS_KEYS = "image_metrics:keys"
+
+_local_metrics: Dict[str, Dict[str, float]] = {}
+_local_lock = threading.Lock()
+
+
+def new_trace_id(cloud_trace_context: Optional[str] = None) -> str:
+    """
+    Trace id for one generation request. Reuses the Cloud Run trace from
+    X-Cloud-Trace-Context ("TRACE_ID/SPAN_ID;o=1") so logs line up.
+    """
+    if cloud_trace_context:
+        trace_id = cloud_trace_context.split("/", 1)[0].strip()
+        if trace_id and len(trace_id) <= 64:
+            return trace_id
+    return uuid.uuid4().hex
+
+
+def get_image_metrics_key(stage: str, model: str, outcome: str) -> str:
+    return f"image_metrics:{stage}:{model}:{outcome}"
+
+
+def _bucket(ms: float) -> str:
+    for bound in LATENCY_BUCKETS_MS:
+        if ms <= bound:
+            return f"le_{bound}"
+    return "le_inf"
+
+
+def record_stage(stage: str, model: str, outcome: str, seconds: float, trace_id: Optional[str] = None):
+    """Count one run of a stage and its duration"""
+    ms = seconds * 1000
+    key = get_image_metrics_key(stage, model, outcome)
+    bucket = _bucket(ms)
+    with _local_lock:
+        stats = _local_metrics.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] += ms
+        stats[bucket] = stats.get(bucket, 0) + 1
+        if ms >= stats["max_ms"]:
+            stats["max_ms"] = ms
+            stats["max_trace_id"] = trace_id
+    try:
+        with redis_client.pipeline() as pipe:
+            pipe.sadd(IMAGE_METRICS_KEYS, key)
+            pipe.hincrby(key, "count", 1)
+            pipe.hincrbyfloat(key, "total_ms", ms)
+            pipe.hincrby(key, bucket, 1)
+            pipe.execute()
+    except Exception as e:
+        print(f"Redis error recording image metrics: {e}")
+
+
+def _percentile(stats: Dict[str, Any], fraction: float) -> Optional[int]:
+    """Upper bound of the histogram bucket holding the given fraction of runs"""
+    count = int(stats.get("count", 0))
+    if not count:
+        return None
+    seen = 0
+    for bound in LATENCY_BUCKETS_MS:
+        seen += int(stats.get(f"le_{bound}", 0))
+        if seen >= fraction * count:
+            return bound
+    return None  # Beyond the largest bucket
+
+
+def _summarize(stats: Dict[str, Any]) -> Dict[str, Any]:
+    count = int(stats.get("count", 0))
+    total_ms = float(stats.get("total_ms", 0))
+    summary = {
+        "count": count,
+        "avg_ms": round(total_ms / count, 1) if count else 0.0,
+        "p50_ms": _percentile(stats, 0.5),
+        "p95_ms": _percentile(stats, 0.95),
+    }
+    if "max_ms" in stats:
+        summary["max_ms"] = round(stats["max_ms"], 1)
+        summary["max_trace_id"] = stats.get("max_trace_id")
+    return summary
+
+
+def _stage_order(key: str) -> int:
+    stage = key.split(":")[1]
+    return IMAGE_METRICS_STAGES.index(stage) if stage in IMAGE_METRICS_STAGES else len(IMAGE_METRICS_STAGES)
+
+
+def _report(metrics: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    report = []
+    for key in sorted(metrics, key=lambda key: (_stage_order(key), key)):
+        _, stage, model, outcome = key.split(":", 3)
+        report.append({"stage": stage, "model": model, "outcome": outcome, **_summarize(metrics[key])})
+    return report
+
+
+def get_local_image_metrics() -> List[Dict[str, Any]]:
+    """This process's stage metrics, including the slowest run's trace id"""
+    with _local_lock:
+        metrics = {key: dict(stats) for key, stats in _local_metrics.items()}
+    return _report(metrics)
+
+
+def get_image_metrics_report() -> Dict[str, Any]:
+    """Stage metrics across all instances, or this process's if Redis is unavailable"""
+    try:
+        keys = sorted(redis_client.smembers(IMAGE_METRICS_KEYS))
+        with redis_client.pipeline() as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            values = pipe.execute()
+        return {"source": "redis", "stages": _report(dict(zip(keys, values)))}
+    except Exception as e:
+        print(f"Redis error reading image metrics: {e}")
+        return {"source": "local", "stages": get_local_image_metrics()}
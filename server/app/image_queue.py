@@ -0,0 +1,161 @@
+"""
+Durable image generation queue stored in Postgres (image_jobs table).
+
+Workers on any instance claim jobs with SELECT ... FOR UPDATE SKIP LOCKED,
+so each job runs once at a time without workers blocking each other. A
+claimed job holds a lease that its worker extends with heartbeats; if the
+instance dies, the lease expires and another worker picks the job up.
+Failed attempts are retried with exponential backoff, and jobs that run out
+of attempts are dead-lettered (status 'dead', last_error kept).
+"""
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .models import ImageJob
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_DEAD = "dead"
+
+IMAGE_JOB_MAX_ATTEMPTS = int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", "3"))
+# How long a claim is valid without a heartbeat (seconds)
+IMAGE_JOB_LEASE_SECONDS = int(os.getenv("IMAGE_JOB_LEASE_SECONDS", "120"))
+IMAGE_JOB_HEARTBEAT_SECONDS = int(os.getenv("IMAGE_JOB_HEARTBEAT_SECONDS", "30"))
+# Delay before the first retry; doubles with each further attempt (seconds)
+IMAGE_JOB_RETRY_DELAY = int(os.getenv("IMAGE_JOB_RETRY_DELAY", "10"))
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    image_id: int
+    user_id: str
+    prompt: str
+    attempts: int
+    max_attempts: int
+    image_ids: Optional[List[int]]  # None for jobs queued before multi-image jobs
+    trace_id: Optional[str]
+    queue_wait: float  # Seconds since the job was enqueued or became due for retry
+
+    @property
+    def all_image_ids(self) -> List[int]:
+        return self.image_ids or [self.image_id]
+
+
+CLAIM_SQL = text("""
+    UPDATE image_jobs
+    SET status = 'running',
+        attempts = attempts + 1,
+        locked_by = :worker_id,
+        lease_expires_at = now() + make_interval(secs => :lease),
+        updated_at = now()
+    WHERE id = (
+        SELECT id FROM image_jobs
+        WHERE (status = 'queued' AND run_after <= now())
+           OR (status = 'running' AND lease_expires_at < now())
+        ORDER BY run_after
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, image_id, user_id, prompt, attempts, max_attempts, image_ids, trace_id,
+              EXTRACT(EPOCH FROM now() - run_after)::float AS queue_wait
+""")
+
+HEARTBEAT_SQL = text("""
+    UPDATE image_jobs
+    SET lease_expires_at = now() + make_interval(secs => :lease)
+    WHERE id = :job_id AND locked_by = :worker_id AND status = 'running'
+""")
+
+RETRY_SQL = text("""
+    UPDATE image_jobs
+    SET status = 'queued',
+        locked_by = NULL,
+        lease_expires_at = NULL,
+        run_after = now() + make_interval(secs => :delay),
+        last_error = :error,
+        updated_at = now()
+    WHERE id = :job_id AND locked_by = :worker_id
+""")
+
+FINISH_SQL = text("""
+    UPDATE image_jobs
+    SET status = :status,
+        locked_by = NULL,
+        lease_expires_at = NULL,
+        last_error = :error,
+        updated_at = now()
+    WHERE id = :job_id AND locked_by = :worker_id
+""")
+
+
+def enqueue_image_job(db: Session, image_ids: List[int], user_id: str, prompt: str, trace_id: Optional[str] = None) -> ImageJob:
+    """Queue one Imagen call whose outputs fill the given images, in order"""
+    job = ImageJob(
+        image_id=image_ids[0],
+        image_ids=image_ids,
+        trace_id=trace_id,
+        user_id=user_id,
+        prompt=prompt,
+        status=JOB_QUEUED,
+        max_attempts=IMAGE_JOB_MAX_ATTEMPTS
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim_image_job(db: Session, worker_id: str) -> Optional[ClaimedJob]:
+    """
+    Claim the next runnable job: a queued job that is due, or a running one
+    whose lease has expired. Increments attempts.
+    """
+    row = db.execute(CLAIM_SQL, {"worker_id": worker_id, "lease": IMAGE_JOB_LEASE_SECONDS}).first()
+    db.commit()
+    return ClaimedJob(*row) if row else None
+
+
+def heartbeat_image_job(db: Session, job_id: int, worker_id: str) -> bool:
+    """Extend the lease; False if the job is no longer held by this worker"""
+    result = db.execute(HEARTBEAT_SQL, {"job_id": job_id, "worker_id": worker_id, "lease": IMAGE_JOB_LEASE_SECONDS})
+    db.commit()
+    return result.rowcount == 1
+
+
+def complete_image_job(db: Session, job_id: int, worker_id: str):
+    db.execute(FINISH_SQL, {"job_id": job_id, "worker_id": worker_id, "status": JOB_COMPLETED, "error": None})
+    db.commit()
+
+
+def dead_letter_image_job(db: Session, job_id: int, worker_id: str, error: str):
+    db.execute(FINISH_SQL, {"job_id": job_id, "worker_id": worker_id, "status": JOB_DEAD, "error": error})
+    db.commit()
+
+
+def retry_image_job(db: Session, job: ClaimedJob, worker_id: str, error: str):
+    """Put a failed job back in the queue with exponential backoff"""
+    delay = IMAGE_JOB_RETRY_DELAY * (2 ** (job.attempts - 1))
+    db.execute(RETRY_SQL, {"job_id": job.id, "worker_id": worker_id, "delay": delay, "error": error})
+    db.commit()
+
+
+def has_active_image_jobs(db: Session, user_id: str) -> bool:
+    """
+    Whether the user still has jobs queued or running. A batch queues several
+    jobs under one pending-generation flag, which is only cleared once none
+    of them are left.
+    """
+    return db.query(ImageJob.id).filter(
+        ImageJob.user_id == user_id,
+        ImageJob.status.in_((JOB_QUEUED, JOB_RUNNING))
+    ).first() is not None
+
+
+def image_job_counts(db: Session) -> Dict[str, int]:
+    """Number of jobs per status"""
+    rows = db.execute(text("SELECT status, count(*) FROM image_jobs GROUP BY status")).all()
+    return {status: count for status, count in rows}
@@ -0,0 +1,386 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Image as ImageModel
+from .crud import update_image_status
+from .storage import storage_manager
+from .redis_quota import end_generation, release_quota
+from .image_derivatives import build_derivatives, derivative_filename, optimize_png
+from .image_cache import find_duplicate_image
+from .image_events import publish_image_status
+from .image_metrics import record_stage, get_local_image_metrics
+from .image_queue import (
+    ClaimedJob, JOB_QUEUED, IMAGE_JOB_HEARTBEAT_SECONDS,
+    enqueue_image_job, claim_image_job, heartbeat_image_job, complete_image_job,
+    retry_image_job, dead_letter_image_job, has_active_image_jobs, image_job_counts
+)
+
+# Imagen model and Vertex AI location
+IMAGEN_MODEL = os.getenv("IMAGEN_MODEL", "imagen-4.0-generate-preview-06-06")
+VERTEX_AI_LOCATION = os.getenv("VERTEX_AI_LOCATION", "us-central1")
+# Concurrent Imagen generations per instance
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# Parallel uploads of the outputs of one multi-image job
+IMAGE_UPLOAD_CONCURRENCY = int(os.getenv("IMAGE_UPLOAD_CONCURRENCY", "4"))
+# How often idle workers look for jobs enqueued by other instances (seconds)
+IMAGE_JOB_POLL_INTERVAL = float(os.getenv("IMAGE_JOB_POLL_INTERVAL", "2"))
+
+class ImageModelProvider:
+    """
+    Initializes Vertex AI and loads the Imagen model once per process.
+
+    vertexai.init and from_pretrained are slow, so the handle is shared by
+    every generation. A failed load is retried on the next call.
+    """
+
+    def __init__(self, model_name: str = IMAGEN_MODEL, location: str = VERTEX_AI_LOCATION):
+        self.model_name = model_name
+        self.location = location
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self):
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None:
+                import vertexai
+                from vertexai.preview.vision_models import ImageGenerationModel
+
+                project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "vocabloom-467020")
+                vertexai.init(project=project_id, location=self.location)
+                print(f"Vertex AI initialized for project: {project_id}")
+                self._model = ImageGenerationModel.from_pretrained(self.model_name)
+                print(f"Loaded image model {self.model_name}")
+        return self._model
+
+
+def _set_image_status(db: Session, image_id: int, status: str, image_url: Optional[str] = None, title: Optional[str] = None):
+    try:
+        update_image_status(db, image_id, status, image_url, title)
+    except Exception as e:
+        print(f"Error updating image status: {e}")
+        db.rollback()
+
+
+def upload_derivatives(image_bytes: bytes, filename: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Build and upload the resized renditions of an image, named after the
+    original. Returns {rendition: {format: url, "width": .., "height": ..}}.
+    """
+    renditions: Dict[str, Dict[str, Any]] = {}
+    for derivative in build_derivatives(image_bytes):
+        url = storage_manager.upload_image_from_bytes(
+            derivative.data, derivative_filename(filename, derivative), derivative.content_type
+        )
+        rendition = renditions.setdefault(derivative.rendition, {"width": derivative.width, "height": derivative.height})
+        rendition[derivative.format] = url
+    return renditions
+
+
+def _unfinished_image_ids(db: Session, image_ids: List[int]) -> List[int]:
+    rows = db.query(ImageModel.id).filter(ImageModel.id.in_(image_ids), ImageModel.status != "completed").all()
+    return [row.id for row in rows]
+
+
+def _end_generation_when_idle(db: Session, user_id: str):
+    """Clear the user's pending image generation once none of their jobs are left"""
+    try:
+        if has_active_image_jobs(db, user_id):
+            return
+    except Exception as e:
+        print(f"Error checking remaining image jobs for user {user_id}: {e}")
+    end_generation(user_id, 'image')
+
+
+def generated_image_title(generated_image) -> Optional[str]:
+    """Caption or description returned with the image, if any"""
+    if getattr(generated_image, "caption", None):
+        return generated_image.caption
+    if getattr(generated_image, "description", None):
+        return generated_image.description
+    return None
+
+
+class PermanentImageError(Exception):
+    """A failure that retrying won't fix; the job is dead-lettered at once"""
+
+
+class ImageWorker:
+    """
+    Runs Imagen generations from the durable image_jobs queue.
+
+    IMAGE_WORKERS asyncio tasks claim jobs from Postgres (see image_queue.py)
+    and run them on a dedicated thread pool, so slow image calls never
+    occupy the threadpool that serves API requests. While a job runs its
+    lease is extended every IMAGE_JOB_HEARTBEAT_SECONDS. Idle workers poll
+    every IMAGE_JOB_POLL_INTERVAL seconds, or immediately when this instance
+    enqueues a job. Every stage is timed by model and outcome (see
+    image_metrics.py) and logged with the request's trace id.
+    """
+
+    def __init__(self, workers: int = IMAGE_WORKERS):
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.models = ImageModelProvider()
+        self._tasks = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._active = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-worker")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"Started {self.workers} image generation workers ({self.worker_id})")
+
+    async def stop(self):
+        """
+        Stop claiming jobs. Jobs still running are not acknowledged; their
+        leases expire and another worker retries them.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def submit(self, db: Session, image_ids: List[int], prompt: str, user_id: str, trace_id: Optional[str] = None):
+        """
+        Queue one Imagen call for a prompt; its outputs fill image_ids.
+
+        The job is stored in Postgres, so it survives this instance; the
+        worker that runs it marks the images completed or failed. The
+        pending generation is cleared when the user's last job finishes.
+        """
+        enqueue_image_job(db, image_ids, user_id, prompt, trace_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _claim(self) -> Optional[ClaimedJob]:
+        db = SessionLocal()
+        try:
+            return claim_image_job(db, self.worker_id)
+        finally:
+            db.close()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                job = await loop.run_in_executor(self._executor, self._claim)
+            except Exception as e:
+                print(f"Error claiming image job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), IMAGE_JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._active += 1
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                await loop.run_in_executor(self._executor, self.run_job, job)
+            except Exception as e:
+                print(f"Image worker failed on job {job.id}: {e}")
+            finally:
+                heartbeat.cancel()
+                self._active -= 1
+
+    async def _heartbeat(self, job: ClaimedJob):
+        while True:
+            await asyncio.sleep(IMAGE_JOB_HEARTBEAT_SECONDS)
+            db = SessionLocal()
+            try:
+                if not await asyncio.to_thread(heartbeat_image_job, db, job.id, self.worker_id):
+                    print(f"Lost the lease on image job {job.id}")
+                    return
+            except Exception as e:
+                print(f"Error extending lease on image job {job.id}: {e}")
+            finally:
+                db.close()
+
+    def _timed(self, stage: str, trace_id: Optional[str], fn, *args, **kwargs):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = fn(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            record_stage(stage, self.models.model_name, outcome, time.perf_counter() - started, trace_id)
+
+    def run_job(self, job: ClaimedJob):
+        """Run one claimed job and record its outcome (runs on a worker thread)"""
+        started = time.perf_counter()
+        record_stage("queue_wait", self.models.model_name, "ok", max(job.queue_wait, 0.0), job.trace_id)
+        print(f"[trace {job.trace_id}] Running image job {job.id} (attempt {job.attempts}) after {job.queue_wait:.1f}s in queue")
+        outcome = "dead"
+        db = SessionLocal()
+        try:
+            if job.attempts > job.max_attempts:
+                # Claimed again after the last attempt's lease expired
+                self._fail(db, job, "Worker lost while generating; no attempts left", retry=False)
+                return
+            try:
+                self.generate(db, job.all_image_ids, job.prompt, job.trace_id)
+            except PermanentImageError as e:
+                db.rollback()
+                self._fail(db, job, str(e), retry=False)
+            except Exception as e:
+                print(f"[trace {job.trace_id}] Error generating image with Imagen (job {job.id}, attempt {job.attempts}): {e}")
+                db.rollback()
+                retry = job.attempts < job.max_attempts
+                self._fail(db, job, str(e), retry=retry)
+                if retry:
+                    outcome = "retried"
+            else:
+                complete_image_job(db, job.id, self.worker_id)
+                _end_generation_when_idle(db, job.user_id)
+                for image_id in job.all_image_ids:
+                    publish_image_status(db, image_id)
+                outcome = "completed"
+        finally:
+            db.close()
+            record_stage("total", self.models.model_name, outcome, time.perf_counter() - started, job.trace_id)
+
+    def _fail(self, db: Session, job: ClaimedJob, error: str, retry: bool):
+        if retry:
+            retry_image_job(db, job, self.worker_id, error)
+            return
+        print(f"[trace {job.trace_id}] Dead-lettering image job {job.id}: {error}")
+        dead_letter_image_job(db, job.id, self.worker_id, error)
+        # Outputs stored by earlier attempts stay completed (and charged)
+        failed_ids = _unfinished_image_ids(db, job.all_image_ids)
+        for image_id in failed_ids:
+            _set_image_status(db, image_id, "failed")
+        if failed_ids:
+            release_quota(job.user_id, 'image', len(failed_ids))
+        _end_generation_when_idle(db, job.user_id)
+        for image_id in job.all_image_ids:
+            publish_image_status(db, image_id)
+
+    def generate(self, db: Session, image_ids: List[int], prompt: str, trace_id: Optional[str] = None):
+        """
+        Generate the images for one prompt in a single Imagen call, then
+        optimize, upload and record each output along with its resized
+        renditions. Uploads run in parallel. If a near-identical image is
+        already stored, its blob is shared instead of uploading a copy.
+        Images completed by an earlier attempt are skipped.
+
+        Raises:
+            PermanentImageError: If the image rows are gone or Imagen returned nothing
+            Exception: Any other failure, which is retried
+        """
+        images = (
+            db.query(ImageModel)
+            .filter(ImageModel.id.in_(_unfinished_image_ids(db, image_ids)))
+            .order_by(ImageModel.id)
+            .all()
+        )
+        if not images:
+            if db.query(ImageModel.id).filter(ImageModel.id.in_(image_ids)).first() is not None:
+                return  # Everything was stored by an earlier attempt
+            raise PermanentImageError(f"Image records not found for IDs: {image_ids}")
+
+        print(f"[trace {trace_id}] Generating {len(images)} image(s) with Imagen for: {images[0].original_word} -> {images[0].translated_word}")
+        model = self._timed("model_load", trace_id, self.models.get)
+        response = self._timed("generate", trace_id, model.generate_images, prompt=prompt, number_of_images=len(images))
+        if not response.images:
+            raise PermanentImageError("No images generated")
+        if len(response.images) < len(images):
+            # Imagen drops outputs that fail its safety filters
+            print(f"Imagen returned {len(response.images)} of {len(images)} images")
+
+        outputs = []
+        for image, generated_image in zip(images, response.images):
+            raw_bytes = self._timed("extract", trace_id, lambda: generated_image._image_bytes)
+            image_bytes, phash = self._timed("optimize", trace_id, optimize_png, raw_bytes)
+            outputs.append((image.id, generated_image_title(generated_image), image_bytes, phash))
+
+        # A near-identical image of the same inputs is already stored: point at its blob
+        cache_keys = {image.id: image.cache_key for image in images}
+        to_upload = []
+        for image_id, title, image_bytes, phash in outputs:
+            duplicate = self._timed("dedup", trace_id, find_duplicate_image, db, phash, cache_keys[image_id], image_id)
+            if duplicate is not None:
+                print(f"Image {image_id} matches stored image {duplicate.id}; sharing {duplicate.image_url}")
+                self._timed(
+                    "db_update", trace_id, update_image_status,
+                    db, image_id, "completed", duplicate.image_url, title, duplicate.renditions, phash
+                )
+            else:
+                to_upload.append((image_id, title, image_bytes, phash))
+
+        if to_upload:
+            with ThreadPoolExecutor(max_workers=min(len(to_upload), IMAGE_UPLOAD_CONCURRENCY)) as uploads:
+                stored = list(uploads.map(lambda output: self._store(output[0], output[2], trace_id), to_upload))
+            for (image_id, title, _, phash), (image_url, renditions) in zip(to_upload, stored):
+                self._timed(
+                    "db_update", trace_id, update_image_status,
+                    db, image_id, "completed", image_url, title, renditions, phash
+                )
+
+        # Rows Imagen returned no output for; their quota is given back
+        for image in images[len(response.images):]:
+            _set_image_status(db, image.id, "failed")
+            release_quota(image.user_id, 'image', 1)
+
+    def _store(self, image_id: int, image_bytes: bytes, trace_id: Optional[str] = None):
+        """Upload one image and its renditions, returning (image_url, renditions)"""
+        filename = f"imagen_{image_id}_{int(time.time())}.png"
+        image_url = self._timed(
+            "upload", trace_id, storage_manager.upload_image_from_bytes,
+            image_bytes, filename, "image/png"
+        )
+        print(f"[trace {trace_id}] Image uploaded successfully: {image_url}")
+        try:
+            renditions = self._timed("derivatives", trace_id, upload_derivatives, image_bytes, filename)
+        except Exception as e:
+            # The original is still usable; clients fall back to image_url
+            print(f"[trace {trace_id}] Error creating renditions for image {image_id}: {e}")
+            renditions = None
+        return image_url, renditions
+
+    def stats(self, db: Session) -> Dict[str, Any]:
+        try:
+            jobs = image_job_counts(db)
+        except Exception as e:
+            print(f"Error counting image jobs: {e}")
+            jobs = {}
+        return {
+            "worker_id": self.worker_id,
+            "workers": self.workers,
+            "queue_depth": jobs.get(JOB_QUEUED, 0),
+            "jobs": jobs,
+            "active": self._active,
+            "model_loaded": self.models.loaded,
+            "model": self.models.model_name,
+            "stages": get_local_image_metrics(),
+        }
+
+
+# Global instance, started from the application startup event
+image_worker = ImageWorker()
@@ -0,0 +1,72 @@
+import os
+import json
+from typing import Dict, NamedTuple, Optional
+
+# Bundled lexicon of 228 high-frequency words for kids (animals, colors,
+# foods, ...) in Spanish, French and Chinese, with pre-authored explanations
+# and examples. LEXICON_PATH can point at a larger file in the same format.
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(__file__), "data", "lexicon.json")
+LEXICON_PATH = os.getenv("LEXICON_PATH", DEFAULT_LEXICON_PATH)
+LEXICON_ENABLED = os.getenv("LEXICON_ENABLED", "true").lower() == "true"
+
+
+class LexiconEntry(NamedTuple):
+    translation: str
+    explanation: str
+    examples: tuple
+
+
+def normalize_term(term: str) -> str:
+    """Normalize a term the same way the translation cache does"""
+    return term.lower().strip()
+
+
+class Lexicon:
+    """
+    Read-only in-memory lexicon keyed by (language, term).
+
+    The file format is {"version": 1, "languages": {language: {term:
+    [translation, explanation, [examples...]]}}}. Entries are stored as
+    tuples in a single flat dict, so a lookup is one hash probe and the
+    per-entry overhead stays small even for a few thousand words per language.
+    """
+
+    def __init__(self, entries: Optional[Dict[tuple, LexiconEntry]] = None):
+        self._entries = entries or {}
+
+    @classmethod
+    def load(cls, path: str) -> "Lexicon":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        entries = {}
+        for language, words in data.get("languages", {}).items():
+            language_key = language.lower()
+            for term, (translation, explanation, examples) in words.items():
+                entries[(language_key, normalize_term(term))] = LexiconEntry(
+                    translation, explanation, tuple(examples)
+                )
+        return cls(entries)
+
+    def lookup(self, term: str, language: str) -> Optional[LexiconEntry]:
+        """Return the lexicon entry for a term and language, if bundled"""
+        return self._entries.get((language.lower(), normalize_term(term)))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _load_lexicon() -> Lexicon:
+    if not LEXICON_ENABLED:
+        return Lexicon()
+    try:
+        lexicon = Lexicon.load(LEXICON_PATH)
+        print(f"Loaded {len(lexicon)} lexicon entries from {LEXICON_PATH}")
+        return lexicon
+    except Exception as e:
+        print(f"Warning: Could not load lexicon from '{LEXICON_PATH}': {e}")
+        return Lexicon()
+
+
+# Global instance, loaded once at import time
+lexicon = _load_lexicon()
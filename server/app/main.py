@@ -8,11 +8,15 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import our modules
-from app.database import engine, Base
 from app.auth import initialize_firebase
-from app.routes import auth, flashcards, translations, translate, cache, words, stories, images, discover, quota, preferences
+from app.routes import auth, flashcards, translations, translate, cache, words, stories, images, discover, quota, preferences, prompts
 # Import models to ensure they're registered with SQLAlchemy
 from app.models import User, Flashcard, Translation, Story, Image, CachedTranslation
+from app.story_jobs import story_jobs
+from app.view_counter import view_count_flusher
+from app.image_worker import image_worker
+from app.gemini import close_client as close_gemini_client
+from app.image_events import close_image_events
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -40,16 +44,23 @@ app.add_middleware(
 print("Initializing Firebase using Secret Manager")
 initialize_firebase()
 
-# Create database tables on startup
+# Tables and schema changes come from "alembic upgrade head", which the
+# Dockerfile and run_server.sh run before the app starts
 @app.on_event("startup")
 async def startup_event():
-    try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully")
-    except Exception as e:
-        print(f"Warning: Could not create database tables: {e}")
-        print("This is normal for local development without PostgreSQL")
+    # Start the background workers: story generation, view count flushing
+    # and image generation
+    story_jobs.start()
+    view_count_flusher.start()
+    image_worker.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await story_jobs.stop()
+    await view_count_flusher.stop()
+    await image_worker.stop()
+    await close_gemini_client()
+    await close_image_events()
 
 # Include routers
 app.include_router(auth.router, prefix="/api")
@@ -63,6 +74,7 @@ app.include_router(images.router, prefix="/api")
 app.include_router(discover.router, prefix="/api")
 app.include_router(quota.router, prefix="/api")
 app.include_router(preferences.router, prefix="/api")
+app.include_router(prompts.router, prefix="/api")
 
 # Health check endpoint
 @app.get("/health")
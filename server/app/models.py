@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import DDL, event, Column, Integer, BigInteger, String, Text, Boolean, DateTime, ForeignKey, Computed, Index
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from .database import Base
+from .fts import STORY_SEARCH_VECTOR_SQL
+from .projections import STORY_SNIPPET_SQL
 from datetime import datetime
 
 
@@ -37,6 +39,11 @@ class Flashcard(Base):
     
     # Relationships
     user = relationship("User", back_populates="flashcards")
+    
+    __table_args__ = (
+        Index("ix_flashcards_original_word_trgm", "original_word", postgresql_using="gin", postgresql_ops={"original_word": "gin_trgm_ops"}),
+        Index("ix_flashcards_translated_word_trgm", "translated_word", postgresql_using="gin", postgresql_ops={"translated_word": "gin_trgm_ops"}),
+    )
 
 
 class Translation(Base):
@@ -53,6 +60,10 @@ class Translation(Base):
     
     # Relationships
     user = relationship("User", back_populates="translations")
+    
+    __table_args__ = (
+        Index("ix_translations_original_term_trgm", "original_term", postgresql_using="gin", postgresql_ops={"original_term": "gin_trgm_ops"}),
+    )
 
 
 class CachedTranslation(Base):
@@ -80,9 +91,23 @@ class Story(Base):
     view_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now)
+    # Start of the story for list views (see projections.py), maintained by Postgres
+    story_snippet = Column(Text, Computed(STORY_SNIPPET_SQL, persisted=True))
+    # Full-text search vector maintained by Postgres (see fts.py); not loaded with the row
+    search_vector = deferred(Column(TSVECTOR, Computed(STORY_SEARCH_VECTOR_SQL, persisted=True)))
     
     # Relationships
     user = relationship("User", back_populates="stories")
+    
+    __table_args__ = (
+        Index("ix_stories_search_vector", "search_vector", postgresql_using="gin"),
+        # Substring search for languages without a stemmer (see search.py)
+        Index("ix_stories_story_title_trgm", "story_title", postgresql_using="gin", postgresql_ops={"story_title": "gin_trgm_ops"}),
+        Index("ix_stories_story_content_trgm", "story_content", postgresql_using="gin", postgresql_ops={"story_content": "gin_trgm_ops"}),
+        # Filtered discovery (language, then age range, newest first) and theme lookups
+        Index("ix_stories_language_age_created", "target_language", "target_age_range", "created_at"),
+        Index("ix_stories_story_theme", "story_theme"),
+    )
 
 
 class Image(Base):
@@ -99,8 +124,59 @@ class Image(Base):
     status = Column(String(20), default="pending")  # 'pending', 'completed', 'failed'
     child_age = Column(Integer)  # Age used in generation
     title = Column(String(255))  # Optional title for the image
+    cache_key = Column(String(64))  # Digest of the normalized generation inputs (see image_cache.py)
+    thumbnail_url = Column(String(500))  # Small WebP rendition for grids (see image_derivatives.py)
+    medium_url = Column(String(500))  # Medium WebP rendition for previews
+    renditions = Column(JSONB)  # {"thumbnail": {"webp": url, "avif": url, "width": .., "height": ..}, ...}
+    phash = Column(BigInteger)  # Perceptual (difference) hash, for sharing near-duplicate blobs
+    trace_id = Column(String(64))  # Generation trace id, also in worker logs and image metrics
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now)
     
     # Relationships
-    user = relationship("User", back_populates="images") 
\ No newline at end of file
+    user = relationship("User", back_populates="images")
+    
+    __table_args__ = (
+        Index("ix_images_original_word_trgm", "original_word", postgresql_using="gin", postgresql_ops={"original_word": "gin_trgm_ops"}),
+        Index("ix_images_translated_word_trgm", "translated_word", postgresql_using="gin", postgresql_ops={"translated_word": "gin_trgm_ops"}),
+        # Reuse lookups, and checking whether other rows still share a blob
+        Index("ix_images_cache_key", "cache_key"),
+        Index("ix_images_image_url", "image_url"),
+        # Identical-looking images generated from other inputs (see image_cache.py)
+        Index("ix_images_phash", "phash"),
+        Index("ix_images_trace_id", "trace_id"),
+    ) 
+
+
+class ImageJob(Base):
+    """Durable image generation job, claimed by workers on any instance (see image_queue.py)"""
+    __tablename__ = "image_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    image_id = Column(Integer, ForeignKey("images.id", ondelete="CASCADE"), nullable=False, index=True)
+    image_ids = Column(JSONB)  # Every image filled by this job's outputs (one Imagen call); image_id is the first
+    trace_id = Column(String(64))  # Generation trace id of the request that queued it (see image_metrics.py)
+    user_id = Column(String(128), nullable=False)
+    prompt = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # 'queued', 'running', 'completed', 'dead'
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String(100))  # Worker holding the lease
+    lease_expires_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # Claim order for queued jobs and lookups of expired leases
+        Index("ix_image_jobs_status_run_after", "status", "run_after"),
+        # Whether a user still has jobs in flight (see has_active_image_jobs)
+        Index("ix_image_jobs_user_id_status", "user_id", "status"),
+    )
+
+
+# Trigram indexes need pg_trgm when create_all builds these tables on a new
+# database (existing databases get it from alembic revision 0002)
+for table in (Flashcard.__table__, Translation.__table__, Story.__table__, Image.__table__):
+    event.listen(table, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
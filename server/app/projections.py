@@ -0,0 +1,85 @@
+"""
+Column projections for list endpoints.
+
+List views select the lightweight columns only and show a precomputed
+snippet instead of the full story text; detail endpoints load everything.
+A `fields=` query parameter picks the columns explicitly: a comma-separated
+list of field names, or `summary` (the default) / `full`.
+
+Kept free of model imports so models.py can build its snippet column from
+it.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import load_only
+
+# Stories carry a generated snippet column so lists never read story_content
+STORY_SNIPPET_LENGTH = 200
+STORY_SNIPPET_SQL = f"left(story_content, {STORY_SNIPPET_LENGTH})"
+
+STORY_FIELDS = (
+    "id", "user_id", "original_words", "story_title", "story_snippet", "story_content",
+    "story_theme", "story_length", "target_age_range", "target_language", "view_count",
+    "created_at", "updated_at",
+)
+STORY_SUMMARY_FIELDS = tuple(field for field in STORY_FIELDS if field != "story_content")
+
+IMAGE_FIELDS = (
+    "id", "user_id", "original_word", "translated_word", "target_language", "image_url",
+    "thumbnail_url", "medium_url", "renditions", "generation_prompt", "custom_instructions",
+    "status", "child_age", "title", "trace_id", "created_at", "updated_at",
+)
+IMAGE_SUMMARY_FIELDS = tuple(
+    field for field in IMAGE_FIELDS if field not in ("generation_prompt", "custom_instructions", "renditions", "trace_id")
+)
+
+# Keys of a /api/discover/ feed item (shared by every content type)
+DISCOVER_ITEM_FIELDS = (
+    "id", "content_type", "original_word", "translated_word", "target_language",
+    "example_sentences", "created_at", "story_title", "story_snippet", "story_content",
+    "story_theme", "target_age_range", "image_url", "thumbnail_url", "medium_url", "translation", "explanation",
+    "search_rank", "search_snippet", "user",
+)
+DISCOVER_SUMMARY_FIELDS = tuple(field for field in DISCOVER_ITEM_FIELDS if field != "story_content")
+DISCOVER_REQUIRED_FIELDS = ("id", "content_type", "created_at")
+
+SUMMARY = "summary"
+FULL = "full"
+
+
+def parse_fields(
+    fields: Optional[str],
+    allowed: Sequence[str],
+    summary: Sequence[str],
+    required: Sequence[str] = ("id",)
+) -> List[str]:
+    """
+    Resolve a `fields=` parameter to an ordered list of field names.
+
+    Raises:
+        HTTPException: 400 if any requested field is unknown
+    """
+    if not fields or fields.strip() == SUMMARY:
+        return list(summary)
+    if fields.strip() == FULL:
+        return list(allowed)
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}"
+        )
+    requested.update(required)
+    return [field for field in allowed if field in requested]
+
+
+def load_fields(model, fields: Sequence[str]):
+    """Query option loading only the selected columns of a model"""
+    return load_only(*[getattr(model, field) for field in fields])
+
+
+def project(row, fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: getattr(row, field) for field in fields}
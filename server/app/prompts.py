@@ -0,0 +1,256 @@
+import os
+import re
+import textwrap
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .redis_quota import redis_client
+
+# Caps on user-supplied prompt fields (characters). Longer values are cut at a
+# word boundary before they reach the prompt.
+PROMPT_CUSTOM_TEXT_MAX_CHARS = int(os.getenv("PROMPT_CUSTOM_TEXT_MAX_CHARS", "500"))
+PROMPT_FIELD_MAX_CHARS = int(os.getenv("PROMPT_FIELD_MAX_CHARS", "100"))
+# Log the estimated input tokens of every Gemini prompt
+PROMPT_TOKEN_LOGGING = os.getenv("PROMPT_TOKEN_LOGGING", "true").lower() == "true"
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough Gemini token estimate: about 4 characters per token for ASCII
+    text, and one token per character for other scripts (CJK, accented text).
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def cap_text(value: Optional[str], limit: int) -> Optional[str]:
+    """Trim a user-supplied field to at most limit characters, on a word boundary if possible"""
+    if value is None:
+        return None
+    value = value.strip()
+    if len(value) <= limit:
+        return value
+    cut = value[:limit]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip()
+
+
+def _compact(source: str) -> str:
+    """Drop source indentation, trailing spaces and runs of blank lines"""
+    lines = [line.rstrip() for line in textwrap.dedent(source).strip("\n").splitlines()]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines))
+
+
+class PromptTemplate:
+    """
+    A prompt template parsed once at import time.
+
+    Uses str.format syntax with plain field names ({{ and }} for literal
+    braces). Rendering joins the pre-split literal segments with the field
+    values, and the fixed part of the token count is computed up front.
+    """
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.source = _compact(source)
+        self._segments: List[Tuple[str, Optional[str]]] = []
+        for literal, field, _, _ in Formatter().parse(self.source):
+            if field is not None and not field.isidentifier():
+                raise ValueError(f"Prompt template '{name}' has an unsupported field: {{{field}}}")
+            self._segments.append((literal, field))
+        self.fields = frozenset(field for _, field in self._segments if field)
+        self.static_tokens = estimate_tokens("".join(literal for literal, _ in self._segments))
+
+    def render(self, **values: Any) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt template '{self.name}' is missing {sorted(missing)}")
+        parts = []
+        for literal, field in self._segments:
+            parts.append(literal)
+            if field:
+                parts.append(str(values[field]))
+        # Optional sections render empty; don't send the blank lines they leave
+        return _BLANK_LINES.sub("\n\n", "".join(parts)).strip()
+
+
+# Token accounting per endpoint. Totals are kept in Redis so the report
+# covers every instance; the in-process copy is used when Redis is down.
+_local_token_stats: Dict[str, Dict[str, int]] = {}
+
+
+def get_prompt_stats_key(endpoint: str) -> str:
+    return f"prompt_tokens:{endpoint}"
+
+
+def record_prompt(endpoint: str, prompt: str) -> int:
+    """Estimate, log and record the input tokens of a prompt. Returns the estimate."""
+    tokens = estimate_tokens(prompt)
+    if PROMPT_TOKEN_LOGGING:
+        print(f"Prompt [{endpoint}]: ~{tokens} input tokens ({len(prompt)} chars)")
+
+    stats = _local_token_stats.setdefault(endpoint, {"calls": 0, "tokens": 0})
+    stats["calls"] += 1
+    stats["tokens"] += tokens
+    try:
+        with redis_client.pipeline() as pipe:
+            pipe.hincrby(get_prompt_stats_key(endpoint), "calls", 1)
+            pipe.hincrby(get_prompt_stats_key(endpoint), "tokens", tokens)
+            pipe.execute()
+    except Exception as e:
+        print(f"Redis error recording prompt tokens: {e}")
+    return tokens
+
+
+def get_prompt_token_report() -> Dict[str, Any]:
+    """Average estimated input tokens per endpoint"""
+    endpoints = {}
+    source = "redis"
+    try:
+        for endpoint in PROMPT_ENDPOINTS:
+            stats = redis_client.hgetall(get_prompt_stats_key(endpoint))
+            if stats:
+                endpoints[endpoint] = {"calls": int(stats.get("calls", 0)), "tokens": int(stats.get("tokens", 0))}
+    except Exception as e:
+        print(f"Redis error reading prompt tokens: {e}")
+        endpoints = {endpoint: dict(stats) for endpoint, stats in _local_token_stats.items()}
+        source = "local"
+
+    report = {}
+    for endpoint, stats in endpoints.items():
+        report[endpoint] = {
+            "calls": stats["calls"],
+            "total_input_tokens": stats["tokens"],
+            "avg_input_tokens": round(stats["tokens"] / stats["calls"], 1) if stats["calls"] else 0.0,
+            "template_tokens": TEMPLATE_TOKENS.get(endpoint),
+        }
+    return {"source": source, "endpoints": report}
+
+
+# Templates
+
+STORY_TEMPLATE = PromptTemplate("story", """
+    {language_instruction}Create an engaging, educational story for children that incorporates the following words: {words_text}.
+
+    {theme_instruction}
+    Maximum length: {max_words} words
+    Age guidance: {age_guidance}
+
+    CRITICAL LANGUAGE REQUIREMENTS:
+    - Write the story ENTIRELY in {target_language} language
+    - NEVER include pinyin, romanization, or pronunciation guides in parentheses
+    - NEVER add English translations or explanations
+    - NEVER use English words or phrases
+    - Use ONLY the target language characters and words
+
+    Story Requirements:
+    - Make the story engaging and age-appropriate
+    - Naturally incorporate all the provided words
+    - Include educational elements or moral lessons
+    - Make it fun and memorable
+    - Keep the story within {max_words} words
+
+    {word_highlighting}
+
+    {custom_instructions}
+
+    IMPORTANT: The story must be written in pure {target_language} without any pronunciation guides, pinyin, or English text.
+""")
+
+STORY_WORD_HIGHLIGHTING_TEMPLATE = PromptTemplate("story_word_highlighting", """
+    Word Usage:
+    - Include and highlight ALL of these words: {words_text}
+    - Make each word **bold** when it appears (use **word** format)
+    - Ensure each word appears multiple times throughout the story
+    - Use the words naturally in the story context
+""")
+
+RELATED_WORDS_TEMPLATE = PromptTemplate("related_words", """
+    You are a language learning assistant. Generate exactly {max_words} contextually specific words for the word "{word}" in {target_language} language.
+
+    AGE GUIDANCE: {age_guidance}
+
+    CRITICAL REQUIREMENTS:
+    - Each word must be SPECIFICALLY related to "{word}" and its context
+    - Choose words appropriate for a {age_label} year old
+    - Avoid generic words like "happy", "friend", "big", "small" unless they are truly specific to "{word}"
+    - Choose words that would naturally appear in a story specifically about "{word}"
+    - Include words that are part of the same semantic field or scenario
+    - Ensure all words are age-appropriate and educational
+
+    Examples for different words (age-appropriate):
+    - For "sun" (toddler): bright, hot, yellow, sky, day, warm, shine, light
+    - For "dog" (preschool): bark, tail, pet, walk, bone, play, furry, friend
+    - For "tree" (elementary): leaf, branch, grow, green, tall, forest, nature, plant
+    - For "book" (older child): read, story, page, learn, library, knowledge, words, imagination
+
+    {format_instructions}
+""")
+
+# Only needed when Gemini is not constrained by a response schema
+RELATED_WORDS_FORMAT_TEMPLATE = PromptTemplate("related_words_format", """
+    RESPONSE FORMAT - YOU MUST RETURN ONLY VALID JSON:
+    [
+      {{"english": "word1", "translation": "translation1"}},
+      {{"english": "word2", "translation": "translation2"}}
+    ]
+
+    CRITICAL:
+    - Return ONLY the JSON array, with no explanations or markdown formatting
+    - The array must contain exactly {max_words} items, each with "english" and "translation" fields
+""")
+
+TRANSLATE_TEMPLATE = PromptTemplate("translate", """
+    Translate the word or phrase "{term}" to {language}.
+
+    {format_instructions}
+
+    Make sure the explanation is helpful for language learners and includes:
+    - Pronunciation hints if relevant
+    - Common usage examples
+    - Any cultural context
+    - Grammar notes if applicable
+
+    For the examples, generate 3 simple example sentences that a kid would understand. Make them engaging and educational.{child_age_info}
+""")
+
+# Only needed when Gemini is not constrained by a response schema
+TRANSLATE_FORMAT_TEMPLATE = PromptTemplate("translate_format", """
+    Please provide your response in the following JSON format, with no additional text:
+    {{
+        "translation": "the translated word or phrase",
+        "explanation": "a brief explanation of the translation, including any cultural context, usage notes, or grammar explanations",
+        "examples": ["example sentence 1", "example sentence 2", "example sentence 3"]
+    }}
+""")
+
+IMAGE_TEMPLATE = PromptTemplate("image", """
+    Create a simple, colorful educational illustration for children learning {target_language}.
+
+    CRITICAL REQUIREMENTS:
+    - DO NOT include any text, words, letters, labels, captions or writing in the image
+    - Show ONLY a visual illustration of "{original_word}" (which means "{translated_word}" in {target_language})
+    - Use bright, child-friendly colors
+    - Simple cartoon style with clean lines
+    - White background
+    - Fill the entire canvas with a large, prominent illustration
+
+    Style: Simple, educational, colorful, child-friendly, clean design, full canvas utilization, ABSOLUTELY NO TEXT
+
+    {word_type_guidance}
+    {custom_instructions}
+""")
+
+PROMPT_ENDPOINTS = ("story", "related_words", "translate", "image")
+
+# Fixed (template-only) token cost per endpoint, for comparison with the averages
+TEMPLATE_TOKENS = {
+    "story": STORY_TEMPLATE.static_tokens,
+    "related_words": RELATED_WORDS_TEMPLATE.static_tokens,
+    "translate": TRANSLATE_TEMPLATE.static_tokens,
+    "image": IMAGE_TEMPLATE.static_tokens,
+}
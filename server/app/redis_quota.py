@@ -127,6 +127,68 @@ def check_and_increment_quota(user_id: str, content_type: str) -> bool:
         # In case of error, allow the request (fail open)
         return True
 
+def reserve_quota(user_id: str, content_type: str, amount: int) -> bool:
+    """
+    Atomically reserve `amount` units of quota, all or nothing.
+    Returns True if reserved, False if the whole amount doesn't fit.
+    """
+    if content_type not in QUOTA_LIMITS or amount <= 0:
+        return True
+
+    limit = QUOTA_LIMITS[content_type]
+    if limit == -1:
+        return True  # Unlimited
+
+    key = get_quota_key(user_id, content_type)
+
+    try:
+        lua_script = """
+        local current = tonumber(redis.call('get', KEYS[1]) or 0)
+        local amount = tonumber(ARGV[1])
+
+        if current + amount <= tonumber(ARGV[2]) then
+            redis.call('incrby', KEYS[1], amount)
+            redis.call('expire', KEYS[1], ARGV[3])
+            return 1
+        else
+            return 0
+        end
+        """
+
+        result = redis_client.eval(lua_script, 1, key, amount, limit, 86400)
+        return bool(result)
+
+    except Exception as e:
+        print(f"Error reserving quota: {e}")
+        # In case of error, allow the request (fail open)
+        return True
+
+def release_quota(user_id: str, content_type: str, amount: int) -> bool:
+    """Give back reserved quota that wasn't used, without going below 0"""
+    if content_type not in QUOTA_LIMITS or amount <= 0:
+        return True
+
+    limit = QUOTA_LIMITS[content_type]
+    if limit == -1:
+        return True  # Unlimited
+
+    key = get_quota_key(user_id, content_type)
+
+    try:
+        redis_client.eval("""
+            local current = tonumber(redis.call('get', KEYS[1]) or 0)
+            local amount = math.min(current, tonumber(ARGV[1]))
+            if amount > 0 then
+                redis.call('decrby', KEYS[1], amount)
+            end
+            return current - amount
+        """, 1, key, amount)
+        return True
+
+    except Exception as e:
+        print(f"Error releasing quota: {e}")
+        return False
+
 def decrement_quota(user_id: str, content_type: str) -> bool:
     """Decrement quota for a user (useful for failed operations). Returns True if successful."""
     if content_type not in QUOTA_LIMITS:
@@ -0,0 +1,74 @@
+import os
+import json
+from typing import List, Optional
+
+from .redis_quota import redis_client
+from .lexicon import normalize_term
+
+# Related words depend only on the word, language, age bucket and count, so
+# they are shared across users. Lists are stored once per (word, language,
+# age bucket); smaller max_words requests are served by slicing the stored list.
+RELATED_WORDS_CACHE_ENABLED = os.getenv("RELATED_WORDS_CACHE_ENABLED", "true").lower() == "true"
+RELATED_WORDS_CACHE_TTL = int(os.getenv("RELATED_WORDS_CACHE_TTL", str(30 * 24 * 3600)))  # 30 days
+
+
+def age_bucket(child_age: Optional[int]) -> str:
+    """Map a child age onto the age bands used by the related-words prompt"""
+    if not child_age:
+        return "any"
+    if child_age <= 3:
+        return "toddler"
+    if child_age <= 5:
+        return "preschool"
+    if child_age <= 8:
+        return "elementary"
+    if child_age <= 12:
+        return "older"
+    return "any"
+
+
+def get_related_words_key(word: str, target_language: str, child_age: Optional[int]) -> str:
+    return f"related_words:{target_language.strip().lower()}:{age_bucket(child_age)}:{normalize_term(word)}"
+
+
+def get_cached_related_words(
+    word: str,
+    target_language: str,
+    child_age: Optional[int],
+    max_words: int
+) -> Optional[List[dict]]:
+    """Return the first max_words cached related words, or None if fewer are cached"""
+    if not RELATED_WORDS_CACHE_ENABLED:
+        return None
+    try:
+        raw = redis_client.get(get_related_words_key(word, target_language, child_age))
+    except Exception as e:
+        print(f"Redis error reading related words cache: {e}")
+        return None
+    if not raw:
+        return None
+    related_words = json.loads(raw)
+    if len(related_words) < max_words:
+        return None
+    return related_words[:max_words]
+
+
+def cache_related_words(
+    word: str,
+    target_language: str,
+    child_age: Optional[int],
+    related_words: List[dict]
+) -> bool:
+    """Store a related words list unless a longer one is already cached"""
+    if not RELATED_WORDS_CACHE_ENABLED or not related_words:
+        return False
+    key = get_related_words_key(word, target_language, child_age)
+    try:
+        raw = redis_client.get(key)
+        if raw and len(json.loads(raw)) >= len(related_words):
+            return False
+        redis_client.setex(key, RELATED_WORDS_CACHE_TTL, json.dumps(related_words, ensure_ascii=False))
+        return True
+    except Exception as e:
+        print(f"Redis error writing related words cache: {e}")
+        return False
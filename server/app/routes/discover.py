@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func, or_, and_
+from sqlalchemy import text, func, and_
 from typing import List, Optional
 from ..database import get_db
-from ..models import Flashcard, Story, Image, Translation
+from ..auth import get_current_user_if_authenticated
+from ..view_counter import record_story_view, get_pending_views, get_unique_viewers, get_top_pending_story_ids, live_view_count
+from ..models import Flashcard, Story, Image, Translation, User
+from ..projections import (
+    STORY_FIELDS, STORY_SUMMARY_FIELDS, IMAGE_SUMMARY_FIELDS, DISCOVER_ITEM_FIELDS, DISCOVER_SUMMARY_FIELDS, DISCOVER_REQUIRED_FIELDS,
+    parse_fields, load_fields
+)
+from ..search import search_stories, search_words, count_stories, count_words, StorySearchResult, WordSearchResult
 from ..schemas import Flashcard as FlashcardSchema, Story as StorySchema, Image as ImageSchema, Translation as TranslationSchema
 from datetime import datetime, timedelta
 
@@ -17,6 +24,19 @@ AGE_GROUPS = {
     "middle_school": (11, 13)
 }
 
+
+def normalize_search_ranks(items: list) -> None:
+    """
+    Scale one content type's search ranks to 0-1 by its best match.
+
+    Story ranks (ts_rank_cd) and word scores (similarity plus a substring
+    bonus) are on different scales, so each type's best match becomes 1
+    before the merged feed is sorted on them.
+    """
+    best = max((item["search_rank"] or 0 for item in items), default=0) or 1
+    for item in items:
+        item["search_rank"] = (item["search_rank"] or 0) / best
+
 @router.get("/")
 async def discover_content(
     search: Optional[str] = Query(None, description="Search term for original word, translation, or story content"),
@@ -25,37 +45,59 @@ async def discover_content(
     content_type: Optional[str] = Query(None, description="Filter by content type (flashcards, stories, images, translations)"),
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(20, ge=1, le=100, description="Number of items to return"),
+    fields: Optional[str] = Query(None, description="Comma-separated item fields to return, or 'summary' (default) / 'full'"),
     db: Session = Depends(get_db)
 ):
     """
     Discover public content with search and filtering capabilities.
-    Returns a unified feed of all content types in descending order by creation time.
+    Returns a unified feed of all content types in descending order by creation time,
+    or by search rank when `search` is given.
+    Stories come with story_snippet; the full text is only included when
+    story_content is selected in `fields`, otherwise it is fetched from
+    /discover/stories/{story_id}.
     """
+    selected = parse_fields(fields, DISCOVER_ITEM_FIELDS, DISCOVER_SUMMARY_FIELDS, required=DISCOVER_REQUIRED_FIELDS)
+    story_columns = load_fields(Story, STORY_FIELDS if "story_content" in selected else STORY_SUMMARY_FIELDS)
+    # Each content type contributes its first skip + limit items; the page is
+    # cut once from the merged feed. The total counts every match.
+    window = skip + limit
     try:
         content_items = []
+        total_items = 0
         
         # Get flashcards
         if not content_type or content_type == "flashcards":
-            flashcard_query = db.query(Flashcard)
-            
-            # Apply search filter
             if search:
-                search_term = f"%{search}%"
-                flashcard_query = flashcard_query.filter(
-                    or_(
-                        Flashcard.original_word.ilike(search_term),
-                        Flashcard.translated_word.ilike(search_term)
-                    )
+                # Trigram search, ranked by similarity (typo tolerant)
+                flashcard_results = search_words(
+                    db,
+                    Flashcard,
+                    [Flashcard.original_word, Flashcard.translated_word],
+                    search,
+                    filters=[Flashcard.target_language == language] if language else None,
+                    limit=window
                 )
+                total_items += count_words(
+                    db,
+                    Flashcard,
+                    [Flashcard.original_word, Flashcard.translated_word],
+                    search,
+                    filters=[Flashcard.target_language == language] if language else None
+                )
+            else:
+                flashcard_query = db.query(Flashcard)
+                
+                # Apply language filter
+                if language:
+                    flashcard_query = flashcard_query.filter(Flashcard.target_language == language)
+                
+                flashcards = flashcard_query.order_by(Flashcard.created_at.desc()).limit(window).all()
+                flashcard_results = [WordSearchResult(flashcard, None) for flashcard in flashcards]
+                total_items += flashcard_query.order_by(None).count()
             
-            # Apply language filter
-            if language:
-                flashcard_query = flashcard_query.filter(Flashcard.target_language == language)
-            
-            flashcards = flashcard_query.order_by(Flashcard.created_at.desc()).offset(skip).limit(limit).all()
-            
-            for flashcard in flashcards:
-                content_items.append({
+            flashcard_items = []
+            for flashcard, score in flashcard_results:
+                flashcard_items.append({
                     "id": flashcard.id,
                     "content_type": "flashcard",
                     "original_word": flashcard.original_word,
@@ -64,43 +106,61 @@ async def discover_content(
                     "example_sentences": flashcard.example_sentences,
                     "created_at": flashcard.created_at.isoformat() if flashcard.created_at else None,
                     "story_title": None,
+                    "story_snippet": None,
                     "story_content": None,
                     "story_theme": None,
                     "target_age_range": None,
                     "image_url": None,
+                    "thumbnail_url": None,
+                    "medium_url": None,
                     "translation": None,
                     "explanation": None,
+                    "search_rank": score,
+                    "search_snippet": None,
                     "user": {
                         "email": flashcard.user.email if flashcard.user else None
                     }
                 })
+            if search:
+                normalize_search_ranks(flashcard_items)
+            content_items += flashcard_items
         
         # Get stories
         if not content_type or content_type == "stories":
-            story_query = db.query(Story)
-            
-            # Apply search filter
             if search:
-                search_term = f"%{search}%"
-                story_query = story_query.filter(
-                    or_(
-                        Story.story_title.ilike(search_term),
-                        Story.story_content.ilike(search_term)
-                    )
+                # Ranked full-text search over the stories.search_vector GIN index
+                results = search_stories(
+                    db,
+                    search,
+                    language=language,
+                    age_group=age_group if age_group in AGE_GROUPS else None,
+                    limit=window,
+                    options=[story_columns]
                 )
+                total_items += count_stories(
+                    db,
+                    search,
+                    language=language,
+                    age_group=age_group if age_group in AGE_GROUPS else None
+                )
+            else:
+                story_query = db.query(Story).options(story_columns)
+                
+                # Apply language filter
+                if language:
+                    story_query = story_query.filter(Story.target_language == language)
+                
+                # Apply age group filter
+                if age_group and age_group in AGE_GROUPS:
+                    story_query = story_query.filter(Story.target_age_range == age_group)
+                
+                stories = story_query.order_by(Story.created_at.desc()).limit(window).all()
+                results = [StorySearchResult(story, None, None) for story in stories]
+                total_items += story_query.order_by(None).count()
             
-            # Apply language filter
-            if language:
-                story_query = story_query.filter(Story.target_language == language)
-            
-            # Apply age group filter
-            if age_group and age_group in AGE_GROUPS:
-                story_query = story_query.filter(Story.target_age_range == age_group)
-            
-            stories = story_query.order_by(Story.created_at.desc()).offset(skip).limit(limit).all()
-            
-            for story in stories:
-                content_items.append({
+            story_items = []
+            for story, rank, snippet in results:
+                story_items.append({
                     "id": story.id,
                     "content_type": "story",
                     "original_word": None,
@@ -109,39 +169,62 @@ async def discover_content(
                     "example_sentences": None,
                     "created_at": story.created_at.isoformat() if story.created_at else None,
                     "story_title": story.story_title,
-                    "story_content": story.story_content,
+                    "story_snippet": story.story_snippet,
+                    "story_content": story.story_content if "story_content" in selected else None,
                     "story_theme": story.story_theme,
                     "target_age_range": story.target_age_range,
                     "image_url": None,
+                    "thumbnail_url": None,
+                    "medium_url": None,
                     "translation": None,
                     "explanation": None,
+                    "search_rank": rank,
+                    "search_snippet": snippet,
                     "user": {
                         "email": story.user.email if story.user else None
                     }
                 })
+            if search:
+                normalize_search_ranks(story_items)
+            content_items += story_items
         
         # Get images
         if not content_type or content_type == "images":
-            image_query = db.query(Image).filter(Image.status == "completed")
-            
-            # Apply search filter
             if search:
-                search_term = f"%{search}%"
-                image_query = image_query.filter(
-                    or_(
-                        Image.original_word.ilike(search_term),
-                        Image.translated_word.ilike(search_term)
-                    )
+                # Trigram search, ranked by similarity (typo tolerant)
+                image_filters = [Image.status == "completed"]
+                if language:
+                    image_filters.append(Image.target_language == language)
+                image_results = search_words(
+                    db,
+                    Image,
+                    [Image.original_word, Image.translated_word],
+                    search,
+                    filters=image_filters,
+                    limit=window,
+                    options=[load_fields(Image, IMAGE_SUMMARY_FIELDS)]
                 )
+                total_items += count_words(
+                    db,
+                    Image,
+                    [Image.original_word, Image.translated_word],
+                    search,
+                    filters=image_filters
+                )
+            else:
+                image_query = db.query(Image).options(load_fields(Image, IMAGE_SUMMARY_FIELDS)).filter(Image.status == "completed")
+                
+                # Apply language filter
+                if language:
+                    image_query = image_query.filter(Image.target_language == language)
+                
+                images = image_query.order_by(Image.created_at.desc()).limit(window).all()
+                image_results = [WordSearchResult(image, None) for image in images]
+                total_items += image_query.order_by(None).count()
             
-            # Apply language filter
-            if language:
-                image_query = image_query.filter(Image.target_language == language)
-            
-            images = image_query.order_by(Image.created_at.desc()).offset(skip).limit(limit).all()
-            
-            for image in images:
-                content_items.append({
+            image_items = []
+            for image, score in image_results:
+                image_items.append({
                     "id": image.id,
                     "content_type": "image",
                     "original_word": image.original_word,
@@ -150,23 +233,37 @@ async def discover_content(
                     "example_sentences": None,
                     "created_at": image.created_at.isoformat() if image.created_at else None,
                     "story_title": None,
+                    "story_snippet": None,
                     "story_content": None,
                     "story_theme": None,
                     "target_age_range": None,
                     "image_url": image.image_url,
+                    "thumbnail_url": image.thumbnail_url,
+                    "medium_url": image.medium_url,
                     "translation": None,
                     "explanation": None,
+                    "search_rank": score,
+                    "search_snippet": None,
                     "user": {
                         "email": image.user.email if image.user else None
                     }
                 })
+            if search:
+                normalize_search_ranks(image_items)
+            content_items += image_items
         
-        # Sort all content by creation date (newest first)
-        content_items.sort(key=lambda x: x["created_at"], reverse=True)
+        if search:
+            # Best matches first (ranks are 0-1 within each type), newest first on ties
+            content_items.sort(key=lambda x: (x["search_rank"] or 0, x["created_at"] or ""), reverse=True)
+        else:
+            # Sort all content by creation date (newest first)
+            content_items.sort(key=lambda x: x["created_at"] or "", reverse=True)
         
         # Apply pagination to the combined results
-        total_items = len(content_items)
-        paginated_items = content_items[skip:skip + limit]
+        paginated_items = [
+            {field: item[field] for field in selected}
+            for item in content_items[skip:skip + limit]
+        ]
         
         return {
             "items": paginated_items,
@@ -208,8 +305,18 @@ async def get_trending_content(
     Get trending content based on view count and recent activity.
     """
     try:
-        # Get trending stories (by view count)
-        trending_stories = db.query(Story).order_by(Story.view_count.desc(), Story.created_at.desc()).limit(limit).all()
+        # Get trending stories by live view count: the flushed count plus
+        # views still pending in Redis. Stories with many pending views may
+        # not yet rank by their stored count, so they are candidates too.
+        candidates = db.query(Story).order_by(Story.view_count.desc(), Story.created_at.desc()).limit(limit).all()
+        candidate_ids = {story.id for story in candidates}
+        pending_ids = [story_id for story_id in get_top_pending_story_ids(limit) if story_id not in candidate_ids]
+        if pending_ids:
+            candidates += db.query(Story).filter(Story.id.in_(pending_ids)).all()
+        pending_views = get_pending_views(story.id for story in candidates)
+        candidates.sort(key=lambda story: (live_view_count(story, pending_views), story.created_at), reverse=True)
+        trending_stories = candidates[:limit]
+        unique_viewers = get_unique_viewers(story.id for story in trending_stories)
         
         # Get recent content (last 7 days)
         recent_date = datetime.now() - timedelta(days=7)
@@ -226,7 +333,8 @@ async def get_trending_content(
                 "title": story.story_title,
                 "target_language": story.target_language,
                 "target_age_range": story.target_age_range,
-                "view_count": story.view_count,
+                "view_count": live_view_count(story, pending_views),
+                "unique_viewers": unique_viewers.get(story.id),
                 "created_at": story.created_at.isoformat()
             })
         
@@ -246,6 +354,7 @@ async def get_trending_content(
                 "title": image.original_word,
                 "target_language": image.target_language,
                 "image_url": image.image_url,
+                "thumbnail_url": image.thumbnail_url,
                 "created_at": image.created_at.isoformat()
             })
         
@@ -262,6 +371,43 @@ async def get_trending_content(
             detail=f"Error retrieving trending content: {str(e)}"
         )
 
+@router.get("/stories/{story_id}", response_model=StorySchema)
+async def get_public_story(story_id: int, db: Session = Depends(get_db)):
+    """Full text of a public story, for feed items that only carry a snippet"""
+    story = db.query(Story).filter(Story.id == story_id).first()
+    if not story:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Story not found"
+        )
+    return story
+
+@router.post("/stories/{story_id}/view", status_code=status.HTTP_202_ACCEPTED)
+async def record_story_view_endpoint(
+    story_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_if_authenticated)
+):
+    """
+    Count a view of a public story.
+
+    Views are buffered in Redis and flushed to the database periodically.
+    Signed-in viewers are identified by user id, anonymous ones by IP, for
+    the unique viewer estimate.
+    """
+    if not db.query(Story.id).filter(Story.id == story_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Story not found"
+        )
+    if current_user:
+        viewer_id = f"user:{current_user.id}"
+    else:
+        viewer_id = f"ip:{request.client.host if request.client else 'unknown'}"
+    record_story_view(db, story_id, viewer_id)
+    return {"story_id": story_id, "recorded": True}
+
 @router.get("/stats")
 async def get_discovery_stats(db: Session = Depends(get_db)):
     """
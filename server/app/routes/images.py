@@ -1,271 +1,231 @@
 import os
-import time
-import base64
-from datetime import datetime
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import get_db, engine
-from app.models import Image as ImageModel, User
-from app.schemas import Image, ImageCreate, ImageUpdate, ImageGenerationRequest
+from app.database import get_db
+from app.models import User, Image as ImageModel
+from app.schemas import Image, ImageSummary, ImageCreate, ImageUpdate, ImageGenerationRequest, ImageBatchGenerationRequest
 from app.crud import create_image, get_image, update_image, delete_image, update_image_status, get_images
 from app.auth import get_current_user
-from app.storage import storage_manager
-from app.redis_quota import check_and_increment_quota, check_quota_only, get_remaining_quota, has_pending_generation, start_generation, end_generation
+from app.image_worker import image_worker
+from app.image_events import watch_image_status
+from app.image_metrics import new_trace_id, get_image_metrics_report
+from app.sse import format_sse
+from app.image_cache import IMAGE_CACHE_HITS_COUNT_QUOTA, image_cache_key, find_cached_image
+from app.projections import IMAGE_FIELDS, IMAGE_SUMMARY_FIELDS, parse_fields, project
+from app.prompts import IMAGE_TEMPLATE, PROMPT_CUSTOM_TEXT_MAX_CHARS, PROMPT_FIELD_MAX_CHARS, cap_text, record_prompt
+from app.redis_quota import get_remaining_quota, has_pending_generation, reserve_quota, release_quota, start_generation, end_generation
 
 router = APIRouter(prefix="/images", tags=["images"])
 
+# Imagen returns at most this many images per call
+IMAGEN_MAX_IMAGES_PER_CALL = 4
+# Most images one request can ask for (number_of_images, summed over a batch)
+IMAGE_BATCH_MAX_IMAGES = int(os.getenv("IMAGE_BATCH_MAX_IMAGES", "20"))
 
-def generate_image_sync(image_id: int, prompt: str, user_id: str):
-    """Synchronous background task to generate image using Imagen API"""
-    # Create a new database session for the background task
-    db = Session(engine)
-    try:
-        # Get the image record to access the word and translation
-        image = db.query(ImageModel).filter(ImageModel.id == image_id).first()
-        if not image:
-            print(f"Image record not found for ID: {image_id}")
-            update_image_status(db, image_id, "failed")
-            # Mark generation as ended
-            end_generation(user_id, 'image')
-            return
-        
-        # Import Vertex AI
-        import vertexai
-        from vertexai.preview.vision_models import ImageGenerationModel
-        
-        # Initialize Vertex AI with fresh connection
-        project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "vocabloom-467020")
-        location = "us-central1"
-        
-        # Reset and reinitialize Vertex AI to ensure clean state
+
+def begin_image_generation(user_id: str, count: int, quota: Optional[int] = None):
+    """
+    Start tracking `count` image generations.
+
+    Quota (`count` units unless `quota` is given, e.g. to also charge
+    reused images) is reserved in one atomic step, so a request either fits
+    in the remaining quota or is rejected as a whole. Redis failures are
+    logged and let the generation through.
+
+    Raises:
+        HTTPException: 429 if a generation is already pending or the request
+            doesn't fit in the remaining quota
+    """
+    quota = count if quota is None else quota
+    if count:
+        # Check if user has pending generations with better error handling
         try:
-            vertexai.init(project=project_id, location=location)
-            print(f"Vertex AI initialized for project: {project_id}")
-        except Exception as init_error:
-            print(f"Vertex AI init error: {init_error}")
-            update_image_status(db, image_id, "failed")
-            # Mark generation as ended
-            end_generation(user_id, 'image')
-            return
-        
-        print(f"Generating image with Imagen for: {image.original_word} -> {image.translated_word}")
-        
-        # Load the ImageGenerationModel for Imagen
-        model = ImageGenerationModel.from_pretrained("imagen-4.0-generate-preview-06-06")
-        
-        # Generate images from the text prompt
-        print(f"Calling Imagen API with prompt: {prompt[:100]}...")
-        images = model.generate_images(
-            prompt=prompt,
-            number_of_images=1
+            pending = has_pending_generation(user_id, 'image')
+        except Exception as redis_error:
+            print(f"Redis error during pending generation check: {redis_error}")
+            # If Redis fails, we'll continue but log the issue
+            # This prevents Redis issues from blocking users completely
+            pending = False
+        if pending:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="You already have an image generation in progress. Please wait for it to complete before starting another one. If this persists, try clearing your pending generation in the My Images page."
+            )
+
+    if not reserve_quota(user_id, 'image', quota):
+        quota_info = get_remaining_quota(user_id, 'image')
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Daily image generation limit reached. This request needs {quota} images and you have {quota_info['remaining']} left today. Please try again tomorrow."
         )
-        print(f"API call completed successfully")
-        
-        print(f"Successfully generated {len(images.images)} image(s).")
-        
-        if images.images:
-            # Get the first generated image
-            generated_image = images.images[0]
-            
-            # Check if there's any generated title or description (simple field access only)
-            generated_title = None
-            if hasattr(generated_image, 'caption') and generated_image.caption:
-                generated_title = generated_image.caption
-            elif hasattr(generated_image, 'description') and generated_image.description:
-                generated_title = generated_image.description
-            
-            # Get the image bytes directly (working approach)
-            img_byte_arr = generated_image._image_bytes
-            
-            # Generate filename
-            filename = f"imagen_{image_id}_{int(time.time())}.png"
-            
-            # Upload to Google Cloud Storage
-            try:
-                image_url = storage_manager.upload_image_from_bytes(
-                    img_byte_arr,
-                    filename,
-                    "image/png"
-                )
-                
-                print(f"Image uploaded successfully: {image_url}")
-                
-                # Update the image with the GCS URL and any generated title
-                if generated_title:
-                    print(f"Generated title: {generated_title}")
-                    update_image_status(db, image_id, "completed", image_url, generated_title)
-                else:
-                    update_image_status(db, image_id, "completed", image_url)
-                
-                # Mark generation as ended
-                end_generation(user_id, 'image')
-                return
-            except Exception as e:
-                print(f"Error uploading to GCS: {e}")
-                update_image_status(db, image_id, "failed")
-                # Mark generation as ended
-                end_generation(user_id, 'image')
-                return
-        else:
-            print("No images generated")
-            update_image_status(db, image_id, "failed")
-            # Mark generation as ended
-            end_generation(user_id, 'image')
-            return
-                
-    except Exception as e:
-        print(f"Error generating image with Imagen: {e}")
-        import traceback
-        traceback.print_exc()
-        # Mark as failed
-        update_image_status(db, image_id, "failed")
-        # Mark generation as ended
-        end_generation(user_id, 'image')
-    finally:
-        db.close()
 
+    if count:
+        # Tracking starts before the jobs are queued, since a worker may
+        # finish (and call end_generation) before the request returns
+        try:
+            start_generation(user_id, 'image')
+        except Exception as start_error:
+            print(f"Error starting generation tracking: {start_error}")
+            # Continue even if Redis fails for generation tracking
 
 
+def validate_image_count(count: int):
+    if count < 1 or count > IMAGE_BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Between 1 and {IMAGE_BATCH_MAX_IMAGES} images can be generated per request"
+        )
+
+
+def build_image_prompt(request: ImageGenerationRequest) -> str:
+    """Render and record the Imagen prompt for a word"""
+    # Add simple word type guidance
+    original_word_lower = request.original_word.lower()
+    
+    if any(word in original_word_lower for word in ['run', 'jump', 'walk', 'eat', 'sleep', 'play', 'dance', 'sing', 'read', 'write']):
+        word_type_guidance = "Show the action being performed visually (no text)."
+    elif any(word in original_word_lower for word in ['big', 'small', 'tall', 'short', 'fast', 'slow', 'hot', 'cold', 'happy', 'sad']):
+        word_type_guidance = "Show contrasting examples to illustrate the concept visually (no text)."
+    elif any(word in original_word_lower for word in ['red', 'blue', 'green', 'yellow', 'orange', 'purple', 'pink', 'brown', 'black', 'white']):
+        word_type_guidance = "Show the color prominently (no text labels)."
+    else:
+        word_type_guidance = "Show the object/concept clearly (no text)."
+    
+    custom_instructions = cap_text(request.custom_instructions, PROMPT_CUSTOM_TEXT_MAX_CHARS)
+    
+    # Create the generation prompt
+    base_prompt = IMAGE_TEMPLATE.render(
+        target_language=request.target_language,
+        original_word=cap_text(request.original_word, PROMPT_FIELD_MAX_CHARS),
+        translated_word=cap_text(request.translated_word, PROMPT_FIELD_MAX_CHARS),
+        word_type_guidance=word_type_guidance,
+        custom_instructions=f"Additional instructions: {custom_instructions}" if custom_instructions else ""
+    )
+    record_prompt("image", base_prompt)
+    return base_prompt
+
+
+def create_reused_image(db: Session, request: ImageGenerationRequest, cached_image: ImageModel, cache_key: str, user_id: str) -> ImageModel:
+    """Add a completed image that shares a cached image's blob (see image_cache.py)"""
+    return create_image(
+        db,
+        ImageCreate(
+            original_word=request.original_word,
+            translated_word=request.translated_word,
+            target_language=request.target_language,
+            generation_prompt=cached_image.generation_prompt,
+            custom_instructions=request.custom_instructions,
+            child_age=request.child_age,
+            title=request.title or cached_image.title
+        ),
+        user_id,
+        cache_key=cache_key,
+        status="completed",
+        image_url=cached_image.image_url,
+        thumbnail_url=cached_image.thumbnail_url,
+        medium_url=cached_image.medium_url,
+        renditions=cached_image.renditions,
+        phash=cached_image.phash
+    )
+
+
+def create_pending_images(db: Session, request: ImageGenerationRequest, prompt: str, cache_key: str, user_id: str,
+                          trace_id: str) -> List[ImageModel]:
+    """One pending image row per requested output"""
+    image_data = ImageCreate(
+        original_word=request.original_word,
+        translated_word=request.translated_word,
+        target_language=request.target_language,
+        generation_prompt=prompt,
+        custom_instructions=request.custom_instructions,
+        child_age=request.child_age,
+        title=request.title
+    )
+    return [
+        create_image(db, image_data, user_id, cache_key=cache_key, trace_id=trace_id)
+        for _ in range(request.number_of_images)
+    ]
 
 
-def update_image_status(db: Session, image_id: int, status: str, image_url: str = None, title: str = None):
-    """Update image status and optionally the image URL and title"""
+def queue_image_jobs(db: Session, user_id: str, groups: Dict[str, List[int]], trace_id: str):
+    """
+    Queue the pending images, one Imagen call per prompt (split into calls
+    of up to IMAGEN_MAX_IMAGES_PER_CALL images).
+
+    If queueing fails, the images not yet queued are marked failed and their
+    quota is released before re-raising.
+    """
+    unqueued = [image_id for image_ids in groups.values() for image_id in image_ids]
     try:
-        image = db.query(ImageModel).filter(ImageModel.id == image_id).first()
-        if image:
-            image.status = status
-            if image_url:
-                image.image_url = image_url
-            if title:
-                image.title = title
-            image.updated_at = datetime.utcnow()
-            db.commit()
-    except Exception as e:
-        print(f"Error updating image status: {e}")
+        for prompt, image_ids in groups.items():
+            for start in range(0, len(image_ids), IMAGEN_MAX_IMAGES_PER_CALL):
+                chunk = image_ids[start:start + IMAGEN_MAX_IMAGES_PER_CALL]
+                image_worker.submit(db, chunk, prompt, user_id, trace_id)
+                unqueued = [image_id for image_id in unqueued if image_id not in chunk]
+    except Exception:
         db.rollback()
+        for image_id in unqueued:
+            update_image_status(db, image_id, "failed")
+        release_quota(user_id, 'image', len(unqueued))
+        if len(unqueued) == sum(len(image_ids) for image_ids in groups.values()):
+            end_generation(user_id, 'image')
+        raise
 
 
 @router.post("/generate")
 async def generate_image(
     request: ImageGenerationRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    x_cloud_trace_context: Optional[str] = Header(None)
 ):
-    """Start image generation process"""
+    """
+    Start image generation process.
+
+    `number_of_images` variants of the word are generated in one Imagen
+    call, each stored as its own image; `ids` lists them all. `trace_id`
+    identifies the generation in worker logs and image metrics.
+    """
+    validate_image_count(request.number_of_images)
+    trace_id = new_trace_id(x_cloud_trace_context)
     try:
-        # Check if user has pending generations with better error handling
-        try:
-            has_pending = has_pending_generation(current_user.id, 'image')
-            if has_pending:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="You already have an image generation in progress. Please wait for it to complete before starting another one. If this persists, try clearing your pending generation in the My Images page."
-                )
-        except Exception as redis_error:
-            print(f"Redis error during pending generation check: {redis_error}")
-            # If Redis fails, we'll continue but log the issue
-            # This prevents Redis issues from blocking users completely
-        
-        # Check quota before starting generation
-        try:
-            if not check_quota_only(current_user.id, 'image'):
-                quota_info = get_remaining_quota(current_user.id, 'image')
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Daily image generation limit reached. You have used {quota_info['used']}/{quota_info['limit']} images today. Please try again tomorrow."
-                )
-        except Exception as quota_error:
-            print(f"Redis error during quota check: {quota_error}")
-            # If Redis fails during quota check, we'll continue but log the issue
-            # This prevents Redis issues from blocking users completely
-        
-        # Build the generation prompt
-        age_guidance = ""
-        if request.child_age:
-            if request.child_age <= 3:
-                age_guidance = "very simple, colorful, child-friendly, safe for toddlers, large simple objects, basic shapes"
-            elif 4 <= request.child_age <= 5:
-                age_guidance = "simple, engaging, educational, safe for preschoolers, clear objects, bright colors"
-            elif 6 <= request.child_age <= 10:
-                age_guidance = "engaging, educational, age-appropriate for elementary school, detailed but clear, colorful"
-            elif 11 <= request.child_age <= 13:
-                age_guidance = "more detailed, educational, suitable for middle school, sophisticated but still colorful and clear"
-            else:
-                age_guidance = "engaging and educational for children, colorful and clear"
-        else:
-            age_guidance = "engaging and educational for children, colorful and clear"
-        
-        # Create the generation prompt
-        base_prompt = f"""
-        Create a simple, colorful educational illustration for children learning {request.target_language}.
-
-        CRITICAL REQUIREMENTS:
-        - DO NOT include any text, words, letters, or writing in the image
-        - DO NOT include any labels, captions, or text overlays
-        - DO NOT include any metadata, instructions, or technical information
-        - The image should be completely text-free
-        - Show ONLY a visual illustration of "{request.original_word}" (which means "{request.translated_word}" in {request.target_language})
-        - Use bright, child-friendly colors
-        - Simple cartoon style with clean lines
-        - White background
-        - Focus only on the visual representation of the word/concept
-        - Fill the entire canvas with the illustration
-        - Use the full available space effectively
-        - Make the illustration large and prominent
-
-        Style: Simple, educational, colorful, child-friendly, clean design, full canvas utilization, ABSOLUTELY NO TEXT
-        """
-        
-        # Add simple word type guidance
-        original_word_lower = request.original_word.lower()
+        # Identical requests reuse a completed image instead of calling Imagen
+        cache_key = image_cache_key(request)
+        reuse = request.allow_reuse and request.number_of_images == 1
+        cached_image = find_cached_image(db, cache_key) if reuse else None
+        if cached_image is not None:
+            begin_image_generation(current_user.id, 0, quota=1 if IMAGE_CACHE_HITS_COUNT_QUOTA else 0)
+            db_image = create_reused_image(db, request, cached_image, cache_key, current_user.id)
+            return {
+                "id": db_image.id,
+                "ids": [db_image.id],
+                "status": "completed",
+                "image_url": db_image.image_url,
+                "thumbnail_url": db_image.thumbnail_url,
+                "cached": True,
+                "message": "An existing image for this word was added to My Images."
+            }
         
-        if any(word in original_word_lower for word in ['run', 'jump', 'walk', 'eat', 'sleep', 'play', 'dance', 'sing', 'read', 'write']):
-            base_prompt += "\nShow the action being performed visually (no text)."
-        elif any(word in original_word_lower for word in ['big', 'small', 'tall', 'short', 'fast', 'slow', 'hot', 'cold', 'happy', 'sad']):
-            base_prompt += "\nShow contrasting examples to illustrate the concept visually (no text)."
-        elif any(word in original_word_lower for word in ['red', 'blue', 'green', 'yellow', 'orange', 'purple', 'pink', 'brown', 'black', 'white']):
-            base_prompt += "\nShow the color prominently (no text labels)."
-        else:
-            base_prompt += "\nShow the object/concept clearly (no text)."
-        
-        if request.custom_instructions:
-            base_prompt += f"\nAdditional instructions: {request.custom_instructions}"
-        
-        # Create image record in database
-        image_data = ImageCreate(
-            original_word=request.original_word,
-            translated_word=request.translated_word,
-            target_language=request.target_language,
-            generation_prompt=base_prompt,
-            custom_instructions=request.custom_instructions,
-            child_age=request.child_age,
-            title=request.title
-        )
-        
-        db_image = create_image(db, image_data, current_user.id)
-        
-        # Start background task for image generation
-        background_tasks.add_task(generate_image_sync, db_image.id, base_prompt, current_user.id)
-        
-        # Mark generation as started (with error handling)
+        begin_image_generation(current_user.id, request.number_of_images)
         try:
-            start_generation(current_user.id, 'image')
-        except Exception as start_error:
-            print(f"Error starting generation tracking: {start_error}")
-            # Continue even if Redis fails for generation tracking
+            base_prompt = build_image_prompt(request)
+            db_images = create_pending_images(db, request, base_prompt, cache_key, current_user.id, trace_id)
+        except Exception:
+            release_quota(current_user.id, 'image', request.number_of_images)
+            end_generation(current_user.id, 'image')
+            raise
         
-        # Increment quota now that we're starting generation (with error handling)
-        try:
-            check_and_increment_quota(current_user.id, 'image')
-        except Exception as quota_error:
-            print(f"Error incrementing quota: {quota_error}")
-            # Continue even if Redis fails for quota tracking
+        image_ids = [db_image.id for db_image in db_images]
+        queue_image_jobs(db, current_user.id, {base_prompt: image_ids}, trace_id)
         
         return {
-            "id": db_image.id,
+            "id": image_ids[0],
+            "ids": image_ids,
+            "trace_id": trace_id,
             "status": "pending",
+            "cached": False,
             "message": "Image generation started. You can check the status in My Images page."
         }
         
@@ -279,16 +239,138 @@ async def generate_image(
         )
 
 
-@router.get("/", response_model=List[Image])
+@router.post("/generate/batch")
+async def generate_image_batch(
+    batch: ImageBatchGenerationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    x_cloud_trace_context: Optional[str] = Header(None)
+):
+    """
+    Start generating images for several words at once.
+
+    Quota for the whole batch is reserved atomically. Requests with the same
+    prompt share Imagen calls, and reusable images are added right away.
+    Returns one entry per request, in order: {index, ids, status, cached}
+    plus image_url/thumbnail_url for reused images.
+    """
+    if not batch.requests:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one image request is required"
+        )
+    for index, request in enumerate(batch.requests):
+        if request.number_of_images < 1:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Image {index}: number_of_images must be at least 1"
+            )
+    validate_image_count(sum(request.number_of_images for request in batch.requests))
+    trace_id = new_trace_id(x_cloud_trace_context)
+
+    try:
+        cache_keys = [image_cache_key(request) for request in batch.requests]
+        cached = {}
+        for index, request in enumerate(batch.requests):
+            if request.allow_reuse and request.number_of_images == 1:
+                cached_image = find_cached_image(db, cache_keys[index])
+                if cached_image is not None:
+                    cached[index] = cached_image
+
+        count = sum(request.number_of_images for index, request in enumerate(batch.requests) if index not in cached)
+        begin_image_generation(current_user.id, count, quota=count + (len(cached) if IMAGE_CACHE_HITS_COUNT_QUOTA else 0))
+
+        results = []
+        groups: Dict[str, List[int]] = {}
+        try:
+            for index, request in enumerate(batch.requests):
+                if index in cached:
+                    db_image = create_reused_image(db, request, cached[index], cache_keys[index], current_user.id)
+                    results.append({
+                        "index": index,
+                        "ids": [db_image.id],
+                        "status": "completed",
+                        "image_url": db_image.image_url,
+                        "thumbnail_url": db_image.thumbnail_url,
+                        "cached": True
+                    })
+                    continue
+                base_prompt = build_image_prompt(request)
+                db_images = create_pending_images(db, request, base_prompt, cache_keys[index], current_user.id, trace_id)
+                groups.setdefault(base_prompt, []).extend(db_image.id for db_image in db_images)
+                results.append({
+                    "index": index,
+                    "ids": [db_image.id for db_image in db_images],
+                    "status": "pending",
+                    "cached": False
+                })
+        except Exception:
+            # Nothing was queued: fail the rows created so far and give back the quota
+            db.rollback()
+            for image_ids in groups.values():
+                for image_id in image_ids:
+                    update_image_status(db, image_id, "failed")
+            release_quota(current_user.id, 'image', count)
+            if count:
+                end_generation(current_user.id, 'image')
+            raise
+
+        if groups:
+            queue_image_jobs(db, current_user.id, groups, trace_id)
+
+        return {
+            "images": results,
+            "trace_id": trace_id,
+            "queued": count,
+            "reused": len(cached),
+            "message": "Image generation started. You can check the status in My Images page."
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to start image generation: {str(e)}"
+        )
+
+
+@router.get("/", response_model=List[ImageSummary], response_model_exclude_unset=True)
 async def get_user_images(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get all images for the current user.
+
+    Returns summary fields (no generation prompt or custom instructions)
+    unless others are selected with `fields` (comma-separated, or `full`).
+    """
+    selected = parse_fields(fields, IMAGE_FIELDS, IMAGE_SUMMARY_FIELDS)
+    images = get_images(db, current_user.id, skip=skip, limit=limit, fields=selected)
+    return [project(image, selected) for image in images]
+
+
+@router.get("/worker/stats")
+async def get_image_worker_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all images for the current user"""
-    images = get_images(db, current_user.id, skip=skip, limit=limit)
-    return images
+    """Image job counts by status, this instance's active generations and per-stage timings"""
+    return image_worker.stats(db)
+
+
+@router.get("/metrics")
+async def get_image_pipeline_metrics():
+    """
+    Count, average and p50/p95 latency of every image pipeline stage across
+    instances, by Imagen model and outcome. Like /prompts/stats, this
+    endpoint is public for monitoring.
+    """
+    return get_image_metrics_report()
 
 
 @router.get("/{image_id}", response_model=Image)
@@ -307,6 +389,44 @@ async def get_image_by_id(
     return image
 
 
+@router.get("/{image_id}/events")
+async def image_status_events(
+    image_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Wait for an image to finish generating, as server-sent events.
+
+    Sends one `status` event ({id, status, image_url, thumbnail_url,
+    medium_url, title}) once the image is completed or failed, right away if
+    it already is. Comment lines keep the connection alive while waiting. If
+    the image is still pending after IMAGE_EVENTS_TIMEOUT seconds a `timeout`
+    event is sent and the client can reconnect.
+    """
+    image = get_image(db, image_id, current_user.id)
+    if not image:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+
+    async def events():
+        async for payload in watch_image_status(image_id):
+            if payload is None:
+                yield ": keepalive\n\n"
+            else:
+                yield format_sse("status", payload)
+                return
+        yield format_sse("timeout", {"id": image_id, "status": "pending"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.put("/{image_id}", response_model=Image)
 async def update_image_endpoint(
     image_id: int,
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from ..prompts import get_prompt_token_report
+
+router = APIRouter(prefix="/prompts", tags=["prompts"])
+
+
+@router.get("/stats")
+async def get_prompt_statistics():
+    """
+    Get average estimated input tokens per Gemini endpoint.
+    Like /cache/stats, this endpoint is public for monitoring.
+    """
+    return get_prompt_token_report()
@@ -1,21 +1,260 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, ValidationError
 from ..database import get_db
 from ..models import Story
-from ..schemas import Story as StorySchema, StoryCreate, StoryGenerationRequest
-from ..crud import create_story, get_stories, get_story, delete_story
+from ..schemas import Story as StorySchema, StorySummary, StoryCreate, StoryGenerationRequest, StoryBatchGenerationRequest, StoryGenerateAndSaveRequest, GeneratedStorySummary
+from ..crud import create_story, get_stories, get_story, delete_story, discover_stories
 from ..auth import get_current_user
 from ..models import User
-from ..redis_quota import check_and_increment_quota, check_quota_only, get_remaining_quota, has_pending_generation, start_generation, end_generation
+from ..redis_quota import check_and_increment_quota, check_quota_only, decrement_quota, reserve_quota, release_quota, get_remaining_quota, has_pending_generation, start_generation, end_generation
 from ..secrets import get_gemini_api_key
+from ..story_generation import generate_story_text, stream_story_text, StoryGenerationError
+from ..prompts import RELATED_WORDS_TEMPLATE, RELATED_WORDS_FORMAT_TEMPLATE, PROMPT_FIELD_MAX_CHARS, cap_text, record_prompt
+from ..related_words_cache import get_cached_related_words, cache_related_words
+from ..story_pool import get_pooled_story, add_pooled_story
+from ..projections import STORY_FIELDS, STORY_SUMMARY_FIELDS, parse_fields, project
+from ..story_discovery_cache import get_cached_story_discovery, cache_story_discovery
+from ..sse import format_sse
+from ..story_jobs import story_jobs, StoryJobQueueFull, JOB_COMPLETED, JOB_FAILED
+from ..gemini import (
+    STORY_MODEL, STRUCTURED_OUTPUT_ENABLED, RELATED_WORDS_RESPONSE_SCHEMA, RELATED_WORDS_DECODER,
+    GeminiAPIError, generate_content, structured_generation_config, decode_structured, extract_text
+)
 import httpx
 import os
 import json
+import re
+import asyncio
 
 router = APIRouter(prefix="/stories", tags=["stories"])
 
+# Batch generation (POST /stories/generate/batch)
+STORY_BATCH_MAX_SIZE = int(os.getenv("STORY_BATCH_MAX_SIZE", "20"))
+STORY_BATCH_CONCURRENCY = int(os.getenv("STORY_BATCH_CONCURRENCY", "4"))
+
+
+def check_no_pending_story(user_id: str):
+    """
+    Raise 429 if the user already has a story generation in progress.
+    Redis failures are logged and let the request through.
+    """
+    # Check if user has pending generations with better error handling
+    try:
+        pending = has_pending_generation(user_id, 'story')
+    except Exception as redis_error:
+        print(f"Redis error during pending generation check: {redis_error}")
+        # If Redis fails, we'll continue but log the issue
+        # This prevents Redis issues from blocking users completely
+        pending = False
+    if pending:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="You already have a story generation in progress. Please wait for it to complete before starting another one."
+        )
+
+
+def check_story_generation(user_id: str):
+    """
+    Enforce the pending-generation and quota checks without reserving
+    anything, so streaming endpoints can reject a request with a 429 before
+    the response starts.
+    """
+    check_no_pending_story(user_id)
+
+    # Check quota before starting generation
+    try:
+        within_quota = check_quota_only(user_id, 'story')
+    except Exception as quota_error:
+        print(f"Redis error during quota check: {quota_error}")
+        within_quota = True
+    if not within_quota:
+        quota_info = get_remaining_quota(user_id, 'story')
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Daily story generation limit reached. You have used {quota_info['used']}/{quota_info['limit']} stories today. Please try again tomorrow."
+        )
+
+
+def begin_story_generation(user_id: str):
+    """
+    Enforce the pending-generation and quota checks, then mark a story
+    generation as started and count it against the daily quota.
+
+    Redis failures are logged and let the generation through, but a
+    confirmed pending generation or exhausted quota raises 429.
+    """
+    check_story_generation(user_id)
+
+    # Mark generation as started (with error handling)
+    try:
+        start_generation(user_id, 'story')
+    except Exception as start_error:
+        print(f"Error starting generation tracking: {start_error}")
+        # Continue even if Redis fails for generation tracking
+
+    # Increment quota now that we're starting generation (with error handling)
+    try:
+        check_and_increment_quota(user_id, 'story')
+    except Exception as quota_error:
+        print(f"Error incrementing quota: {quota_error}")
+        # Continue even if Redis fails for quota tracking
+
+
+def check_story_batch(user_id: str, count: int):
+    """
+    Reject a batch of `count` stories with a 429 if a generation is pending
+    or the batch doesn't fit in the remaining quota. Reserves nothing.
+    """
+    check_no_pending_story(user_id)
+
+    quota_info = get_remaining_quota(user_id, 'story')
+    if quota_info['limit'] != -1 and quota_info['remaining'] < count:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Daily story generation limit reached. This batch needs {count} stories and you have {quota_info['remaining']} left today."
+        )
+
+
+def begin_story_batch(user_id: str, count: int):
+    """
+    Start tracking a batch of story generations.
+
+    Quota for every story in the batch is reserved in one atomic step, so a
+    batch either fits in the remaining quota or is rejected as a whole.
+
+    Raises:
+        HTTPException: 429 if a generation is already pending or the batch
+            doesn't fit in the remaining quota
+    """
+    check_no_pending_story(user_id)
+
+    if not reserve_quota(user_id, 'story', count):
+        quota_info = get_remaining_quota(user_id, 'story')
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Daily story generation limit reached. This batch needs {count} stories and you have {quota_info['remaining']} left today."
+        )
+
+    start_generation(user_id, 'story')
+
+
+def validate_story_request(request: StoryGenerationRequest) -> str:
+    """Validate a story generation request and return the Gemini API key"""
+    # Validate required fields
+    if not request.words or len(request.words) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one word is required for story generation"
+        )
+
+    # Get Gemini API key from Secret Manager or environment
+    gemini_api_key = get_gemini_api_key()
+    if not gemini_api_key or gemini_api_key == "your_gemini_api_key_here":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Gemini API key not configured"
+        )
+    return gemini_api_key
+
+
+def story_generation_response(request: StoryGenerationRequest, story_content: str, reused: bool = False) -> dict:
+    return {
+        "story_content": story_content,
+        "words": request.words,
+        "theme": request.theme,
+        "max_words": request.max_words,
+        "target_language": request.target_language,
+        "age_range": request.age_range,
+        "reused": reused
+    }
+
+
+def story_job_response(job: dict) -> dict:
+    response = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == JOB_COMPLETED:
+        request = job["request"]
+        response.update({
+            "story_content": job["story_content"],
+            "words": request["words"],
+            "theme": request["theme"],
+            "max_words": request["max_words"],
+            "target_language": request["target_language"],
+            "age_range": request["age_range"]
+        })
+    elif job["status"] == JOB_FAILED:
+        response["error"] = job["error"]
+    return response
+
+
+async def produce_story(request: StoryGenerationRequest, user_id: str) -> Tuple[str, bool]:
+    """
+    Produce the story text for a request, from the pool or from Gemini.
+
+    Returns:
+        The story text and whether it was reused from the pool
+    """
+    gemini_api_key = validate_story_request(request)
+
+    # Opted-in requests are served from the shared pool when it is full.
+    # Pooled stories cost no Gemini call, so they don't count against the quota.
+    if request.allow_reuse:
+        pooled_story = get_pooled_story(request)
+        if pooled_story is not None:
+            return pooled_story, True
+
+    begin_story_generation(user_id)
+
+    try:
+        story_content = await generate_story_text(request, gemini_api_key)
+        add_pooled_story(request, story_content)
+
+        # Quota was already incremented at the start, no need to increment again
+
+        return story_content, False
+
+    except StoryGenerationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=e.detail
+        )
+    except httpx.TimeoutException:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Story generation timed out"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Story generation failed: {str(e)}"
+        )
+    finally:
+        # Mark generation as ended
+        end_generation(user_id, 'story')
+
+
+def default_story_title(request: StoryGenerationRequest) -> str:
+    """Same title the client generates when saving a story"""
+    words = " and ".join([request.original_word] if request.original_word else request.words)
+    if request.theme and request.theme.strip():
+        return f"The {request.theme.strip()} of {words}"
+    return f"A Story About {words}"
+
+
+def story_length_label(max_words: int) -> str:
+    if max_words <= 100:
+        return "short"
+    if max_words <= 300:
+        return "medium"
+    return "long"
+
 
 @router.post("/generate")
 async def generate_story(
@@ -24,212 +263,257 @@ async def generate_story(
     db: Session = Depends(get_db)
 ):
     """Generate a story using Gemini 2.0 Flash API"""
+    story_content, reused = await produce_story(request, current_user.id)
+    return story_generation_response(request, story_content, reused=reused)
+
+
+@router.post("/generate/save", response_model=GeneratedStorySummary)
+async def generate_and_save_story(
+    request: StoryGenerateAndSaveRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate a story and save it in one request.
+
+    Returns the saved story's id and metadata; the story text is included
+    only when include_content is set.
+    """
+    story_content, reused = await produce_story(request, current_user.id)
+
     try:
-        # Check if user has pending generations with better error handling
+        story = create_story(db, {
+            "user_id": current_user.id,
+            "original_words": request.words,
+            "story_title": (request.story_title or "").strip()[:255] or default_story_title(request)[:255],
+            "story_content": story_content,
+            "story_theme": request.theme[:100] if request.theme else None,
+            "story_length": story_length_label(request.max_words),
+            "target_age_range": request.age_range or "elementary",
+            "target_language": request.target_language or "English"
+        })
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Story was generated but could not be saved: {str(e)}"
+        )
+
+    summary = GeneratedStorySummary.model_validate(story)
+    summary.reused = reused
+    if not request.include_content:
+        summary.story_content = None
+    return summary
+
+
+@router.post("/generate/stream")
+async def generate_story_stream(
+    request: StoryGenerationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Generate a story and stream it as server-sent events.
+
+    Emits `chunk` events ({"text": ...}) as Gemini produces output, then a
+    `done` event with the assembled story in the same shape as
+    POST /stories/generate, or an `error` event ({"detail": ...}). If the
+    client disconnects before the story completes, the pending generation is
+    cleared and the quota increment is refunded.
+
+    The generation is only marked pending and charged once the response
+    starts streaming, in the same generator that releases it, so a client
+    that disconnects before reading anything holds no quota.
+    """
+    gemini_api_key = validate_story_request(request)
+    check_story_generation(current_user.id)
+
+    async def events():
         try:
-            if has_pending_generation(current_user.id, 'story'):
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="You already have a story generation in progress. Please wait for it to complete before starting another one."
-                )
-        except Exception as redis_error:
-            print(f"Redis error during pending generation check: {redis_error}")
-            # If Redis fails, we'll continue but log the issue
-            # This prevents Redis issues from blocking users completely
-        
-        # Check quota before starting generation
+            begin_story_generation(current_user.id)
+        except HTTPException as e:
+            # Another request got in between the check and the reservation
+            yield format_sse("error", {"detail": e.detail})
+            return
+
+        parts = []
+        completed = False
+        chunks = stream_story_text(request, gemini_api_key)
         try:
-            if not check_quota_only(current_user.id, 'story'):
-                quota_info = get_remaining_quota(current_user.id, 'story')
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Daily story generation limit reached. You have used {quota_info['used']}/{quota_info['limit']} stories today. Please try again tomorrow."
-                )
-        except Exception as quota_error:
-            print(f"Redis error during quota check: {quota_error}")
-            # If Redis fails during quota check, we'll continue but log the issue
-            # This prevents Redis issues from blocking users completely
-        
-        # Mark generation as started (with error handling)
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield format_sse("chunk", {"text": chunk})
+
+            completed = True
+            story_content = "".join(parts)
+            add_pooled_story(request, story_content)
+            yield format_sse("done", story_generation_response(request, story_content))
+        except StoryGenerationError as e:
+            completed = True
+            yield format_sse("error", {"detail": e.detail})
+        except httpx.TimeoutException:
+            completed = True
+            yield format_sse("error", {"detail": "Story generation timed out"})
+        except Exception as e:
+            # Cancellation on client disconnect is not an Exception and skips this
+            completed = True
+            yield format_sse("error", {"detail": f"Story generation failed: {str(e)}"})
+        finally:
+            await chunks.aclose()
+            # Mark generation as ended
+            end_generation(current_user.id, 'story')
+            if not completed:
+                print(f"Story stream for user {current_user.id} disconnected after {len(parts)} chunks")
+                decrement_quota(current_user.id, 'story')
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/generate/batch")
+async def generate_story_batch(
+    batch: StoryBatchGenerationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Generate several stories at once and stream each one as it completes.
+
+    Runs up to STORY_BATCH_CONCURRENCY generations at a time over the shared
+    Gemini client. Requests with allow_reuse are served from the story pool
+    where possible; quota for the rest is reserved up front and refunded for
+    stories that fail or never run (e.g. the client disconnects).
+
+    Emits a `result` event per story ({"index": ..., ...} in the shape of
+    POST /stories/generate), an `error` event per failed story
+    ({"index": ..., "detail": ...}), then a `done` event with counts. If the
+    quota can no longer be reserved once streaming starts, a single `error`
+    event without an index is sent instead.
+    """
+    if not batch.requests:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one story request is required"
+        )
+    if len(batch.requests) > STORY_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"A batch can contain at most {STORY_BATCH_MAX_SIZE} stories"
+        )
+
+    for index, request in enumerate(batch.requests):
         try:
-            start_generation(current_user.id, 'story')
-        except Exception as start_error:
-            print(f"Error starting generation tracking: {start_error}")
-            # Continue even if Redis fails for generation tracking
-        
-        # Increment quota now that we're starting generation (with error handling)
+            gemini_api_key = validate_story_request(request)
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"Story {index}: {e.detail}")
+
+    pooled = {}
+    for index, request in enumerate(batch.requests):
+        if request.allow_reuse:
+            pooled_story = get_pooled_story(request)
+            if pooled_story is not None:
+                pooled[index] = pooled_story
+    to_generate = [index for index in range(len(batch.requests)) if index not in pooled]
+
+    if to_generate:
+        check_story_batch(current_user.id, len(to_generate))
+
+    async def generate(index: int, semaphore: asyncio.Semaphore) -> Tuple[int, Optional[str], Optional[str]]:
+        request = batch.requests[index]
+        async with semaphore:
+            try:
+                story_content = await generate_story_text(request, gemini_api_key)
+            except StoryGenerationError as e:
+                return index, None, e.detail
+            except httpx.TimeoutException:
+                return index, None, "Story generation timed out"
+            except Exception as e:
+                return index, None, f"Story generation failed: {str(e)}"
+        add_pooled_story(request, story_content)
+        return index, story_content, None
+
+    async def events():
+        # Reserved here rather than before returning the response, so the
+        # finally below is guaranteed to release whatever was reserved
+        if to_generate:
+            try:
+                begin_story_batch(current_user.id, len(to_generate))
+            except HTTPException as e:
+                yield format_sse("error", {"detail": e.detail})
+                return
+
+        semaphore = asyncio.Semaphore(STORY_BATCH_CONCURRENCY)
+        tasks = [asyncio.create_task(generate(index, semaphore)) for index in to_generate]
+        generated = failed = 0
         try:
-            check_and_increment_quota(current_user.id, 'story')
-        except Exception as quota_error:
-            print(f"Error incrementing quota: {quota_error}")
-            # Continue even if Redis fails for quota tracking
-        
-        # Validate required fields
-        if not request.words or len(request.words) == 0:
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="At least one word is required for story generation"
-            )
-        
-        # Log the request for debugging
-        print(f"Story generation request: words={request.words}, theme={request.theme}, max_words={request.max_words}")
-        
-        # Get Gemini API key from Secret Manager or environment
-        gemini_api_key = get_gemini_api_key()
-        if not gemini_api_key or gemini_api_key == "your_gemini_api_key_here":
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Gemini API key not configured"
-            )
-        
-        # Build the prompt for story generation
-        words_text = ", ".join(request.words)
-        
-        # Determine age-appropriate content based on age_range
-        age_guidance = ""
-        if request.age_range:
-            if request.age_range == "toddler" or (isinstance(request.age_range, int) and request.age_range <= 3):
-                age_guidance = "very simple language, repetitive patterns, basic concepts, 1-2 sentences per page"
-            elif request.age_range == "preschool" or (isinstance(request.age_range, int) and 4 <= request.age_range <= 5):
-                age_guidance = "simple language, colorful descriptions, basic vocabulary, short sentences"
-            elif request.age_range == "elementary" or (isinstance(request.age_range, int) and 6 <= request.age_range <= 10):
-                age_guidance = "engaging language, educational elements, clear plot, age-appropriate themes"
-            elif request.age_range == "middle_school" or (isinstance(request.age_range, int) and 11 <= request.age_range <= 13):
-                age_guidance = "more complex language, deeper themes, character development, educational content"
-            else:
-                age_guidance = "engaging language suitable for children, educational elements, clear plot"
-        else:
-            age_guidance = "engaging language suitable for children, educational elements, clear plot"
-        
-        # Language instruction
-        language_instruction = ""
-        if request.target_language and request.target_language != "None" and request.target_language.strip():
-            language_instruction = f"IMPORTANT: Write the entire story in {request.target_language} language. Do not use English unless specifically requested. "
-        else:
-            language_instruction = "Write the story in English. "
-        
-        # Word highlighting instruction
-        word_highlighting = ""
-        if request.words and len(request.words) > 0:
-            # Highlight all selected words
-            words_to_highlight = request.words
-            word_highlighting = f"""
-        Word Usage:
-        - Include and highlight ALL of these words: {', '.join(words_to_highlight)}
-        - Make each word **bold** when it appears (use **word** format)
-        - Ensure each word appears multiple times throughout the story
-        - The story should be written in {request.target_language} language
-        - Use the words naturally in the story context
-        """
-        
-        # Theme instruction - let AI be creative if no theme specified
-        theme_instruction = ""
-        if request.theme and request.theme.strip():
-            theme_instruction = f"Theme: {request.theme}\n"
-        else:
-            theme_instruction = "Theme: Be creative and choose an engaging theme that fits the words naturally.\n"
-        
-        base_prompt = f"""
-        {language_instruction}Create an engaging, educational story for children that incorporates the following words: {words_text}.
-        
-        {theme_instruction}Maximum length: {request.max_words} words
-        Age guidance: {age_guidance}
-        
-        CRITICAL LANGUAGE REQUIREMENTS:
-        - Write the story ENTIRELY in {request.target_language} language
-        - NEVER include pinyin, romanization, or pronunciation guides in parentheses
-        - NEVER add English translations or explanations
-        - NEVER use English words or phrases
-        - Use ONLY the target language characters and words
-        
-        Story Requirements:
-        - Make the story engaging and age-appropriate
-        - Naturally incorporate all the provided words
-        - Include educational elements or moral lessons
-        - Use {age_guidance}
-        - Make it fun and memorable
-        - Keep the story within {request.max_words} words
-        {word_highlighting}
-        
-        {f"Additional instructions: {request.custom_prompt}" if request.custom_prompt else ""}
-        
-        IMPORTANT: The story must be written in pure {request.target_language} without any pronunciation guides, pinyin, or English text.
-        """
-        
-        # Call Gemini API
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={gemini_api_key}",
-                json={
-                    "contents": [
-                        {
-                            "parts": [
-                                {
-                                    "text": base_prompt
-                                }
-                            ]
-                        }
-                    ],
-                    "generationConfig": {
-                        "temperature": 0.7,
-                        "topK": 40,
-                        "topP": 0.95,
-                        "maxOutputTokens": 1024
-                    }
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to generate story from Gemini API"
-                )
-            
-            data = response.json()
-            
-            # Extract the generated text
-            if "candidates" in data and len(data["candidates"]) > 0:
-                story_content = data["candidates"][0]["content"]["parts"][0]["text"]
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="No story content generated"
-                )
-        
-        # Quota was already incremented at the start, no need to increment again
-        
-        # Mark generation as ended
-        end_generation(current_user.id, 'story')
-        
-        return {
-            "story_content": story_content,
-            "words": request.words,
-            "theme": request.theme,
-            "max_words": request.max_words,
-            "target_language": request.target_language,
-            "age_range": request.age_range
-        }
-        
-    except httpx.TimeoutException:
-        # Mark generation as ended
+            for index, story_content in pooled.items():
+                response = story_generation_response(batch.requests[index], story_content, reused=True)
+                yield format_sse("result", {"index": index, **response})
+
+            for next_result in asyncio.as_completed(tasks):
+                index, story_content, error = await next_result
+                if error is None:
+                    generated += 1
+                    response = story_generation_response(batch.requests[index], story_content)
+                    yield format_sse("result", {"index": index, **response})
+                else:
+                    failed += 1
+                    yield format_sse("error", {"index": index, "detail": error})
+
+            yield format_sse("done", {"generated": generated, "reused": len(pooled), "failed": failed})
+        finally:
+            for task in tasks:
+                task.cancel()
+            if to_generate:
+                end_generation(current_user.id, 'story')
+                unused = len(to_generate) - generated
+                if unused:
+                    print(f"Story batch for user {current_user.id}: refunding {unused} of {len(to_generate)} stories")
+                    release_quota(current_user.id, 'story', unused)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/generate/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_story_job(
+    request: StoryGenerationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a story generation and return a job id to poll"""
+    gemini_api_key = validate_story_request(request)
+    begin_story_generation(current_user.id)
+
+    try:
+        job = story_jobs.submit(current_user.id, request, gemini_api_key)
+    except StoryJobQueueFull:
         end_generation(current_user.id, 'story')
+        decrement_quota(current_user.id, 'story')
         raise HTTPException(
-            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
-            detail="Story generation timed out"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Story generation is busy. Please try again shortly."
         )
-    except HTTPException:
-        # Mark generation as ended
-        end_generation(current_user.id, 'story')
-        # Re-raise HTTP exceptions (like quota limits) without modification
-        raise
-    except Exception as e:
-        # Mark generation as ended
-        end_generation(current_user.id, 'story')
+
+    return story_job_response(job)
+
+
+@router.get("/generate/jobs/{job_id}")
+async def get_story_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the status of a story generation job, with the story once completed"""
+    job = story_jobs.get(job_id)
+    if not job or job["user_id"] != current_user.id:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Story generation failed: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Story job not found"
         )
+    return story_job_response(job)
 
 
 @router.post("/", response_model=StorySchema)
@@ -253,16 +537,66 @@ async def create_story_endpoint(
         )
 
 
-@router.get("/", response_model=List[StorySchema])
+@router.get("/", response_model=List[StorySummary], response_model_exclude_unset=True)
 async def get_user_stories(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all stories for the authenticated user"""
-    stories = get_stories(db, skip=skip, limit=limit, user_id=current_user.id)
-    return stories
+    """
+    Get all stories for the authenticated user.
+
+    Returns summary fields with story_snippet instead of the full text unless
+    others are selected with `fields` (comma-separated, or `full`). The full
+    story is served by GET /stories/{story_id}.
+    """
+    selected = parse_fields(fields, STORY_FIELDS, STORY_SUMMARY_FIELDS)
+    stories = get_stories(db, skip=skip, limit=limit, user_id=current_user.id, fields=selected)
+    return [project(story, selected) for story in stories]
+
+
+@router.get("/discover", response_model=List[StorySummary], response_model_exclude_unset=True)
+async def discover_stories_endpoint(
+    theme: Optional[str] = None,
+    age_range: Optional[str] = None,
+    language: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Discover stories, newest first, filtered by theme, age range and language.
+
+    Filters are exact matches served by the (target_language,
+    target_age_range, created_at) and story_theme indexes. Each filter
+    combination is cached for STORY_DISCOVERY_CACHE_TTL seconds. Returns
+    summary fields unless others are selected with `fields`.
+    """
+    selected = parse_fields(fields, STORY_FIELDS, STORY_SUMMARY_FIELDS)
+    filters = {
+        "theme": theme,
+        "age_range": age_range,
+        "language": language,
+        "skip": skip,
+        "limit": limit,
+        "fields": selected,
+    }
+    cached = get_cached_story_discovery(filters)
+    if cached is not None:
+        return cached
+
+    stories = discover_stories(
+        db, theme=theme, age_range=age_range, language=language, skip=skip, limit=limit, fields=selected
+    )
+    results = [
+        StorySummary(**project(story, selected)).model_dump(mode="json", exclude_unset=True)
+        for story in stories
+    ]
+    cache_story_discovery(filters, results)
+    return results
 
 
 @router.get("/{story_id}", response_model=StorySchema)
@@ -297,19 +631,63 @@ async def delete_story_endpoint(
     return {"message": "Story deleted successfully"}
 
 
-@router.get("/discover", response_model=List[StorySchema])
-async def discover_stories(
-    theme: str = None,
-    age_range: str = None,
-    language: str = None,
-    skip: int = 0,
-    limit: int = 20,
-    db: Session = Depends(get_db)
-):
-    """Discover stories with optional filtering"""
-    # This would implement filtering logic
-    stories = get_stories(db, skip=skip, limit=limit)
-    return stories
+# Returned when a free-text related words response cannot be parsed (never cached)
+FALLBACK_RELATED_WORDS = [
+    {"id": "friend_朋友", "english": "friend", "translation": "朋友"},
+    {"id": "happy_快乐", "english": "happy", "translation": "快乐"},
+    {"id": "big_大", "english": "big", "translation": "大"},
+    {"id": "small_小", "english": "small", "translation": "小"}
+]
+
+
+def _validate_related_words(related_words: list) -> list:
+    """Keep only items that have both an english word and a translation"""
+    validated_words = []
+    for word in related_words:
+        if isinstance(word, dict) and "english" in word and "translation" in word:
+            validated_words.append({
+                "id": f"{word['english']}_{word['translation']}",
+                "english": word["english"],
+                "translation": word["translation"]
+            })
+    return validated_words
+
+
+def parse_free_text_related_words(content: str, word: str) -> list:
+    """Parse a free-text related words response, used when structured output is disabled"""
+    try:
+        related_words = json.loads(content.strip())
+        
+        # Validate the structure
+        if not isinstance(related_words, list):
+            raise ValueError("Response is not a list")
+        
+        validated_words = _validate_related_words(related_words)
+        print(f"Successfully parsed {len(validated_words)} related words")
+        return validated_words
+        
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"JSON parsing failed for word '{word}': {e}")
+        print(f"Raw AI response: {repr(content)}")
+        print(f"Response length: {len(content)}")
+        
+        # Try to extract JSON from the response if it's wrapped in other text
+        json_match = re.search(r'\[.*\]', content, re.DOTALL)
+        if json_match:
+            try:
+                extracted_json = json_match.group(0)
+                print(f"Extracted JSON: {extracted_json}")
+                related_words = json.loads(extracted_json)
+                if isinstance(related_words, list):
+                    validated_words = _validate_related_words(related_words)
+                    print(f"Successfully parsed {len(validated_words)} words from extracted JSON")
+                    return validated_words
+            except Exception as extract_error:
+                print(f"Failed to parse extracted JSON: {extract_error}")
+        
+        # Fallback: return some basic related words
+        print(f"Using fallback words for '{word}'")
+        return list(FALLBACK_RELATED_WORDS)
 
 
 class RelatedWordsRequest(BaseModel):
@@ -326,6 +704,13 @@ async def get_related_words(
 ):
     """Generate related words for story creation using AI"""
     try:
+        # Serve from the shared cache, slicing longer cached lists
+        cached_words = get_cached_related_words(
+            request.word, request.target_language, request.child_age, request.max_words
+        )
+        if cached_words is not None:
+            return {"related_words": cached_words, "cached": True}
+
         # Get Gemini API key from Secret Manager or environment
         gemini_api_key = get_gemini_api_key()
         if not gemini_api_key or gemini_api_key == "your_gemini_api_key_here":
@@ -351,151 +736,86 @@ async def get_related_words(
             age_guidance = "Use age-appropriate vocabulary suitable for children. Focus on clear, understandable words that support learning."
 
         # Build the prompt for related words generation
-        prompt = f"""
-        You are a language learning assistant. Generate exactly {request.max_words} contextually specific words for the word "{request.word}" in {request.target_language} language.
-
-        AGE GUIDANCE: {age_guidance}
-
-        CRITICAL REQUIREMENTS:
-        - Each word must be SPECIFICALLY related to "{request.word}" and its context
-        - Choose words appropriate for a {request.child_age if request.child_age else 'child'} year old
-        - Avoid generic words like "happy", "friend", "big", "small" unless they are truly specific to "{request.word}"
-        - Choose words that would naturally appear in a story specifically about "{request.word}"
-        - Include words that are part of the same semantic field or scenario
-        - Focus on words that create a coherent story about "{request.word}"
-        - Ensure all words are age-appropriate and educational
-
-        Examples for different words (age-appropriate):
-        - For "sun" (toddler): bright, hot, yellow, sky, day, warm, shine, light
-        - For "dog" (preschool): bark, tail, pet, walk, bone, play, furry, friend
-        - For "tree" (elementary): leaf, branch, grow, green, tall, forest, nature, plant
-        - For "book" (older child): read, story, page, learn, library, knowledge, words, imagination
-        - For "yellow" (preschool): color, bright, sunshine, flower, paint, lemon, banana, golden
-        - For "blue" (elementary): sky, ocean, water, cool, calm, sea, azure, cerulean
-
-        RESPONSE FORMAT - YOU MUST RETURN ONLY VALID JSON:
-        [
-          {{"english": "word1", "translation": "translation1"}},
-          {{"english": "word2", "translation": "translation2"}},
-          {{"english": "word3", "translation": "translation3"}},
-          {{"english": "word4", "translation": "translation4"}}
-        ]
-
-        CRITICAL: 
-        - Return ONLY the JSON array above
-        - Do NOT include any explanations, markdown formatting, or additional text
-        - Ensure the JSON is properly formatted with double quotes
-        - Make sure the array contains exactly {request.max_words} items
-        - Each item must have "english" and "translation" fields
-        - Choose words appropriate for a {request.child_age if request.child_age else 'child'} year old
-        """
+        format_instructions = ""
+        if not STRUCTURED_OUTPUT_ENABLED:
+            format_instructions = RELATED_WORDS_FORMAT_TEMPLATE.render(max_words=request.max_words)
+        prompt = RELATED_WORDS_TEMPLATE.render(
+            max_words=request.max_words,
+            word=cap_text(request.word, PROMPT_FIELD_MAX_CHARS),
+            target_language=request.target_language,
+            age_guidance=age_guidance,
+            age_label=request.child_age if request.child_age else 'child',
+            format_instructions=format_instructions
+        )
+        record_prompt("related_words", prompt)
         
         # Call Gemini API
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={gemini_api_key}",
-                json={
-                    "contents": [
-                        {
-                            "parts": [
-                                {
-                                    "text": prompt
-                                }
-                            ]
-                        }
-                    ],
-                    "generationConfig": {
-                        "temperature": 0.7,
-                        "topK": 40,
-                        "topP": 0.95,
-                        "maxOutputTokens": 512
-                    }
-                },
+        generation_config = {
+            "temperature": 0.7,
+            "topK": 40,
+            "topP": 0.95,
+            "maxOutputTokens": 512
+        }
+        if STRUCTURED_OUTPUT_ENABLED:
+            generation_config = structured_generation_config(RELATED_WORDS_RESPONSE_SCHEMA, generation_config)
+        
+        try:
+            data = await generate_content(
+                STORY_MODEL,
+                prompt,
+                gemini_api_key,
+                generation_config=generation_config,
                 timeout=15.0
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to generate related words from Gemini API"
-                )
-            
-            data = response.json()
-            
-            # Extract the generated text
-            if "candidates" in data and len(data["candidates"]) > 0:
-                content = data["candidates"][0]["content"]["parts"][0]["text"]
-                print(f"AI Response for related words: {content}")
-                
-                # Parse the JSON response
-                try:
-                    import json
-                    related_words = json.loads(content.strip())
-                    
-                    # Validate the structure
-                    if not isinstance(related_words, list):
-                        raise ValueError("Response is not a list")
-                    
-                    # Ensure each item has the required fields
-                    validated_words = []
-                    for word in related_words:
-                        if isinstance(word, dict) and "english" in word and "translation" in word:
-                            validated_words.append({
-                                "id": f"{word['english']}_{word['translation']}",
-                                "english": word["english"],
-                                "translation": word["translation"]
-                            })
-                    
-                    print(f"Successfully parsed {len(validated_words)} related words")
-                    return {"related_words": validated_words}
-                    
-                except (json.JSONDecodeError, ValueError) as e:
-                    print(f"JSON parsing failed for word '{request.word}': {e}")
-                    print(f"Raw AI response: {repr(content)}")
-                    print(f"Response length: {len(content)}")
-                    
-                    # Try to extract JSON from the response if it's wrapped in other text
-                    import re
-                    json_match = re.search(r'\[.*\]', content, re.DOTALL)
-                    if json_match:
-                        try:
-                            extracted_json = json_match.group(0)
-                            print(f"Extracted JSON: {extracted_json}")
-                            related_words = json.loads(extracted_json)
-                            if isinstance(related_words, list):
-                                validated_words = []
-                                for word in related_words:
-                                    if isinstance(word, dict) and "english" in word and "translation" in word:
-                                        validated_words.append({
-                                            "id": f"{word['english']}_{word['translation']}",
-                                            "english": word["english"],
-                                            "translation": word["translation"]
-                                        })
-                                print(f"Successfully parsed {len(validated_words)} words from extracted JSON")
-                                return {"related_words": validated_words}
-                        except Exception as extract_error:
-                            print(f"Failed to parse extracted JSON: {extract_error}")
-                    
-                    # Fallback: return some basic related words
-                    fallback_words = [
-                        {"id": "friend_朋友", "english": "friend", "translation": "朋友"},
-                        {"id": "happy_快乐", "english": "happy", "translation": "快乐"},
-                        {"id": "big_大", "english": "big", "translation": "大"},
-                        {"id": "small_小", "english": "small", "translation": "小"}
-                    ]
-                    print(f"Using fallback words for '{request.word}'")
-                    return {"related_words": fallback_words}
-            else:
+        except GeminiAPIError:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to generate related words from Gemini API"
+            )
+        
+        # Extract the generated text
+        content = extract_text(data)
+        if content is None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="No related words generated"
+            )
+        
+        if STRUCTURED_OUTPUT_ENABLED:
+            try:
+                related_words = decode_structured(content, RELATED_WORDS_DECODER)
+            except ValidationError as e:
+                print(f"Structured related words response failed validation for '{request.word}': {e}")
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="No related words generated"
+                    detail="Related words response was malformed"
                 )
+            validated_words = [
+                {
+                    "id": f"{word.english}_{word.translation}",
+                    "english": word.english,
+                    "translation": word.translation
+                }
+                for word in related_words
+            ]
+        else:
+            print(f"AI Response for related words: {content}")
+            validated_words = parse_free_text_related_words(content, request.word)
+            if validated_words == FALLBACK_RELATED_WORDS:
+                return {"related_words": validated_words, "cached": False}
+
+        # The model may return more words than asked for
+        validated_words = validated_words[:request.max_words]
+        cache_related_words(request.word, request.target_language, request.child_age, validated_words)
+        return {"related_words": validated_words, "cached": False}
         
     except httpx.TimeoutException:
         raise HTTPException(
             status_code=status.HTTP_504_GATEWAY_TIMEOUT,
             detail="Related words generation timed out"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
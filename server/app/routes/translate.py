@@ -1,15 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Response
 from pydantic import BaseModel
+from pydantic import ValidationError
 import httpx
 import os
 import json
 import re
-from typing import Optional
+import hashlib
+from typing import NamedTuple, Optional
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 from ..secrets import get_gemini_api_key
+from ..gemini import (
+    TRANSLATE_MODEL, STRUCTURED_OUTPUT_ENABLED, TRANSLATION_RESPONSE_SCHEMA, TRANSLATION_DECODER,
+    GeminiAPIError, generate_content, structured_generation_config, decode_structured, extract_text
+)
 from ..database import get_db
 from ..caching import hash_prompt, get_cached_translation, cache_translation
+from ..lexicon import lexicon
+from ..prompts import TRANSLATE_TEMPLATE, TRANSLATE_FORMAT_TEMPLATE, PROMPT_FIELD_MAX_CHARS, cap_text, record_prompt
 from ..auth import get_current_user_if_authenticated
 from ..models import Translation, User
 
@@ -49,6 +57,25 @@ def get_age_appropriate_examples(term: str, language: str, child_age: Optional[i
             f"Example 3: The word '{term}' means something special in {language}."
         ]
 
+def parse_free_text_translation(response_text: str) -> Optional[dict]:
+    """Parse a free-text Gemini response, used when structured output is disabled."""
+    try:
+        # First, try to extract JSON from markdown code blocks
+        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group(1))
+        # Try direct JSON parsing
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        return None
+
+def extract_translation_line(response_text: str, term: str, language: str) -> str:
+    """Look for a 'translation: ...' line in an unparseable response."""
+    for line in response_text.split('\n'):
+        if 'translation' in line.lower() and ':' in line:
+            return line.split(':', 1)[1].strip().strip('"')
+    return f"[{language}] {term}"
+
 router = APIRouter(tags=["translate"])
 
 class TranslateRequest(BaseModel):
@@ -63,6 +90,203 @@ class TranslateResponse(BaseModel):
     cached: bool = False
     cache_hit_count: Optional[int] = None
 
+# Sources a translation can come from. Only lexicon, cache and freshly parsed
+# Gemini results are stable enough to be cached by HTTP caches.
+CACHEABLE_SOURCES = ("lexicon", "cache", "gemini")
+
+# HTTP caching for the anonymous GET endpoint
+TRANSLATE_CACHE_CONTROL = os.getenv(
+    "TRANSLATE_CACHE_CONTROL",
+    "public, max-age=3600, s-maxage=86400, stale-while-revalidate=604800"
+)
+
+
+class TranslationLookup(NamedTuple):
+    response: TranslateResponse
+    source: str  # 'lexicon', 'cache', 'gemini', 'fallback' or 'mock'
+    data: Optional[dict] = None  # Parsed Gemini result when source is 'gemini'
+
+
+def get_user_preferences(current_user: Optional[User]) -> Optional[dict]:
+    """Get user preferences that affect the translation prompt"""
+    if not current_user:
+        return None
+    try:
+        # Get preferences from JSONB field
+        user_prefs = current_user.preferences or {}
+        return {
+            'child_name': user_prefs.get('child_name'),
+            'child_age': user_prefs.get('child_age'),
+            'preferred_languages': user_prefs.get('preferred_languages', []) or [],
+            'content_privacy_default': user_prefs.get('content_privacy_default', 'private') or 'private'
+        }
+    except Exception as e:
+        print(f"Translation error: {e}")
+        # Fallback to empty preferences if attributes don't exist
+        return {
+            'child_name': None,
+            'child_age': None,
+            'preferred_languages': [],
+            'content_privacy_default': 'private'
+        }
+
+
+async def resolve_translation(
+    term: str,
+    language: str,
+    child_age: Optional[int],
+    prompt_hash: str,
+    db: Session
+) -> TranslationLookup:
+    """
+    Resolve a translation from the lexicon, the translation cache or Gemini.
+
+    Fresh Gemini results are written to the translation cache.
+    """
+    # Serve high-frequency words from the bundled lexicon without
+    # touching the cache or Gemini
+    lexicon_entry = lexicon.lookup(term, language)
+    if lexicon_entry:
+        return TranslationLookup(TranslateResponse(
+            translation=lexicon_entry.translation,
+            explanation=lexicon_entry.explanation,
+            examples=list(lexicon_entry.examples),
+            cached=True,
+            cache_hit_count=None
+        ), "lexicon")
+    
+    # Check cache first (works for all users)
+    cached_result = get_cached_translation(db, prompt_hash)
+    
+    if cached_result:
+        # Return cached result
+        cached_data = cached_result.response_json
+        return TranslationLookup(TranslateResponse(
+            translation=cached_data.get("translation", "Translation not available"),
+            explanation=cached_data.get("explanation", "Explanation not available"),
+            examples=cached_data.get("examples", []),
+            cached=True,
+            cache_hit_count=None  # No longer tracking usage count
+        ), "cache")
+    
+    # Get Gemini API key from Secret Manager or environment
+    api_key = get_gemini_api_key()
+    
+    # Check if we have a valid API key
+    if not api_key or api_key == "your_gemini_api_key_here":
+        # For local development without API key, return mock response
+        return TranslationLookup(TranslateResponse(
+            translation=f"[{language}] {term}",
+            explanation=f"This is a mock translation for '{term}' to {language}. To use real translations, set GEMINI_API_KEY in your environment or add the secret to Secret Manager.",
+            examples=get_age_appropriate_examples(term, language, child_age),
+            cached=False,
+            cache_hit_count=None
+        ), "mock")
+    
+    # Get user's child age for age-appropriate examples
+    child_age_info = ""
+    if child_age:
+        child_age_info = f"\nThe examples should be appropriate for a {child_age}-year-old child. Use simple vocabulary and concepts that a {child_age}-year-old would understand and find engaging."
+    
+    # Prepare the prompt for Gemini
+    prompt = TRANSLATE_TEMPLATE.render(
+        term=cap_text(term, PROMPT_FIELD_MAX_CHARS),
+        language=language,
+        format_instructions="" if STRUCTURED_OUTPUT_ENABLED else TRANSLATE_FORMAT_TEMPLATE.render(),
+        child_age_info=child_age_info
+    )
+    record_prompt("translate", prompt)
+    
+    # Call Gemini API
+    if STRUCTURED_OUTPUT_ENABLED:
+        generation_config = structured_generation_config(TRANSLATION_RESPONSE_SCHEMA)
+    else:
+        generation_config = None
+
+    try:
+        data = await generate_content(
+            TRANSLATE_MODEL,
+            prompt,
+            api_key,
+            generation_config=generation_config,
+            timeout=30.0
+        )
+    except GeminiAPIError as e:
+        print(f"Gemini API error: {e.status_code} - {e.body}")
+        raise HTTPException(
+            status_code=503,
+            detail="Translation service temporarily unavailable. Please try again later."
+        )
+
+    # Extract the response text
+    response_text = extract_text(data)
+    if response_text is None:
+        # Unexpected response format
+        print(f"Unexpected Gemini response format: {data}")
+        raise HTTPException(
+            status_code=500,
+            detail="Translation service returned an unexpected response format. Please try again later."
+        )
+    response_text = response_text.strip()
+
+    if STRUCTURED_OUTPUT_ENABLED:
+        try:
+            parsed = decode_structured(response_text, TRANSLATION_DECODER).model_dump()
+        except ValidationError as e:
+            print(f"Structured translation response failed validation: {e}")
+            parsed = None
+    else:
+        parsed = parse_free_text_translation(response_text)
+
+    if parsed is None:
+        # If parsing fails, try to extract translation from text
+        print(f"JSON parsing failed for response: {response_text}")
+        return TranslationLookup(TranslateResponse(
+            translation=extract_translation_line(response_text, term, language),
+            explanation=response_text,
+            examples=get_age_appropriate_examples(term, language, child_age),
+            cached=False,
+            cache_hit_count=None
+        ), "fallback")
+
+    # Cache the successful response
+    cache_translation(
+        db=db,
+        prompt_hash=prompt_hash,
+        word=term,
+        language=language,
+        response_data=parsed
+    )
+
+    return TranslationLookup(TranslateResponse(
+        translation=parsed.get("translation", "Translation not available"),
+        explanation=parsed.get("explanation", "Explanation not available"),
+        examples=parsed.get("examples", []),
+        cached=False,
+        cache_hit_count=None
+    ), "gemini", parsed)
+
+
+def translation_etag(translation: TranslateResponse) -> str:
+    """
+    Strong ETag for a non-personalized translation: a digest of the response
+    body, so lexicon, cached and freshly generated responses (which differ in
+    `cached` if nothing else) never share a validator.
+    """
+    body = translation.model_dump_json()
+    return f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
 @router.post("/translate", response_model=TranslateResponse)
 async def translate(
     request: TranslateRequest, 
@@ -72,193 +296,89 @@ async def translate(
     """Translate a term using Gemini API with caching"""
     try:
         # Get user preferences for age-appropriate caching
-        user_preferences = None
-        if current_user:
-            try:
-                # Get preferences from JSONB field
-                user_prefs = current_user.preferences or {}
-                user_preferences = {
-                    'child_name': user_prefs.get('child_name'),
-                    'child_age': user_prefs.get('child_age'),
-                    'preferred_languages': user_prefs.get('preferred_languages', []) or [],
-                    'content_privacy_default': user_prefs.get('content_privacy_default', 'private') or 'private'
-                }
-            except Exception as e:
-                print(f"Translation error: {e}")
-                # Fallback to empty preferences if attributes don't exist
-                user_preferences = {
-                    'child_name': None,
-                    'child_age': None,
-                    'preferred_languages': [],
-                    'content_privacy_default': 'private'
-                }
-        
-        # Check cache first (works for all users)
+        user_preferences = get_user_preferences(current_user)
         prompt_hash = hash_prompt(request.term, request.language, user_preferences)
-        cached_result = get_cached_translation(db, prompt_hash)
-        
-        if cached_result:
-            # Return cached result
-            cached_data = cached_result.response_json
-            return TranslateResponse(
-                translation=cached_data.get("translation", "Translation not available"),
-                explanation=cached_data.get("explanation", "Explanation not available"),
-                examples=cached_data.get("examples", []),
-                cached=True,
-                cache_hit_count=None  # No longer tracking usage count
-            )
-        
-        # Get Gemini API key from Secret Manager or environment
-        api_key = get_gemini_api_key()
-        environment = os.getenv("ENVIRONMENT", "local")
-        
-        # Check if we have a valid API key
-        if not api_key or api_key == "your_gemini_api_key_here":
-            # For local development without API key, return mock response
-            return TranslateResponse(
-                translation=f"[{request.language}] {request.term}",
-                explanation=f"This is a mock translation for '{request.term}' to {request.language}. To use real translations, set GEMINI_API_KEY in your environment or add the secret to Secret Manager.",
-                examples=get_age_appropriate_examples(request.term, request.language, request.child_age),
-                cached=False,
-                cache_hit_count=None
-            )
-        
-        # Get user's child age for age-appropriate examples
-        child_age_info = ""
-        if request.child_age:
-            child_age_info = f"\nThe examples should be appropriate for a {request.child_age}-year-old child. Use simple vocabulary and concepts that a {request.child_age}-year-old would understand and find engaging."
-        
-        # Prepare the prompt for Gemini
-        prompt = f"""
-        Translate the word or phrase "{request.term}" to {request.language}.
-        
-        Please provide your response in the following JSON format:
-        {{
-            "translation": "the translated word or phrase",
-            "explanation": "a brief explanation of the translation, including any cultural context, usage notes, or grammar explanations",
-            "examples": [
-                "example sentence 1 using the word/phrase",
-                "example sentence 2 using the word/phrase",
-                "example sentence 3 using the word/phrase"
-            ]
-        }}
         
-        Make sure the explanation is helpful for language learners and includes:
-        - Pronunciation hints if relevant
-        - Common usage examples
-        - Any cultural context
-        - Grammar notes if applicable
-        
-        For the examples, generate 3 simple example sentences that a kid would understand. Make them engaging and educational.{child_age_info}
-        
-        Respond only with valid JSON, no additional text.
-        """
-        
-        # Call Gemini API
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-                params={"key": api_key},
-                json={
-                    "contents": [{
-                        "parts": [{"text": prompt}]
-                    }]
-                },
-                timeout=30.0
+        result = await resolve_translation(
+            request.term, request.language, request.child_age, prompt_hash, db
+        )
+
+        # Save translation to user's history if authenticated
+        if current_user and result.source == "gemini":
+            translation = Translation(
+                user_id=current_user.id,
+                original_term=request.term,
+                target_language=request.language,
+                translation=result.data.get("translation", "Translation not available"),
+                explanation=result.data.get("explanation", "Explanation not available")
             )
-            
-            if response.status_code != 200:
-                print(f"Gemini API error: {response.status_code} - {response.text}")
-                raise HTTPException(
-                    status_code=503,
-                    detail="Translation service temporarily unavailable. Please try again later."
+            db.add(translation)
+            db.commit()
+
+        return result.response
+
+    except httpx.TimeoutException:
+        print("Gemini API request timed out")
+        raise HTTPException(
+            status_code=504,
+            detail="Translation request timed out. Please try again later."
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Translation error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Translation service error. Please try again later."
+        )
+
+
+@router.get("/translate", response_model=TranslateResponse)
+async def translate_anonymous(
+    response: Response,
+    term: str = Query(..., min_length=1, description="Word or phrase to translate"),
+    language: str = Query(..., min_length=1, description="Target language"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Non-personalized translation that HTTP caches and CDNs can store.
+    Responses carry a strong ETag derived from the response body and support
+    If-None-Match revalidation. Authentication is ignored.
+    """
+    try:
+        prompt_hash = hash_prompt(term, language, None)
+
+        # Resolved before answering 304, so a validator is only confirmed
+        # while the lexicon entry or cache row it was issued for still exists
+        result = await resolve_translation(term, language, None, prompt_hash, db)
+
+        if result.source in CACHEABLE_SOURCES:
+            etag = translation_etag(result.response)
+            if etag_matches(if_none_match, etag):
+                return Response(
+                    status_code=304,
+                    headers={"ETag": etag, "Cache-Control": TRANSLATE_CACHE_CONTROL}
                 )
-            
-            data = response.json()
-            
-            # Extract the response text
-            if "candidates" in data and len(data["candidates"]) > 0:
-                content = data["candidates"][0]["content"]
-                if "parts" in content and len(content["parts"]) > 0:
-                    response_text = content["parts"][0]["text"].strip()
-                    
-                    # Try to parse JSON response
-                    try:
-                        # First, try to extract JSON from markdown code blocks
-                        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
-                        if json_match:
-                            json_str = json_match.group(1)
-                            parsed = json.loads(json_str)
-                        else:
-                            # Try direct JSON parsing
-                            parsed = json.loads(response_text)
-                        
-                        # Cache the successful response
-                        cache_translation(
-                            db=db,
-                            prompt_hash=prompt_hash,
-                            word=request.term,
-                            language=request.language,
-                            response_data=parsed
-                        )
-                        
-                        # Save translation to user's history if authenticated
-                        if current_user:
-                            translation = Translation(
-                                user_id=current_user.id,
-                                original_term=request.term,
-                                target_language=request.language,
-                                translation=parsed.get("translation", "Translation not available"),
-                                explanation=parsed.get("explanation", "Explanation not available")
-                            )
-                            db.add(translation)
-                            db.commit()
-                        
-                        return TranslateResponse(
-                            translation=parsed.get("translation", "Translation not available"),
-                            explanation=parsed.get("explanation", "Explanation not available"),
-                            examples=parsed.get("examples", []),
-                            cached=False,
-                            cache_hit_count=None
-                        )
-                    except json.JSONDecodeError:
-                        # If JSON parsing fails, try to extract translation from text
-                        print(f"JSON parsing failed for response: {response_text}")
-                        # Look for translation pattern in the response
-                        lines = response_text.split('\n')
-                        translation = f"[{request.language}] {request.term}"
-                        explanation = response_text
-                        
-                        # Try to find translation in the response
-                        for line in lines:
-                            if 'translation' in line.lower() and ':' in line:
-                                translation = line.split(':', 1)[1].strip().strip('"')
-                                break
-                        
-                        return TranslateResponse(
-                            translation=translation,
-                            explanation=explanation,
-                            examples=get_age_appropriate_examples(request.term, request.language, request.child_age),
-                            cached=False,
-                            cache_hit_count=None
-                        )
-            
-            # Unexpected response format
-            print(f"Unexpected Gemini response format: {data}")
-            raise HTTPException(
-                status_code=500,
-                detail="Translation service returned an unexpected response format. Please try again later."
-            )
-            
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = TRANSLATE_CACHE_CONTROL
+        else:
+            # Mock and fallback responses must not be stored
+            response.headers["Cache-Control"] = "no-store"
+
+        return result.response
+
     except httpx.TimeoutException:
         print("Gemini API request timed out")
         raise HTTPException(
             status_code=504,
             detail="Translation request timed out. Please try again later."
         )
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Translation error: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Translation service error. Please try again later."
-        ) 
\ No newline at end of file
+        )
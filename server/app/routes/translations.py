@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
-from ..models import User
+from ..models import User, Translation as TranslationModel
 from ..schemas import Translation, TranslationCreate
 from ..auth import get_current_user
 from ..crud import get_translations, create_translation, update_translation_bookmark
+from ..search import search_words
 
 router = APIRouter(prefix="/translations", tags=["translations"])
 
@@ -14,10 +15,23 @@ router = APIRouter(prefix="/translations", tags=["translations"])
 async def get_translation_history(
     skip: int = 0,
     limit: int = 100,
+    search: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get translation history for the current user"""
+    """Get translation history for the current user, optionally searched by term"""
+    if search:
+        # Trigram search on original_term, best matches first
+        results = search_words(
+            db,
+            TranslationModel,
+            [TranslationModel.original_term],
+            search,
+            filters=[TranslationModel.user_id == current_user.id],
+            skip=skip,
+            limit=limit
+        )
+        return [result.row for result in results]
     translations = get_translations(db, current_user.id, skip=skip, limit=limit)
     return translations
 
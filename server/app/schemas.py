@@ -158,6 +158,23 @@ class Story(StoryBase):
         from_attributes = True
 
 
+class StorySummary(BaseModel):
+    """Story list item; only the fields selected with `fields=` are returned"""
+    id: int
+    user_id: Optional[str] = None
+    original_words: Optional[List[str]] = None
+    story_title: Optional[str] = None
+    story_snippet: Optional[str] = None
+    story_content: Optional[str] = None
+    story_theme: Optional[str] = None
+    story_length: Optional[str] = None
+    target_age_range: Optional[str] = None
+    target_language: Optional[str] = None
+    view_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class StoryGenerationRequest(BaseModel):
     words: List[str]
     theme: Optional[str] = None
@@ -167,6 +184,34 @@ class StoryGenerationRequest(BaseModel):
     age_range: Optional[str] = None
     original_word: Optional[str] = None
     translated_word: Optional[str] = None
+    # Accept a previously generated story for an identical request
+    allow_reuse: bool = False
+
+
+class StoryBatchGenerationRequest(BaseModel):
+    requests: List[StoryGenerationRequest]
+
+
+class StoryGenerateAndSaveRequest(StoryGenerationRequest):
+    story_title: Optional[str] = None  # Defaults to a title built from the words and theme
+    include_content: bool = False
+
+
+class GeneratedStorySummary(BaseModel):
+    id: int
+    user_id: str
+    original_words: List[str]
+    story_title: str
+    story_theme: Optional[str] = None
+    story_length: Optional[str] = None
+    target_age_range: Optional[str] = None
+    target_language: Optional[str] = None
+    created_at: datetime
+    reused: bool = False
+    story_content: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 
 # Image schemas
@@ -193,7 +238,11 @@ class Image(ImageBase):
     id: int
     user_id: str
     image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
+    renditions: Optional[Dict[str, Any]] = None
     status: str
+    trace_id: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -201,10 +250,39 @@ class Image(ImageBase):
         from_attributes = True
 
 
+class ImageSummary(BaseModel):
+    """Image list item; only the fields selected with `fields=` are returned"""
+    id: int
+    user_id: Optional[str] = None
+    original_word: Optional[str] = None
+    translated_word: Optional[str] = None
+    target_language: Optional[str] = None
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
+    renditions: Optional[Dict[str, Any]] = None
+    generation_prompt: Optional[str] = None
+    custom_instructions: Optional[str] = None
+    status: Optional[str] = None
+    child_age: Optional[int] = None
+    title: Optional[str] = None
+    trace_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class ImageGenerationRequest(BaseModel):
     original_word: str
     translated_word: str
     target_language: str
     custom_instructions: Optional[str] = None
     child_age: Optional[int] = None
-    title: Optional[str] = None 
\ No newline at end of file
+    title: Optional[str] = None
+    # Serve a previously generated image for identical inputs (see image_cache.py)
+    allow_reuse: bool = True 
+    # Variants to generate; more than one skips reuse
+    number_of_images: int = 1
+
+
+class ImageBatchGenerationRequest(BaseModel):
+    requests: List[ImageGenerationRequest]
\ No newline at end of file
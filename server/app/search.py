@@ -0,0 +1,175 @@
+from typing import Any, List, NamedTuple, Optional
+
+from sqlalchemy import and_, case, cast, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from .fts import TS_CONFIGS, DEFAULT_TS_CONFIG, ts_config_for, search_configs
+from .models import Story
+
+# ts_headline options for result snippets
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter= … "
+
+
+class StorySearchResult(NamedTuple):
+    story: Story
+    rank: float
+    snippet: Optional[str]
+
+
+def story_ts_config():
+    """Per-row text search configuration, matching the one used for search_vector"""
+    return cast(
+        case(
+            *[(func.lower(Story.target_language) == language, literal(config)) for language, config in TS_CONFIGS.items()],
+            else_=literal(DEFAULT_TS_CONFIG)
+        ),
+        REGCONFIG
+    )
+
+
+def build_tsquery(search: str, language: Optional[str] = None):
+    """
+    Parse a user search (web search syntax) into a tsquery.
+
+    With a language filter only that configuration is needed; otherwise the
+    query is parsed with every configuration and OR-ed together, so stemmed
+    vectors in any language can match.
+    """
+    configs = [ts_config_for(language)] if language else search_configs()
+    query = None
+    for config in configs:
+        parsed = func.websearch_to_tsquery(cast(literal(config), REGCONFIG), search)
+        query = parsed if query is None else query.op("||")(parsed)
+    return query
+
+
+def story_search_conditions(search: str, tsquery, language: Optional[str] = None, age_group: Optional[str] = None):
+    """WHERE conditions and rank expression for a story search"""
+    matches = Story.search_vector.op("@@")(tsquery)
+    rank = func.ts_rank_cd(Story.search_vector, tsquery)
+    conditions = []
+    if not language or ts_config_for(language) == DEFAULT_TS_CONFIG:
+        # 'simple' keeps unspaced text (Chinese, Japanese, ...) as whole-sentence
+        # tokens, so those stories also match on a substring. Written as
+        # (fts OR title OR content) AND (fts OR unstemmed) so the first
+        # condition can be a BitmapOr over the GIN indexes.
+        unstemmed = func.lower(func.coalesce(Story.target_language, "")).notin_(list(TS_CONFIGS))
+        in_title = Story.story_title.ilike(f"%{search}%")
+        in_content = Story.story_content.ilike(f"%{search}%")
+        conditions += [or_(matches, in_title, in_content), or_(matches, unstemmed)]
+        # Same weights ts_rank_cd gives one occurrence in a title (A) or body (C)
+        substring_rank = case(
+            (and_(unstemmed, in_title), 1.0),
+            (and_(unstemmed, in_content), 0.2),
+            else_=0.0
+        )
+        rank = func.greatest(rank, substring_rank)
+    else:
+        conditions.append(matches)
+    if language:
+        conditions.append(Story.target_language == language)
+    if age_group:
+        conditions.append(Story.target_age_range == age_group)
+    return conditions, rank
+
+
+def search_stories(
+    db: Session,
+    search: str,
+    language: Optional[str] = None,
+    age_group: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    options: Optional[list] = None
+) -> List[StorySearchResult]:
+    """
+    Full-text search over story titles, themes and content.
+
+    Matches use the GIN index on stories.search_vector and are ordered by
+    ts_rank_cd, newest first on ties. Stories in languages without a
+    stemmer also match on a title or content substring, served by the
+    trigram indexes, as the search vector can't split unspaced scripts.
+    Highlighted snippets are only built for the returned page. `options`
+    are applied to the Story query, e.g. to load only summary columns.
+    """
+    tsquery = build_tsquery(search, language)
+    conditions, rank = story_search_conditions(search, tsquery, language, age_group)
+    ranked = (
+        select(Story.id, rank.label("rank"))
+        .where(*conditions)
+        .order_by(rank.desc(), Story.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+        .subquery()
+    )
+
+    snippet = func.ts_headline(story_ts_config(), Story.story_content, tsquery, HEADLINE_OPTIONS)
+    rows = (
+        db.query(Story, ranked.c.rank, snippet)
+        .join(ranked, Story.id == ranked.c.id)
+        .options(*(options or []))
+        .order_by(ranked.c.rank.desc(), Story.created_at.desc())
+        .all()
+    )
+    return [StorySearchResult(story, float(row_rank), row_snippet) for story, row_rank, row_snippet in rows]
+
+
+def count_stories(db: Session, search: str, language: Optional[str] = None, age_group: Optional[str] = None) -> int:
+    """Number of stories search_stories would match"""
+    conditions, _ = story_search_conditions(search, build_tsquery(search, language), language, age_group)
+    return db.query(func.count(Story.id)).filter(*conditions).scalar()
+
+
+class WordSearchResult(NamedTuple):
+    row: Any
+    score: float
+
+
+def word_similarity_score(columns: list, search: str):
+    """
+    Relevance of a short word search: best trigram similarity across the
+    columns, plus 1 when any column contains the term as a substring.
+    """
+    similarity = func.greatest(*[func.similarity(column, search) for column in columns]) \
+        if len(columns) > 1 else func.similarity(columns[0], search)
+    substring = or_(*[column.ilike(f"%{search}%") for column in columns])
+    return case((substring, 1.0), else_=0.0) + similarity
+
+
+def word_search_filter(columns: list, search: str):
+    """
+    Rows where any column contains the term or is similar to it.
+
+    Both the ILIKE and the % (similarity) operator are served by the
+    gin_trgm_ops indexes, so typo-tolerant matches don't scan the table.
+    """
+    return or_(*[or_(column.ilike(f"%{search}%"), column.op("%")(search)) for column in columns])
+
+
+def search_words(
+    db: Session,
+    model,
+    columns: list,
+    search: str,
+    filters: Optional[list] = None,
+    skip: int = 0,
+    limit: int = 20,
+    options: Optional[list] = None
+) -> List[WordSearchResult]:
+    """Trigram search over short word columns, best matches first"""
+    score = word_similarity_score(columns, search)
+    query = db.query(model, score).filter(word_search_filter(columns, search)).options(*(options or []))
+    for condition in filters or []:
+        query = query.filter(condition)
+    rows = query.order_by(score.desc(), model.created_at.desc()).offset(skip).limit(limit).all()
+    return [WordSearchResult(row, float(row_score)) for row, row_score in rows]
+
+
+def count_words(db: Session, model, columns: list, search: str, filters: Optional[list] = None) -> int:
+    """Number of rows search_words would match"""
+    query = db.query(func.count(model.id)).filter(word_search_filter(columns, search))
+    for condition in filters or []:
+        query = query.filter(condition)
+    return query.scalar()
+
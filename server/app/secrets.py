@@ -1,37 +1,172 @@
 import os
+import json
+import time
+import threading
+from typing import Dict, Optional, Tuple
 from google.cloud import secretmanager
 
+# How long a fetched secret is served from memory before it must be re-read
+SECRET_CACHE_TTL = int(os.getenv("SECRET_CACHE_TTL", 600))  # 10 minutes
+# How often the background thread checks for secrets that are about to expire
+SECRET_REFRESH_INTERVAL = int(os.getenv("SECRET_REFRESH_INTERVAL", 60))
+
+
+class SecretProvider:
+    """
+    In-memory secret cache in front of Google Cloud Secret Manager.
+
+    Secrets are fetched once with a single shared client, served from memory
+    for SECRET_CACHE_TTL seconds and refreshed by a background thread shortly
+    before they expire, so rotated values are picked up without a remote call
+    on the request path. Seeded values (from a local JSON file, the
+    environment, or seed()) take precedence and never hit Secret Manager.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        ttl: int = SECRET_CACHE_TTL,
+        refresh_interval: int = SECRET_REFRESH_INTERVAL,
+        use_environment: bool = False
+    ):
+        self.project_id = project_id
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.use_environment = use_environment
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._cache: Dict[str, Tuple[str, float]] = {}
+        self._cache_lock = threading.Lock()
+        self._seeded: Dict[str, str] = {}
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = secretmanager.SecretManagerServiceClient()
+        return self._client
+
+    def seed(self, values: Dict[str, str]):
+        """Seed secret values that are served without contacting Secret Manager"""
+        self._seeded.update(values)
+
+    def seed_from_file(self, path: str):
+        """Seed secrets from a JSON file mapping secret names to values"""
+        with open(path) as f:
+            self.seed({name: str(value) for name, value in json.load(f).items()})
+
+    def get(self, secret_name: str, default: str = None) -> str:
+        """
+        Get a secret value.
+
+        Args:
+            secret_name: Name of the secret in Secret Manager
+            default: Default value if the secret cannot be loaded
+
+        Returns:
+            The secret value or default
+        """
+        if secret_name in self._seeded:
+            return self._seeded[secret_name]
+
+        if self.use_environment:
+            env_value = os.getenv(secret_name.upper().replace("-", "_"))
+            if env_value:
+                return env_value
+            return default
+
+        cached = self._cache.get(secret_name)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        try:
+            value = self._fetch(secret_name)
+        except Exception as e:
+            print(f"Warning: Could not load secret '{secret_name}' from Secret Manager: {e}")
+            # Prefer a stale value over the default if we had one
+            return cached[0] if cached else default
+
+        self._store(secret_name, value)
+        self._ensure_refresh_thread()
+        return value
+
+    def invalidate(self, secret_name: Optional[str] = None):
+        """Drop one or all cached secrets so the next read fetches them again"""
+        with self._cache_lock:
+            if secret_name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(secret_name, None)
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop_event.set()
+
+    def _fetch(self, secret_name: str) -> str:
+        name = f"projects/{self.project_id}/secrets/{secret_name}/versions/latest"
+        response = self.client.access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+
+    def _store(self, secret_name: str, value: str):
+        with self._cache_lock:
+            self._cache[secret_name] = (value, time.monotonic() + self.ttl)
+
+    def _ensure_refresh_thread(self):
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        with self._client_lock:
+            if self._refresh_thread is None or not self._refresh_thread.is_alive():
+                self._refresh_thread = threading.Thread(
+                    target=self._refresh_loop,
+                    name="secret-refresh",
+                    daemon=True
+                )
+                self._refresh_thread.start()
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            # Refresh anything that would expire before the next check
+            deadline = time.monotonic() + self.refresh_interval
+            for secret_name, (_, expires_at) in list(self._cache.items()):
+                if expires_at > deadline:
+                    continue
+                try:
+                    self._store(secret_name, self._fetch(secret_name))
+                except Exception as e:
+                    # Keep serving the old value; the request path retries after expiry
+                    print(f"Warning: Background refresh of secret '{secret_name}' failed: {e}")
+
+
+# Global instance. In local development, environment variables are used
+# instead of Secret Manager.
+secret_provider = SecretProvider(
+    project_id=os.getenv("GOOGLE_CLOUD_PROJECT", "vocabloom-467020"),
+    use_environment=os.getenv("ENVIRONMENT") == "local"
+)
+
+# Optional JSON file of secret values, useful for tests and load testing
+if os.getenv("SECRETS_FILE"):
+    try:
+        secret_provider.seed_from_file(os.getenv("SECRETS_FILE"))
+    except Exception as e:
+        print(f"Warning: Could not seed secrets from '{os.getenv('SECRETS_FILE')}': {e}")
+
+
 def get_secret(secret_name: str, default: str = None) -> str:
     """
     Get a secret from Google Cloud Secret Manager or environment variables.
-    
+
     Args:
         secret_name: Name of the secret in Secret Manager
         default: Default value if secret is not found
-    
+
     Returns:
         The secret value or default
     """
-    # In local development, prefer environment variables over Secret Manager
-    if os.getenv("ENVIRONMENT") == "local":
-        # For local development, use environment variables directly
-        env_var_name = secret_name.upper().replace("-", "_")
-        env_value = os.getenv(env_var_name)
-        if env_value:
-            return env_value
-        return default
-    
-    # In production, use Secret Manager
-    try:
-        project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "vocabloom-467020")
-        client = secretmanager.SecretManagerServiceClient()
-        name = f"projects/{project_id}/secrets/{secret_name}/versions/latest"
-        response = client.access_secret_version(request={"name": name})
-        return response.payload.data.decode("UTF-8")
-    except Exception as e:
-        print(f"Warning: Could not load secret '{secret_name}' from Secret Manager: {e}")
-        # Return default if Secret Manager fails
-        return default
+    return secret_provider.get(secret_name, default)
 
 def get_gemini_api_key() -> str:
     """Get the Gemini API key from Secret Manager or environment."""
@@ -39,4 +174,4 @@ def get_gemini_api_key() -> str:
 
 def get_firebase_admin_key() -> str:
     """Get the Firebase admin key from Secret Manager or environment."""
-    return get_secret("firebase-admin-key", None) 
\ No newline at end of file
+    return get_secret("firebase-admin-key", None)
@@ -0,0 +1,6 @@
+import json
+
+
+def format_sse(event: str, data: dict) -> str:
+    """One server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
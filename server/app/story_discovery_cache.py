@@ -0,0 +1,38 @@
+import os
+import json
+import hashlib
+from typing import List, Optional
+
+from .redis_quota import redis_client
+
+# Filtered story discovery pages are public and identical for every caller,
+# so each filter combination is cached briefly. New stories show up once the
+# entry expires.
+STORY_DISCOVERY_CACHE_ENABLED = os.getenv("STORY_DISCOVERY_CACHE_ENABLED", "true").lower() == "true"
+STORY_DISCOVERY_CACHE_TTL = int(os.getenv("STORY_DISCOVERY_CACHE_TTL", "60"))  # seconds
+
+
+def get_story_discovery_key(filters: dict) -> str:
+    digest = hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    return f"story_discovery:{digest}"
+
+
+def get_cached_story_discovery(filters: dict) -> Optional[List[dict]]:
+    if not STORY_DISCOVERY_CACHE_ENABLED:
+        return None
+    try:
+        raw = redis_client.get(get_story_discovery_key(filters))
+    except Exception as e:
+        print(f"Redis error reading story discovery cache: {e}")
+        return None
+    return json.loads(raw) if raw else None
+
+
+def cache_story_discovery(filters: dict, stories: List[dict]):
+    """Cache a page of JSON-ready story summaries"""
+    if not STORY_DISCOVERY_CACHE_ENABLED:
+        return
+    try:
+        redis_client.setex(get_story_discovery_key(filters), STORY_DISCOVERY_CACHE_TTL, json.dumps(stories))
+    except Exception as e:
+        print(f"Redis error writing story discovery cache: {e}")
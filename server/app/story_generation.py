@@ -0,0 +1,141 @@
+from typing import AsyncIterator
+
+from .schemas import StoryGenerationRequest
+from .prompts import (
+    STORY_TEMPLATE, STORY_WORD_HIGHLIGHTING_TEMPLATE, PROMPT_CUSTOM_TEXT_MAX_CHARS, PROMPT_FIELD_MAX_CHARS,
+    cap_text, record_prompt
+)
+from .gemini import STORY_MODEL, generate_content, stream_generate_content, extract_text, GeminiAPIError
+
+# generationConfig shared by every story generation call
+STORY_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 1024
+}
+
+
+class StoryGenerationError(Exception):
+    """Raised when Gemini fails to produce a story"""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+def build_story_prompt(request: StoryGenerationRequest) -> str:
+    """Build the Gemini prompt for a story generation request"""
+    words_text = ", ".join(cap_text(word, PROMPT_FIELD_MAX_CHARS) for word in request.words)
+
+    # Determine age-appropriate content based on age_range
+    age_guidance = ""
+    if request.age_range:
+        if request.age_range == "toddler" or (isinstance(request.age_range, int) and request.age_range <= 3):
+            age_guidance = "very simple language, repetitive patterns, basic concepts, 1-2 sentences per page"
+        elif request.age_range == "preschool" or (isinstance(request.age_range, int) and 4 <= request.age_range <= 5):
+            age_guidance = "simple language, colorful descriptions, basic vocabulary, short sentences"
+        elif request.age_range == "elementary" or (isinstance(request.age_range, int) and 6 <= request.age_range <= 10):
+            age_guidance = "engaging language, educational elements, clear plot, age-appropriate themes"
+        elif request.age_range == "middle_school" or (isinstance(request.age_range, int) and 11 <= request.age_range <= 13):
+            age_guidance = "more complex language, deeper themes, character development, educational content"
+        else:
+            age_guidance = "engaging language suitable for children, educational elements, clear plot"
+    else:
+        age_guidance = "engaging language suitable for children, educational elements, clear plot"
+
+    # Language instruction
+    language_instruction = ""
+    if request.target_language and request.target_language != "None" and request.target_language.strip():
+        language_instruction = f"IMPORTANT: Write the entire story in {request.target_language} language. Do not use English unless specifically requested. "
+    else:
+        language_instruction = "Write the story in English. "
+
+    # Word highlighting instruction
+    word_highlighting = ""
+    if request.words and len(request.words) > 0:
+        # Highlight all selected words
+        word_highlighting = STORY_WORD_HIGHLIGHTING_TEMPLATE.render(words_text=words_text)
+
+    # Theme instruction - let AI be creative if no theme specified
+    theme = cap_text(request.theme, PROMPT_FIELD_MAX_CHARS)
+    if theme:
+        theme_instruction = f"Theme: {theme}"
+    else:
+        theme_instruction = "Theme: Be creative and choose an engaging theme that fits the words naturally."
+
+    custom_prompt = cap_text(request.custom_prompt, PROMPT_CUSTOM_TEXT_MAX_CHARS)
+
+    return STORY_TEMPLATE.render(
+        language_instruction=language_instruction,
+        words_text=words_text,
+        theme_instruction=theme_instruction,
+        max_words=request.max_words,
+        age_guidance=age_guidance,
+        target_language=request.target_language,
+        word_highlighting=word_highlighting,
+        custom_instructions=f"Additional instructions: {custom_prompt}" if custom_prompt else ""
+    )
+
+
+async def generate_story_text(request: StoryGenerationRequest, api_key: str) -> str:
+    """
+    Generate story text with Gemini.
+
+    Raises:
+        StoryGenerationError: If Gemini fails or returns no content
+        httpx.TimeoutException: If the Gemini request times out
+    """
+    # Log the request for debugging
+    print(f"Story generation request: words={request.words}, theme={request.theme}, max_words={request.max_words}")
+
+    prompt = build_story_prompt(request)
+    record_prompt("story", prompt)
+
+    try:
+        data = await generate_content(
+            STORY_MODEL,
+            prompt,
+            api_key,
+            generation_config=STORY_GENERATION_CONFIG,
+            timeout=30.0
+        )
+    except GeminiAPIError:
+        raise StoryGenerationError("Failed to generate story from Gemini API")
+
+    # Extract the generated text
+    story_content = extract_text(data)
+    if story_content is None:
+        raise StoryGenerationError("No story content generated")
+    return story_content
+
+
+async def stream_story_text(request: StoryGenerationRequest, api_key: str) -> AsyncIterator[str]:
+    """
+    Generate story text with Gemini, yielding chunks as they arrive.
+
+    Raises:
+        StoryGenerationError: If Gemini fails or returns no content
+        httpx.TimeoutException: If the Gemini request times out
+    """
+    print(f"Story stream request: words={request.words}, theme={request.theme}, max_words={request.max_words}")
+
+    prompt = build_story_prompt(request)
+    record_prompt("story", prompt)
+
+    received = False
+    try:
+        async for chunk in stream_generate_content(
+            STORY_MODEL,
+            prompt,
+            api_key,
+            generation_config=STORY_GENERATION_CONFIG,
+            timeout=30.0
+        ):
+            received = True
+            yield chunk
+    except GeminiAPIError:
+        raise StoryGenerationError("Failed to generate story from Gemini API")
+
+    if not received:
+        raise StoryGenerationError("No story content generated")
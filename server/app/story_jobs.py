@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .schemas import StoryGenerationRequest
+from .redis_quota import redis_client, end_generation, decrement_quota
+from .story_generation import generate_story_text, StoryGenerationError
+from .story_pool import add_pooled_story
+
+# Worker pool configuration
+STORY_JOB_WORKERS = int(os.getenv("STORY_JOB_WORKERS", "4"))
+STORY_JOB_QUEUE_SIZE = int(os.getenv("STORY_JOB_QUEUE_SIZE", "100"))
+# How long job results stay available for polling (seconds)
+STORY_JOB_TTL = int(os.getenv("STORY_JOB_TTL", "3600"))
+# An instance that hasn't refreshed its heartbeat for this long is gone, and
+# its unfinished jobs are failed and refunded (seconds)
+STORY_JOB_INSTANCE_TTL = int(os.getenv("STORY_JOB_INSTANCE_TTL", "60"))
+
+# Ids of queued and running jobs, across all instances
+UNFINISHED_STORY_JOBS_KEY = "story_jobs:unfinished"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class StoryJobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+def get_story_job_key(job_id: str) -> str:
+    return f"story_job:{job_id}"
+
+
+def get_story_job_instance_key(instance_id: str) -> str:
+    return f"story_jobs:instance:{instance_id}"
+
+
+class StoryJobManager:
+    """
+    Runs story generations in a bounded pool of asyncio workers.
+
+    Job state is stored in Redis as JSON under story_job:{id} with a TTL, so
+    any API instance can answer status polls. If Redis is unavailable the
+    state is kept in process memory instead.
+
+    The queue itself lives in this process, so jobs are lost when it stops.
+    Each instance keeps a heartbeat key alive while it runs; every instance
+    periodically fails the unfinished jobs of instances whose heartbeat has
+    expired and gives back their story quota.
+    """
+
+    def __init__(self, workers: int = STORY_JOB_WORKERS, queue_size: int = STORY_JOB_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._local_jobs: Dict[str, Dict[str, Any]] = {}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        print(f"Started {self.workers} story generation workers ({self.instance_id})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        # Let other instances recover this one's jobs right away
+        try:
+            redis_client.delete(get_story_job_instance_key(self.instance_id))
+        except Exception as e:
+            print(f"Redis error clearing story job heartbeat: {e}")
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await asyncio.to_thread(
+                    redis_client.setex, get_story_job_instance_key(self.instance_id), STORY_JOB_INSTANCE_TTL, "1"
+                )
+                recovered = await asyncio.to_thread(recover_orphaned_jobs)
+                if recovered:
+                    print(f"Failed {recovered} story jobs left by stopped instances")
+            except Exception as e:
+                print(f"Error in story job heartbeat: {e}")
+            await asyncio.sleep(STORY_JOB_INSTANCE_TTL / 3)
+
+    def _save(self, job: Dict[str, Any]):
+        job["updated_at"] = time.time()
+        try:
+            redis_client.setex(get_story_job_key(job["id"]), STORY_JOB_TTL, json.dumps(job))
+            self._local_jobs.pop(job["id"], None)
+        except Exception as e:
+            print(f"Redis error saving story job {job['id']}: {e}")
+            self._local_jobs[job["id"]] = job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._local_jobs.get(job_id)
+        if job and time.time() - job["updated_at"] <= STORY_JOB_TTL:
+            return job
+        try:
+            raw = redis_client.get(get_story_job_key(job_id))
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            print(f"Redis error loading story job {job_id}: {e}")
+            return None
+
+    def submit(self, user_id: str, request: StoryGenerationRequest, api_key: str) -> Dict[str, Any]:
+        """
+        Queue a story generation and return the job record.
+
+        The caller must already have marked the generation as pending with
+        start_generation; the worker calls end_generation when it finishes.
+
+        Raises:
+            StoryJobQueueFull: If the pool is not running or the queue is full
+        """
+        if self._queue is None or self._queue.full():
+            raise StoryJobQueueFull()
+
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "instance": self.instance_id,
+            "status": JOB_QUEUED,
+            "request": request.model_dump(),
+            "story_content": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._save(job)
+        try:
+            redis_client.sadd(UNFINISHED_STORY_JOBS_KEY, job["id"])
+        except Exception as e:
+            print(f"Redis error tracking story job {job['id']}: {e}")
+        self._queue.put_nowait((job, request, api_key))
+        return job
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job, request, api_key = await self._queue.get()
+            try:
+                job["status"] = JOB_RUNNING
+                self._save(job)
+                try:
+                    job["story_content"] = await generate_story_text(request, api_key)
+                    job["status"] = JOB_COMPLETED
+                    add_pooled_story(request, job["story_content"])
+                except StoryGenerationError as e:
+                    job["status"] = JOB_FAILED
+                    job["error"] = e.detail
+                except httpx.TimeoutException:
+                    job["status"] = JOB_FAILED
+                    job["error"] = "Story generation timed out"
+                except Exception as e:
+                    print(f"Story job {job['id']} failed on worker {worker_id}: {e}")
+                    job["status"] = JOB_FAILED
+                    job["error"] = f"Story generation failed: {str(e)}"
+                self._save(job)
+                try:
+                    redis_client.srem(UNFINISHED_STORY_JOBS_KEY, job["id"])
+                except Exception as e:
+                    print(f"Redis error untracking story job {job['id']}: {e}")
+            finally:
+                end_generation(job["user_id"], 'story')
+                self._queue.task_done()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+def recover_orphaned_jobs() -> int:
+    """
+    Fail the queued and running jobs of instances that are gone, giving
+    back the quota they were charged. Removing a job from the unfinished set
+    claims it, so each job is refunded once even when several instances
+    recover at the same time. Returns the number of jobs failed.
+    """
+    recovered = 0
+    for job_id in redis_client.smembers(UNFINISHED_STORY_JOBS_KEY):
+        raw = redis_client.get(get_story_job_key(job_id))
+        job = json.loads(raw) if raw else None
+        unfinished = job is not None and job["status"] in (JOB_QUEUED, JOB_RUNNING)
+        if unfinished and redis_client.exists(get_story_job_instance_key(job.get("instance", ""))):
+            continue
+        # Finished, expired or orphaned; only the instance that removes it goes on
+        if not redis_client.srem(UNFINISHED_STORY_JOBS_KEY, job_id) or not unfinished:
+            continue
+        job["status"] = JOB_FAILED
+        job["error"] = "Story generation was interrupted. Please try again."
+        job["updated_at"] = time.time()
+        redis_client.setex(get_story_job_key(job_id), STORY_JOB_TTL, json.dumps(job))
+        decrement_quota(job["user_id"], 'story')
+        end_generation(job["user_id"], 'story')
+        recovered += 1
+    return recovered
+
+
+# Global instance, started from the application startup event
+story_jobs = StoryJobManager()
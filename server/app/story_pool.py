@@ -0,0 +1,76 @@
+import os
+import json
+import random
+import hashlib
+from typing import Optional
+
+from .schemas import StoryGenerationRequest
+from .redis_quota import redis_client
+from .lexicon import normalize_term
+
+# Pool of generated stories shared between identical requests. Requests that
+# opt in (allow_reuse) are served a random stored variant once the pool for
+# their canonical request holds STORY_POOL_VARIANTS stories.
+STORY_POOL_ENABLED = os.getenv("STORY_POOL_ENABLED", "true").lower() == "true"
+STORY_POOL_VARIANTS = int(os.getenv("STORY_POOL_VARIANTS", "3"))
+STORY_POOL_TTL = int(os.getenv("STORY_POOL_TTL", str(7 * 24 * 3600)))  # 7 days
+
+
+def canonical_story_request(request: StoryGenerationRequest) -> Optional[dict]:
+    """
+    Canonical form of a story request, or None if it can't be shared.
+
+    Requests with a custom prompt are personalized and never pooled.
+    """
+    if request.custom_prompt and request.custom_prompt.strip():
+        return None
+    return {
+        "words": sorted({normalize_term(word) for word in request.words if word.strip()}),
+        "theme": normalize_term(request.theme) if request.theme else None,
+        "target_language": (request.target_language or "").strip().lower() or None,
+        "age_range": (request.age_range or "").strip().lower() or None,
+        "max_words": request.max_words,
+    }
+
+
+def get_story_pool_key(canonical: dict) -> str:
+    digest = hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+    return f"story_pool:{digest}"
+
+
+def get_pooled_story(request: StoryGenerationRequest) -> Optional[str]:
+    """Return a random pooled variant if the pool for this request is full"""
+    if not STORY_POOL_ENABLED:
+        return None
+    canonical = canonical_story_request(request)
+    if canonical is None:
+        return None
+    key = get_story_pool_key(canonical)
+    try:
+        size = redis_client.llen(key)
+        if size < STORY_POOL_VARIANTS:
+            return None
+        return redis_client.lindex(key, random.randrange(size))
+    except Exception as e:
+        print(f"Redis error reading story pool: {e}")
+        return None
+
+
+def add_pooled_story(request: StoryGenerationRequest, story_content: str) -> bool:
+    """Add a freshly generated story to the pool, keeping the newest variants"""
+    if not STORY_POOL_ENABLED or not story_content:
+        return False
+    canonical = canonical_story_request(request)
+    if canonical is None:
+        return False
+    key = get_story_pool_key(canonical)
+    try:
+        with redis_client.pipeline() as pipe:
+            pipe.lpush(key, story_content)
+            pipe.ltrim(key, 0, STORY_POOL_VARIANTS - 1)
+            pipe.expire(key, STORY_POOL_TTL)
+            pipe.execute()
+        return True
+    except Exception as e:
+        print(f"Redis error writing story pool: {e}")
+        return False
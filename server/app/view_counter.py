@@ -0,0 +1,176 @@
+import os
+import asyncio
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .redis_quota import redis_client
+from .database import SessionLocal
+from .crud import increment_story_view_count
+
+# Story views are counted in Redis and written to stories.view_count in
+# batches, so a popular story doesn't turn every view into a row update.
+# Pending (unflushed) views live in one sorted set scored by count, which
+# also gives the most-viewed pending stories for trending.
+PENDING_VIEWS_KEY = "story_views:pending"
+VIEW_FLUSH_INTERVAL = int(os.getenv("VIEW_FLUSH_INTERVAL", "30"))  # seconds
+VIEW_FLUSH_BATCH_SIZE = int(os.getenv("VIEW_FLUSH_BATCH_SIZE", "1000"))
+
+# Atomically take up to ARGV[1] pending counters out of the sorted set
+TAKE_PENDING_VIEWS_SCRIPT = """
+local items = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1, 'WITHSCORES')
+for i = 1, #items, 2 do
+    redis.call('ZREM', KEYS[1], items[i])
+end
+return items
+"""
+
+BATCH_UPDATE_SQL = text("""
+    UPDATE stories AS s
+    SET view_count = coalesce(s.view_count, 0) + d.delta
+    FROM unnest(CAST(:ids AS integer[]), CAST(:deltas AS integer[])) AS d(id, delta)
+    WHERE s.id = d.id
+""")
+
+
+def get_story_viewers_key(story_id: int) -> str:
+    return f"story_viewers:{story_id}"
+
+
+def record_story_view(db: Session, story_id: int, viewer_id: str):
+    """Count a view and add the viewer to the story's unique-viewer estimate"""
+    try:
+        with redis_client.pipeline() as pipe:
+            pipe.zincrby(PENDING_VIEWS_KEY, 1, str(story_id))
+            pipe.pfadd(get_story_viewers_key(story_id), viewer_id)
+            pipe.execute()
+    except Exception as e:
+        print(f"Redis error recording story view, writing through: {e}")
+        increment_story_view_count(db, story_id)
+
+
+def get_pending_views(story_ids: Iterable[int]) -> Dict[int, int]:
+    """Views recorded in Redis but not yet flushed to Postgres"""
+    story_ids = list(story_ids)
+    if not story_ids:
+        return {}
+    try:
+        with redis_client.pipeline() as pipe:
+            for story_id in story_ids:
+                pipe.zscore(PENDING_VIEWS_KEY, str(story_id))
+            scores = pipe.execute()
+    except Exception as e:
+        print(f"Redis error reading pending story views: {e}")
+        return {}
+    return {story_id: int(score) for story_id, score in zip(story_ids, scores) if score}
+
+
+def get_unique_viewers(story_ids: Iterable[int]) -> Dict[int, int]:
+    """Estimated unique viewers per story (HyperLogLog, ~1% error)"""
+    story_ids = list(story_ids)
+    if not story_ids:
+        return {}
+    try:
+        with redis_client.pipeline() as pipe:
+            for story_id in story_ids:
+                pipe.pfcount(get_story_viewers_key(story_id))
+            counts = pipe.execute()
+    except Exception as e:
+        print(f"Redis error reading unique story viewers: {e}")
+        return {}
+    return dict(zip(story_ids, counts))
+
+
+def get_top_pending_story_ids(limit: int) -> List[int]:
+    """Stories with the most views waiting to be flushed"""
+    try:
+        return [int(member) for member in redis_client.zrevrange(PENDING_VIEWS_KEY, 0, limit - 1)]
+    except Exception as e:
+        print(f"Redis error reading top pending story views: {e}")
+        return []
+
+
+def live_view_count(story, pending: Dict[int, int]) -> int:
+    return (story.view_count or 0) + pending.get(story.id, 0)
+
+
+def _take_pending_views(batch_size: int) -> List[Tuple[int, int]]:
+    items = redis_client.eval(TAKE_PENDING_VIEWS_SCRIPT, 1, PENDING_VIEWS_KEY, batch_size)
+    return [(int(items[i]), int(float(items[i + 1]))) for i in range(0, len(items), 2)]
+
+
+def _restore_pending_views(deltas: List[Tuple[int, int]]):
+    with redis_client.pipeline() as pipe:
+        for story_id, delta in deltas:
+            pipe.zincrby(PENDING_VIEWS_KEY, delta, str(story_id))
+        pipe.execute()
+
+
+def flush_view_counts(batch_size: int = VIEW_FLUSH_BATCH_SIZE) -> int:
+    """
+    Move pending view counts from Redis to stories.view_count.
+
+    Each batch is taken from Redis atomically and applied with one UPDATE;
+    if the UPDATE fails the counts are put back. Safe to run on several
+    instances at once. Returns the number of views flushed.
+    """
+    flushed = 0
+    while True:
+        deltas = _take_pending_views(batch_size)
+        if not deltas:
+            return flushed
+        db = SessionLocal()
+        try:
+            db.execute(BATCH_UPDATE_SQL, {
+                "ids": [story_id for story_id, _ in deltas],
+                "deltas": [delta for _, delta in deltas],
+            })
+            db.commit()
+            flushed += sum(delta for _, delta in deltas)
+        except Exception:
+            db.rollback()
+            _restore_pending_views(deltas)
+            raise
+        finally:
+            db.close()
+        if len(deltas) < batch_size:
+            return flushed
+
+
+class ViewCountFlusher:
+    """Background task that flushes pending view counts every VIEW_FLUSH_INTERVAL seconds"""
+
+    def __init__(self, interval: int = VIEW_FLUSH_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        # Final flush so a deploy doesn't hold views back for a full interval
+        await self._flush()
+
+    async def _flush(self):
+        try:
+            flushed = await asyncio.to_thread(flush_view_counts)
+            if flushed:
+                print(f"Flushed {flushed} story views")
+        except Exception as e:
+            print(f"Error flushing story views: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._flush()
+
+
+# Global instance, started from the application startup event
+view_count_flusher = ViewCountFlusher()
@@ -0,0 +1,11 @@
+"""
+Load-testing harness for the Vocabloom API.
+
+- gemini_stub: local stand-in for the Gemini generateContent and
+  streamGenerateContent endpoints with configurable latency and errors
+- fake_auth: issues unsigned Firebase ID tokens accepted when the API runs
+  with FIREBASE_AUTH_EMULATOR_HOST set
+- load: scripted load scenarios reporting latency percentiles and throughput
+
+See benchmarks/README.md for usage.
+"""
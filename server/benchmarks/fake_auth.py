@@ -0,0 +1,74 @@
+"""
+Fake Firebase token issuer.
+
+When FIREBASE_AUTH_EMULATOR_HOST is set, firebase-admin skips signature
+verification and only checks the token claims, so an unsigned token with the
+right audience and issuer is accepted by app.auth.get_current_user. This lets
+load tests authenticate many synthetic users without a Firebase project.
+The auth emulator itself does not need to be running.
+"""
+import argparse
+import base64
+import json
+import os
+import time
+from typing import Dict, Optional
+
+
+def _b64url(data: Dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def issue_token(
+    uid: str,
+    email: Optional[str] = None,
+    project_id: Optional[str] = None,
+    lifetime: int = 3600
+) -> str:
+    """
+    Issue an unsigned Firebase ID token for a synthetic user.
+
+    Args:
+        uid: Firebase UID for the user
+        email: Email claim (defaults to <uid>@loadtest.local)
+        project_id: Firebase project id; must match the API's project
+        lifetime: Token lifetime in seconds
+
+    Returns:
+        Encoded JWT string
+    """
+    project_id = project_id or os.getenv("GOOGLE_CLOUD_PROJECT", "vocabloom-467020")
+    now = int(time.time())
+    header = {"alg": "none", "typ": "JWT"}
+    payload = {
+        "iss": f"https://securetoken.google.com/{project_id}",
+        "aud": project_id,
+        "auth_time": now,
+        "user_id": uid,
+        "sub": uid,
+        "iat": now,
+        "exp": now + lifetime,
+        "email": email or f"{uid}@loadtest.local",
+        "email_verified": True,
+        "firebase": {"identities": {}, "sign_in_provider": "password"},
+    }
+    return f"{_b64url(header)}.{_b64url(payload)}."
+
+
+def issue_tokens(count: int, prefix: str = "loadtest", project_id: Optional[str] = None) -> Dict[str, str]:
+    """Issue tokens for `count` synthetic users, keyed by uid"""
+    return {
+        f"{prefix}-{i}": issue_token(f"{prefix}-{i}", project_id=project_id)
+        for i in range(count)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Issue a fake Firebase ID token")
+    parser.add_argument("uid", help="Firebase UID to issue the token for")
+    parser.add_argument("--email", default=None)
+    parser.add_argument("--project-id", default=None)
+    parser.add_argument("--lifetime", type=int, default=3600)
+    args = parser.parse_args()
+    print(issue_token(args.uid, args.email, args.project_id, args.lifetime))
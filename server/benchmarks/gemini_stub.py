@@ -0,0 +1,187 @@
+"""
+Local stand-in for the Gemini generateContent / streamGenerateContent API.
+
+Point the API at it with GEMINI_API_BASE=http://localhost:<port>/v1beta/models.
+Responses follow the real response shape. When the request carries a
+responseSchema, the stub returns JSON that matches the schema, so the
+structured-output path is exercised as well.
+
+Latency specs:
+    fixed:<ms>                  always <ms>
+    uniform:<min_ms>:<max_ms>   uniformly distributed
+    lognormal:<median_ms>:<sigma>
+
+Error specs are comma-separated <status>:<probability> pairs, e.g.
+"503:0.02,429:0.01".
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+from typing import Any, Dict, List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STORY_TEXT = (
+    "Once upon a time, a little **dog** found a bright red **ball** in the park. "
+    "The **dog** ran and jumped, chasing the **ball** across the green grass. "
+    "A friendly bird sang from a tall tree while the sun warmed the meadow. "
+    "At the end of the day, the **dog** carried the **ball** home and fell asleep, "
+    "dreaming of tomorrow's adventures."
+)
+
+
+class LatencyModel:
+    def __init__(self, spec: str):
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        if self.kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency model: {spec}")
+
+    def sample(self) -> float:
+        """Return a latency in seconds"""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = random.uniform(self.params[0], self.params[1])
+        else:
+            ms = random.lognormvariate(math.log(self.params[0]), self.params[1])
+        return max(ms, 0.0) / 1000.0
+
+
+def parse_errors(spec: str) -> List[Tuple[int, float]]:
+    if not spec:
+        return []
+    errors = []
+    for item in spec.split(","):
+        code, probability = item.split(":")
+        errors.append((int(code), float(probability)))
+    return errors
+
+
+def fake_value(schema: Dict[str, Any], path: str = "value") -> Any:
+    """Build a value that matches a Gemini responseSchema"""
+    schema_type = schema.get("type", "STRING").upper()
+    if schema_type == "OBJECT":
+        return {
+            name: fake_value(prop, name)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if schema_type == "ARRAY":
+        count = 8 if schema.get("items", {}).get("type", "").upper() == "OBJECT" else 3
+        return [fake_value(schema.get("items", {}), f"{path}{i}") for i in range(count)]
+    if schema_type in ("INTEGER", "NUMBER"):
+        return random.randint(1, 100)
+    if schema_type == "BOOLEAN":
+        return random.random() < 0.5
+    return f"stub {path} {random.randint(1, 9999)}"
+
+
+def response_text(body: Dict[str, Any]) -> str:
+    config = body.get("generationConfig") or {}
+    if config.get("responseSchema"):
+        return json.dumps(fake_value(config["responseSchema"]), ensure_ascii=False)
+    return STORY_TEXT
+
+
+def candidate(text: str, finish_reason: str = "STOP") -> Dict[str, Any]:
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": finish_reason,
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": 0,
+            "candidatesTokenCount": max(1, len(text) // 4),
+        },
+    }
+
+
+def create_app(latency: LatencyModel, errors: List[Tuple[int, float]], chunks: int = 8) -> FastAPI:
+    app = FastAPI(title="Gemini stub")
+    app.state.requests = 0
+
+    def pick_error() -> int:
+        roll = random.random()
+        cumulative = 0.0
+        for code, probability in errors:
+            cumulative += probability
+            if roll < cumulative:
+                return code
+        return 0
+
+    @app.post("/v1beta/models/{model_action}")
+    async def model_action(model_action: str, request: Request):
+        app.state.requests += 1
+        model, _, action = model_action.partition(":")
+        body = await request.json()
+
+        error_code = pick_error()
+        if error_code:
+            await asyncio.sleep(latency.sample() / 4)
+            return JSONResponse(
+                status_code=error_code,
+                content={"error": {"code": error_code, "message": "stub error", "status": "UNAVAILABLE"}},
+            )
+
+        text = response_text(body)
+
+        if action == "generateContent":
+            await asyncio.sleep(latency.sample())
+            return candidate(text)
+
+        if action == "streamGenerateContent":
+            total = latency.sample()
+            size = max(1, math.ceil(len(text) / chunks))
+            pieces = [text[i:i + size] for i in range(0, len(text), size)]
+            sse = request.query_params.get("alt") == "sse"
+
+            async def stream():
+                # First token arrives after a fraction of the total latency
+                await asyncio.sleep(total * 0.3)
+                for index, piece in enumerate(pieces):
+                    last = index == len(pieces) - 1
+                    payload = candidate(piece, "STOP" if last else None)
+                    if sse:
+                        yield f"data: {json.dumps(payload, ensure_ascii=False)}\r\n\r\n"
+                    else:
+                        prefix = "[" if index == 0 else ","
+                        yield prefix + json.dumps(payload, ensure_ascii=False)
+                        if last:
+                            yield "]"
+                    if not last:
+                        await asyncio.sleep(total * 0.7 / len(pieces))
+
+            media_type = "text/event-stream" if sse else "application/json"
+            return StreamingResponse(stream(), media_type=media_type)
+
+        return JSONResponse(status_code=404, content={"error": {"message": f"Unknown action {action} for {model}"}})
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local Gemini stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="lognormal:800:0.35", help="Latency spec, e.g. fixed:500")
+    parser.add_argument("--errors", default="", help="Error spec, e.g. 503:0.02,429:0.01")
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks per streamed response")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(LatencyModel(args.latency), parse_errors(args.errors), args.chunks),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
@@ -0,0 +1,248 @@
+"""
+Scripted load scenarios against a running Vocabloom API.
+
+Each scenario runs `--requests` iterations spread over `--concurrency`
+workers. Every worker authenticates as its own synthetic user (see
+fake_auth), so per-user limits such as the single pending story generation
+don't serialize the run. Latency is reported per operation as p50/p95/p99
+together with overall throughput.
+
+Usage:
+    python -m benchmarks.load --scenario translate_hot --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .fake_auth import issue_token
+
+HOT_TERMS = ["dog", "cat", "apple", "red", "blue", "ball", "sun", "tree", "fish", "bird"]
+# Not in the bundled lexicon (app/data/lexicon.json), so they exercise the
+# translation cache rather than the lexicon
+CACHED_TERMS = [
+    "lighthouse", "submarine", "sandcastle", "snowflake", "spaceship",
+    "dragonfly", "seahorse", "waterfall", "volcano", "compass",
+]
+LANGUAGES = ["Spanish", "French", "Chinese", "Japanese"]
+# Languages the bundled lexicon covers
+LEXICON_LANGUAGES = ["Spanish", "French", "Chinese"]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status_codes: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, seconds: float, status_code: Optional[int]):
+        self.latencies[name].append(seconds)
+        self.status_codes[name][status_code or 0] += 1
+        if status_code is None or status_code >= 400:
+            self.errors[name] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(len(values) for values in self.latencies.values())
+
+
+class Context:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, tokens: List[str], run_id: str):
+        self.client = client
+        self.recorder = recorder
+        self.tokens = tokens
+        self.run_id = run_id
+
+    def auth(self, worker: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[worker % len(self.tokens)]}"}
+
+    async def request(self, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(name, time.perf_counter() - started, None)
+            print(f"{name}: {type(e).__name__}: {e}")
+            return None
+        self.recorder.record(name, time.perf_counter() - started, response.status_code)
+        return response
+
+
+async def translate_hot(ctx: Context, worker: int, iteration: int):
+    """Repeated lookups of a small set of words (cache hits after warm-up)"""
+    term = CACHED_TERMS[iteration % len(CACHED_TERMS)]
+    language = LANGUAGES[iteration % len(LANGUAGES)]
+    await ctx.request("translate_hot", "POST", "/api/translate", json={"term": term, "language": language})
+
+
+async def translate_lexicon(ctx: Context, worker: int, iteration: int):
+    """Common words answered from the bundled lexicon, without Redis or Gemini"""
+    term = HOT_TERMS[iteration % len(HOT_TERMS)]
+    language = LEXICON_LANGUAGES[iteration % len(LEXICON_LANGUAGES)]
+    await ctx.request("translate_lexicon", "POST", "/api/translate", json={"term": term, "language": language})
+
+
+async def translate_cold(ctx: Context, worker: int, iteration: int):
+    """Unique terms that always miss the cache and reach Gemini"""
+    term = f"word-{ctx.run_id}-{iteration}"
+    await ctx.request("translate_cold", "POST", "/api/translate", json={"term": term, "language": "Spanish"})
+
+
+async def story_generate(ctx: Context, worker: int, iteration: int):
+    """Story generation, one in flight per synthetic user"""
+    words = [HOT_TERMS[(iteration + i) % len(HOT_TERMS)] for i in range(3)]
+    await ctx.request(
+        "story_generate", "POST", "/api/stories/generate",
+        headers=ctx.auth(worker),
+        json={"words": words, "target_language": "Spanish", "age_range": "preschool", "max_words": 100},
+    )
+
+
+async def discover_browse(ctx: Context, worker: int, iteration: int):
+    """Anonymous browsing of the discover feed, search and trending"""
+    step = iteration % 4
+    if step == 0:
+        await ctx.request("discover_feed", "GET", "/api/discover/", params={"skip": 0, "limit": 20})
+    elif step == 1:
+        await ctx.request("discover_feed_page", "GET", "/api/discover/", params={"skip": 20 * (iteration % 5), "limit": 20})
+    elif step == 2:
+        term = HOT_TERMS[iteration % len(HOT_TERMS)]
+        await ctx.request("discover_search", "GET", "/api/discover/", params={"search": term, "limit": 20})
+    else:
+        await ctx.request("discover_trending", "GET", "/api/discover/trending", params={"limit": 10})
+
+
+async def flashcard_crud(ctx: Context, worker: int, iteration: int):
+    """Create, read, update, list and delete a flashcard"""
+    headers = ctx.auth(worker)
+    word = f"card-{ctx.run_id}-{iteration}"
+    response = await ctx.request(
+        "flashcard_create", "POST", "/api/flashcards/", headers=headers,
+        json={"original_word": word, "translated_word": f"{word}-es", "target_language": "Spanish",
+              "example_sentences": ["Example one.", "Example two."]},
+    )
+    if response is None or response.status_code != 200:
+        return
+    flashcard_id = response.json()["id"]
+    await ctx.request("flashcard_get", "GET", f"/api/flashcards/{flashcard_id}", headers=headers)
+    await ctx.request(
+        "flashcard_update", "PUT", f"/api/flashcards/{flashcard_id}", headers=headers,
+        json={"translated_word": f"{word}-updated"},
+    )
+    await ctx.request("flashcard_list", "GET", "/api/flashcards/", headers=headers, params={"limit": 20})
+    await ctx.request("flashcard_delete", "DELETE", f"/api/flashcards/{flashcard_id}", headers=headers)
+
+
+SCENARIOS: Dict[str, Callable[[Context, int, int], Awaitable[None]]] = {
+    "translate_hot": translate_hot,
+    "translate_lexicon": translate_lexicon,
+    "translate_cold": translate_cold,
+    "story_generate": story_generate,
+    "discover_browse": discover_browse,
+    "flashcard_crud": flashcard_crud,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict:
+    operations = {}
+    for name, values in sorted(recorder.latencies.items()):
+        ordered = sorted(values)
+        operations[name] = {
+            "count": len(ordered),
+            "errors": recorder.errors[name],
+            "status_codes": dict(recorder.status_codes[name]),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": recorder.total,
+        "throughput_rps": round(recorder.total / elapsed, 1) if elapsed else 0.0,
+        "operations": operations,
+    }
+
+
+def print_report(scenario: str, summary: Dict):
+    print(f"\nScenario: {scenario}")
+    print(f"Requests: {summary['requests']} in {summary['elapsed_s']}s "
+          f"({summary['throughput_rps']} req/s)")
+    header = f"{'operation':<22}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, op in summary["operations"].items():
+        print(f"{name:<22}{op['count']:>7}{op['errors']:>8}{op['p50_ms']:>10}"
+              f"{op['p95_ms']:>10}{op['p99_ms']:>10}{op['max_ms']:>10}")
+
+
+async def run_scenario(
+    scenario: str,
+    base_url: str,
+    requests: int,
+    concurrency: int,
+    project_id: Optional[str] = None,
+    timeout: float = 60.0
+) -> Dict:
+    run_id = uuid.uuid4().hex[:8]
+    tokens = [issue_token(f"loadtest-{run_id}-{i}", project_id=project_id) for i in range(concurrency)]
+    recorder = Recorder()
+    scenario_fn = SCENARIOS[scenario]
+    counter = iter(range(requests))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        ctx = Context(client, recorder, tokens, run_id)
+
+        async def worker(worker_id: int):
+            for iteration in counter:
+                await scenario_fn(ctx, worker_id, iteration)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(recorder, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a load scenario against the Vocabloom API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--requests", type=int, default=200, help="Iterations per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--project-id", default=None, help="Firebase project id for fake tokens")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the summary to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for scenario in args.scenario or sorted(SCENARIOS):
+        summary = asyncio.run(run_scenario(
+            scenario, args.base_url, args.requests, args.concurrency, args.project_id
+        ))
+        print_report(scenario, summary)
+        results[scenario] = summary
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,5 +7,8 @@ if [ -n "$PID" ]; then
   kill -9 $PID
 fi
 
+# Bring the database schema up to date
+poetry run alembic upgrade head || echo "Warning: could not run database migrations"
+
 # Start the FastAPI server
 poetry run uvicorn app.main:app --reload --port $PORT 
\ No newline at end of file
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateTable
+
+from app.models import Image, ImageJob, Story, User
+
+# Postgres-backed tests need a throwaway database, e.g.
+# TEST_DATABASE_URL=postgresql://postgres@localhost/vocabloom_test
+# Tables they use are dropped and recreated.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def pg_engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def job_db(pg_engine):
+    """
+    Session on a fresh image_jobs table. The queue never reads images, so a
+    bare images table stands in for the foreign key.
+    """
+    with pg_engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS image_jobs")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS images CASCADE")
+        connection.exec_driver_sql("CREATE TABLE images (id serial PRIMARY KEY)")
+        connection.exec_driver_sql("INSERT INTO images SELECT FROM generate_series(1, 10)")
+    ImageJob.__table__.create(pg_engine)
+
+    Session = sessionmaker(bind=pg_engine)
+    sessions = []
+
+    def new_session():
+        session = Session()
+        sessions.append(session)
+        return session
+
+    yield new_session
+    for session in sessions:
+        session.close()
+    with pg_engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS image_jobs")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS images")
+
+
+@pytest.fixture
+def image_db(pg_engine):
+    """
+    Session on fresh users and images tables, built without their indexes
+    (the trigram ones need pg_trgm).
+    """
+    with pg_engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS image_jobs")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS images CASCADE")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS users CASCADE")
+        connection.execute(CreateTable(User.__table__))
+        connection.execute(CreateTable(Image.__table__))
+        connection.exec_driver_sql("INSERT INTO users (id, email) VALUES ('u1', 'u1@example.com'), ('u2', 'u2@example.com')")
+
+    session = sessionmaker(bind=pg_engine)()
+    yield session
+    session.close()
+    with pg_engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS images")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS users")
+
+
+@pytest.fixture
+def story_db(pg_engine):
+    """
+    Session on fresh users and stories tables, built without their indexes
+    (the trigram ones need pg_trgm). The generated search columns are kept.
+    """
+    with pg_engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS stories")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS images CASCADE")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS users CASCADE")
+        connection.execute(CreateTable(User.__table__))
+        connection.execute(CreateTable(Story.__table__))
+        connection.exec_driver_sql("INSERT INTO users (id, email) VALUES ('u1', 'u1@example.com')")
+
+    session = sessionmaker(bind=pg_engine)()
+    yield session
+    session.close()
+    with pg_engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS stories")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS users")
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.gemini import (
+    RELATED_WORDS_DECODER, TRANSLATION_DECODER, TranslationResult,
+    decode_structured, extract_text, structured_generation_config
+)
+
+
+def test_decode_structured_translation():
+    text = json.dumps({"translation": "gato", "explanation": "A cat", "examples": ["El gato duerme."]})
+
+    result = decode_structured(text, TRANSLATION_DECODER)
+
+    assert result == TranslationResult(translation="gato", explanation="A cat", examples=["El gato duerme."])
+
+
+def test_decode_structured_related_words():
+    text = '[{"english": "dog", "translation": "perro"}, {"english": "cat", "translation": "gato"}]'
+
+    words = decode_structured(text, RELATED_WORDS_DECODER)
+
+    assert [(word.english, word.translation) for word in words] == [("dog", "perro"), ("cat", "gato")]
+
+
+@pytest.mark.parametrize("text", [
+    "not json",
+    '{"translation": "gato", "explanation": "A cat"}',  # Missing field
+    '{"translation": "gato", "explanation": "A cat", "examples": "El gato"}',  # Wrong type
+    '{"translation": 1, "explanation": "A cat", "examples": []}',  # No coercion in strict mode
+    '```json\n{"translation": "gato", "explanation": "A cat", "examples": []}\n```',
+])
+def test_decode_structured_rejects_invalid_responses(text):
+    with pytest.raises(ValidationError):
+        decode_structured(text, TRANSLATION_DECODER)
+
+
+def test_structured_generation_config_keeps_existing_settings():
+    base = {"temperature": 0.2}
+
+    config = structured_generation_config({"type": "STRING"}, base)
+
+    assert config == {
+        "temperature": 0.2,
+        "responseMimeType": "application/json",
+        "responseSchema": {"type": "STRING"},
+    }
+    assert base == {"temperature": 0.2}
+
+
+def test_extract_text():
+    assert extract_text({"candidates": [{"content": {"parts": [{"text": "hola"}]}}]}) == "hola"
+    assert extract_text({"candidates": []}) is None
+    assert extract_text({"candidates": [{"content": {}}]}) is None
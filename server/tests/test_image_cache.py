@@ -0,0 +1,58 @@
+from app import image_cache
+from app.image_cache import find_duplicate_image, hamming_distance
+from app.models import Image
+
+
+def add_image(db, user_id, word, cache_key, phash, status="completed"):
+    image = Image(
+        user_id=user_id,
+        original_word=word,
+        translated_word=word,
+        target_language="Spanish",
+        generation_prompt=f"a {word}",
+        image_url=f"https://storage.example/{word}-{phash}.png",
+        status=status,
+        cache_key=cache_key,
+        phash=phash,
+    )
+    db.add(image)
+    db.commit()
+    return image
+
+
+def test_hamming_distance_counts_differing_bits():
+    assert hamming_distance(0, 0) == 0
+    assert hamming_distance(0b1011, 0b0001) == 2
+    assert hamming_distance(-1, 0) == 64
+
+
+def test_near_duplicate_with_same_cache_key_is_shared(image_db, monkeypatch):
+    monkeypatch.setattr(image_cache, "IMAGE_DEDUP_MAX_DISTANCE", 2)
+    stored = add_image(image_db, "u1", "cat", "key-cat", 0b1111)
+
+    assert find_duplicate_image(image_db, 0b1100, "key-cat").id == stored.id
+    assert find_duplicate_image(image_db, 0b0000, "key-cat") is None
+
+
+def test_other_inputs_only_match_an_identical_hash(image_db, monkeypatch):
+    monkeypatch.setattr(image_cache, "IMAGE_DEDUP_MAX_DISTANCE", 2)
+    stored = add_image(image_db, "u1", "cat", "key-cat", 0b1111)
+
+    assert find_duplicate_image(image_db, 0b1110, "key-dog") is None
+    assert find_duplicate_image(image_db, 0b1111, "key-dog").id == stored.id
+    assert find_duplicate_image(image_db, 0b1111, None).id == stored.id
+
+
+def test_skips_unfinished_images_and_the_image_itself(image_db):
+    pending = add_image(image_db, "u1", "cat", "key-cat", 42, status="pending")
+    current = add_image(image_db, "u2", "cat", "key-cat", 42)
+
+    assert find_duplicate_image(image_db, 42, "key-cat", exclude_id=current.id) is None
+    assert find_duplicate_image(image_db, 42, "key-cat", exclude_id=pending.id).id == current.id
+
+
+def test_disabled_dedup_finds_nothing(image_db, monkeypatch):
+    monkeypatch.setattr(image_cache, "IMAGE_DEDUP_ENABLED", False)
+    add_image(image_db, "u1", "cat", "key-cat", 42)
+
+    assert find_duplicate_image(image_db, 42, "key-cat") is None
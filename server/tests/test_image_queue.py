@@ -0,0 +1,126 @@
+from sqlalchemy import text
+
+from app import image_queue
+from app.image_queue import (
+    JOB_COMPLETED, JOB_DEAD, JOB_QUEUED, JOB_RUNNING,
+    claim_image_job, complete_image_job, dead_letter_image_job, enqueue_image_job,
+    has_active_image_jobs, heartbeat_image_job, retry_image_job
+)
+
+
+def job_row(db, job_id):
+    db.expire_all()
+    return db.execute(
+        text("SELECT status, attempts, locked_by, last_error, run_after - now() AS delay "
+             "FROM image_jobs WHERE id = :id"),
+        {"id": job_id}
+    ).one()
+
+
+def test_claim_returns_job_and_marks_it_running(job_db):
+    db = job_db()
+    job = enqueue_image_job(db, [1, 2], "u1", "a cat", trace_id="trace-1")
+
+    claimed = claim_image_job(db, "worker-a")
+
+    assert claimed.id == job.id
+    assert claimed.all_image_ids == [1, 2]
+    assert claimed.trace_id == "trace-1"
+    assert claimed.attempts == 1
+    row = job_row(db, job.id)
+    assert row.status == JOB_RUNNING
+    assert row.locked_by == "worker-a"
+    assert claim_image_job(db, "worker-b") is None
+
+
+def test_concurrent_claims_skip_locked_jobs(job_db):
+    db = job_db()
+    first = enqueue_image_job(db, [1], "u1", "a cat")
+    second = enqueue_image_job(db, [2], "u1", "a dog")
+
+    # Hold the first job's row lock in an open transaction
+    locker = job_db()
+    locker.execute(text("SELECT id FROM image_jobs WHERE id = :id FOR UPDATE"), {"id": first.id})
+
+    claimed = claim_image_job(job_db(), "worker-b")
+    locker.rollback()
+
+    assert claimed.id == second.id
+
+
+def test_expired_lease_is_reclaimed(job_db):
+    db = job_db()
+    job = enqueue_image_job(db, [1], "u1", "a cat")
+    claim_image_job(db, "worker-a")
+    db.execute(text("UPDATE image_jobs SET lease_expires_at = now() - interval '1 second'"))
+    db.commit()
+
+    reclaimed = claim_image_job(db, "worker-b")
+
+    assert reclaimed.id == job.id
+    assert reclaimed.attempts == 2
+    # The original worker has lost the job
+    assert not heartbeat_image_job(db, job.id, "worker-a")
+    assert heartbeat_image_job(db, job.id, "worker-b")
+
+
+def test_retry_requeues_with_exponential_backoff(job_db, monkeypatch):
+    monkeypatch.setattr(image_queue, "IMAGE_JOB_RETRY_DELAY", 10)
+    db = job_db()
+    job = enqueue_image_job(db, [1], "u1", "a cat")
+
+    claimed = claim_image_job(db, "worker-a")
+    retry_image_job(db, claimed, "worker-a", "Imagen unavailable")
+    row = job_row(db, job.id)
+    assert row.status == JOB_QUEUED
+    assert row.locked_by is None
+    assert row.last_error == "Imagen unavailable"
+    assert 9 <= row.delay.total_seconds() <= 10
+    # Not due yet
+    assert claim_image_job(db, "worker-a") is None
+
+    db.execute(text("UPDATE image_jobs SET run_after = now()"))
+    db.commit()
+    claimed = claim_image_job(db, "worker-a")
+    retry_image_job(db, claimed, "worker-a", "Imagen unavailable")
+    assert 19 <= job_row(db, job.id).delay.total_seconds() <= 20
+
+
+def test_retry_by_another_worker_is_ignored(job_db):
+    db = job_db()
+    job = enqueue_image_job(db, [1], "u1", "a cat")
+    claimed = claim_image_job(db, "worker-a")
+
+    retry_image_job(db, claimed, "worker-b", "stale")
+
+    row = job_row(db, job.id)
+    assert row.status == JOB_RUNNING
+    assert row.locked_by == "worker-a"
+
+
+def test_finished_jobs_are_not_claimed(job_db):
+    db = job_db()
+    done = enqueue_image_job(db, [1], "u1", "a cat")
+    dead = enqueue_image_job(db, [2], "u1", "a dog")
+    complete_image_job(db, claim_image_job(db, "worker-a").id, "worker-a")
+    dead_letter_image_job(db, claim_image_job(db, "worker-a").id, "worker-a", "blocked")
+
+    assert job_row(db, done.id).status == JOB_COMPLETED
+    assert job_row(db, dead.id).status == JOB_DEAD
+    assert claim_image_job(db, "worker-a") is None
+
+
+def test_has_active_image_jobs_until_the_last_job_finishes(job_db):
+    db = job_db()
+    enqueue_image_job(db, [1], "u1", "a cat")
+    enqueue_image_job(db, [2], "u1", "a dog")
+    enqueue_image_job(db, [3], "u2", "a bird")
+
+    first = claim_image_job(db, "worker-a")
+    complete_image_job(db, first.id, "worker-a")
+    assert has_active_image_jobs(db, "u1")
+
+    second = claim_image_job(db, "worker-a")
+    complete_image_job(db, second.id, "worker-a")
+    assert not has_active_image_jobs(db, "u1")
+    assert has_active_image_jobs(db, "u2")
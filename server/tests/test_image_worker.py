@@ -0,0 +1,74 @@
+import io
+
+import fakeredis
+import pytest
+from PIL import Image as PILImage
+
+from app import image_worker, redis_quota
+from app.image_worker import ImageWorker
+from app.models import Image
+from app.redis_quota import get_quota_key
+
+
+class FakeGeneratedImage:
+    def __init__(self, color):
+        buffer = io.BytesIO()
+        PILImage.new("RGB", (64, 64), color).save(buffer, format="PNG")
+        self._image_bytes = buffer.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, images):
+        self.images = images
+
+
+class FakeModel:
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def generate_images(self, prompt, number_of_images):
+        return FakeResponse(self.outputs)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_quota, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(image_worker.storage_manager, "upload_image_from_bytes", lambda data, filename, content_type: f"https://storage.example/{filename}")
+    monkeypatch.setattr(image_worker, "upload_derivatives", lambda image_bytes, filename: None)
+    return ImageWorker(workers=1)
+
+
+def add_pending_images(db, count):
+    images = [
+        Image(
+            user_id="u1",
+            original_word="cat",
+            translated_word="gato",
+            target_language="Spanish",
+            generation_prompt="a cat",
+            status="pending",
+            cache_key="cat",
+        )
+        for _ in range(count)
+    ]
+    db.add_all(images)
+    db.commit()
+    return [image.id for image in images]
+
+
+def test_rows_without_output_are_failed_and_refunded(image_db, fake_redis, worker, monkeypatch):
+    fake_redis.set(get_quota_key("u1", "image"), 3)
+    monkeypatch.setattr(worker.models, "get", lambda: FakeModel([FakeGeneratedImage("red")]))
+    image_ids = add_pending_images(image_db, 3)
+
+    worker.generate(image_db, image_ids, "a cat")
+
+    statuses = [image_db.get(Image, image_id).status for image_id in image_ids]
+    assert statuses == ["completed", "failed", "failed"]
+    assert int(fake_redis.get(get_quota_key("u1", "image"))) == 1
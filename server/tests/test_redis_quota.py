@@ -0,0 +1,72 @@
+import fakeredis
+import pytest
+
+from app import redis_quota
+from app.redis_quota import get_quota_key, get_remaining_quota, release_quota, reserve_quota
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_quota, "redis_client", client)
+    monkeypatch.setitem(redis_quota.QUOTA_LIMITS, "image", 10)
+    return client
+
+
+def used(client, user_id="u1"):
+    return int(client.get(get_quota_key(user_id, "image")) or 0)
+
+
+def test_reserve_quota_takes_the_whole_amount(fake_redis):
+    assert reserve_quota("u1", "image", 4)
+    assert reserve_quota("u1", "image", 6)
+
+    assert used(fake_redis) == 10
+    assert fake_redis.ttl(get_quota_key("u1", "image")) > 0
+
+
+def test_reserve_quota_is_all_or_nothing(fake_redis):
+    assert reserve_quota("u1", "image", 7)
+
+    assert not reserve_quota("u1", "image", 4)
+    assert used(fake_redis) == 7
+    assert get_remaining_quota("u1", "image")["remaining"] == 3
+
+
+def test_reserve_quota_is_per_user(fake_redis):
+    assert reserve_quota("u1", "image", 10)
+    assert reserve_quota("u2", "image", 10)
+
+
+def test_reserve_quota_ignores_unlimited_and_empty_requests(fake_redis):
+    assert reserve_quota("u1", "story", 1000)
+    assert reserve_quota("u1", "image", 0)
+    assert fake_redis.keys("*") == []
+
+
+def test_release_quota_gives_back_reserved_units(fake_redis):
+    reserve_quota("u1", "image", 5)
+
+    assert release_quota("u1", "image", 3)
+
+    assert used(fake_redis) == 2
+
+
+def test_release_quota_never_goes_below_zero(fake_redis):
+    reserve_quota("u1", "image", 2)
+
+    assert release_quota("u1", "image", 5)
+    assert used(fake_redis) == 0
+
+    assert release_quota("u2", "image", 1)
+    assert used(fake_redis, "u2") == 0
+
+
+def test_quota_fails_open_when_redis_is_down(monkeypatch):
+    monkeypatch.setitem(redis_quota.QUOTA_LIMITS, "image", 10)
+    server = fakeredis.FakeServer()
+    server.connected = False
+    monkeypatch.setattr(redis_quota, "redis_client", fakeredis.FakeRedis(server=server))
+
+    assert reserve_quota("u1", "image", 100)
+    assert not release_quota("u1", "image", 1)
@@ -0,0 +1,35 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+
+from app import related_words_cache
+from app.routes import stories
+from app.routes.stories import RelatedWordsRequest
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(related_words_cache, "redis_client", client)
+    monkeypatch.setattr(related_words_cache, "RELATED_WORDS_CACHE_ENABLED", True)
+    return client
+
+
+def test_structured_related_words_are_cut_to_max_words(fake_redis, monkeypatch):
+    words = [{"english": f"word{i}", "translation": f"palabra{i}"} for i in range(5)]
+
+    async def fake_generate_content(model, prompt, api_key, generation_config=None, timeout=None):
+        return {"candidates": [{"content": {"parts": [{"text": json.dumps(words)}]}}]}
+
+    monkeypatch.setattr(stories, "STRUCTURED_OUTPUT_ENABLED", True)
+    monkeypatch.setattr(stories, "get_gemini_api_key", lambda: "key")
+    monkeypatch.setattr(stories, "generate_content", fake_generate_content)
+    request = RelatedWordsRequest(word="cat", target_language="Spanish", max_words=3)
+
+    response = asyncio.run(stories.get_related_words(request, db=None))
+
+    assert [word["english"] for word in response["related_words"]] == ["word0", "word1", "word2"]
+    cached = json.loads(fake_redis.get(related_words_cache.get_related_words_key("cat", "Spanish", None)))
+    assert len(cached) == 3
@@ -0,0 +1,46 @@
+from app.models import Story
+from app.search import search_stories
+
+
+def add_story(db, title, content, language):
+    story = Story(
+        user_id="u1",
+        original_words=[],
+        story_title=title,
+        story_content=content,
+        story_theme="animals",
+        target_language=language,
+    )
+    db.add(story)
+    db.commit()
+    return story
+
+
+def test_chinese_word_inside_a_sentence_is_found(story_db):
+    story = add_story(story_db, "小猫的一天", "小猫在床上睡觉。它醒来以后喝牛奶。", "Chinese")
+    add_story(story_db, "大狗", "大狗在公园里跑步。", "Chinese")
+
+    results = search_stories(story_db, "牛奶")
+    assert [result.story.id for result in results] == [story.id]
+
+    results = search_stories(story_db, "小猫", language="Chinese")
+    assert [result.story.id for result in results] == [story.id]
+
+
+def test_title_match_ranks_above_content_match(story_db):
+    in_content = add_story(story_db, "大狗", "大狗看见一只小猫。", "Chinese")
+    in_title = add_story(story_db, "小猫的一天", "它在床上睡觉。", "Chinese")
+
+    results = search_stories(story_db, "小猫")
+    assert [result.story.id for result in results] == [in_title.id, in_content.id]
+
+
+def test_stemmed_languages_use_full_text_search(story_db):
+    story = add_story(story_db, "Los gatos", "Los gatos duermen en la cama.", "Spanish")
+    add_story(story_db, "El perro", "El perro corre en el parque.", "Spanish")
+
+    results = search_stories(story_db, "gato", language="Spanish")
+    assert [result.story.id for result in results] == [story.id]
+    # No substring fallback for stemmed languages
+    assert search_stories(story_db, "ato", language="Spanish") == []
+    assert search_stories(story_db, "ato") == []
@@ -0,0 +1,58 @@
+import json
+
+import fakeredis
+import pytest
+
+from app import redis_quota, story_jobs
+from app.redis_quota import get_quota_key
+from app.story_jobs import (
+    JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, UNFINISHED_STORY_JOBS_KEY,
+    get_story_job_instance_key, get_story_job_key, recover_orphaned_jobs
+)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_quota, "redis_client", client)
+    monkeypatch.setattr(story_jobs, "redis_client", client)
+    monkeypatch.setitem(redis_quota.QUOTA_LIMITS, "story", 5)
+    return client
+
+
+def add_job(client, job_id, status, instance):
+    job = {"id": job_id, "user_id": "u1", "instance": instance, "status": status, "error": None}
+    client.set(get_story_job_key(job_id), json.dumps(job))
+    client.sadd(UNFINISHED_STORY_JOBS_KEY, job_id)
+
+
+def load_job(client, job_id):
+    return json.loads(client.get(get_story_job_key(job_id)))
+
+
+def test_jobs_of_stopped_instances_are_failed_and_refunded(fake_redis):
+    fake_redis.set(get_quota_key("u1", "story"), 3)
+    fake_redis.set(get_story_job_instance_key("alive"), "1")
+    add_job(fake_redis, "queued", JOB_QUEUED, "gone")
+    add_job(fake_redis, "running", JOB_RUNNING, "gone")
+    add_job(fake_redis, "live", JOB_RUNNING, "alive")
+
+    assert recover_orphaned_jobs() == 2
+
+    assert load_job(fake_redis, "queued")["status"] == JOB_FAILED
+    assert load_job(fake_redis, "running")["status"] == JOB_FAILED
+    assert load_job(fake_redis, "live")["status"] == JOB_RUNNING
+    assert int(fake_redis.get(get_quota_key("u1", "story"))) == 1
+    assert fake_redis.smembers(UNFINISHED_STORY_JOBS_KEY) == {"live"}
+
+
+def test_finished_and_expired_jobs_are_untracked_without_refund(fake_redis):
+    fake_redis.set(get_quota_key("u1", "story"), 3)
+    add_job(fake_redis, "done", JOB_COMPLETED, "gone")
+    fake_redis.sadd(UNFINISHED_STORY_JOBS_KEY, "expired")
+
+    assert recover_orphaned_jobs() == 0
+
+    assert load_job(fake_redis, "done")["status"] == JOB_COMPLETED
+    assert int(fake_redis.get(get_quota_key("u1", "story"))) == 3
+    assert fake_redis.smembers(UNFINISHED_STORY_JOBS_KEY) == set()
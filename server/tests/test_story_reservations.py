@@ -0,0 +1,122 @@
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from app import redis_quota
+from app.redis_quota import get_pending_generations_key, get_quota_key
+from app.routes import stories
+from app.schemas import StoryBatchGenerationRequest, StoryGenerationRequest
+
+
+class FakeUser:
+    id = "u1"
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_quota, "redis_client", client)
+    monkeypatch.setitem(redis_quota.QUOTA_LIMITS, "story", 5)
+    monkeypatch.setattr(stories, "validate_story_request", lambda request: "key")
+    monkeypatch.setattr(stories, "add_pooled_story", lambda request, content: None)
+    monkeypatch.setattr(stories, "get_pooled_story", lambda request: None)
+    return client
+
+
+@pytest.fixture
+def story_request():
+    return StoryGenerationRequest(words=["cat"], theme="animals")
+
+
+def used(client):
+    return int(client.get(get_quota_key("u1", "story")) or 0)
+
+
+def pending(client):
+    return client.exists(get_pending_generations_key("u1", "story")) == 1
+
+
+async def fake_stream(request, api_key):
+    yield "Once upon"
+    yield " a time"
+
+
+async def fake_generate(request, api_key):
+    await asyncio.sleep(0)
+    return "A story"
+
+
+def test_stream_reserves_nothing_until_iterated(fake_redis, story_request, monkeypatch):
+    monkeypatch.setattr(stories, "stream_story_text", fake_stream)
+
+    async def disconnect_before_reading():
+        response = await stories.generate_story_stream(story_request, FakeUser())
+        assert not pending(fake_redis) and used(fake_redis) == 0
+        await response.body_iterator.aclose()
+
+    asyncio.run(disconnect_before_reading())
+    assert not pending(fake_redis)
+    assert used(fake_redis) == 0
+
+
+def test_completed_stream_keeps_its_quota_unit(fake_redis, story_request, monkeypatch):
+    monkeypatch.setattr(stories, "stream_story_text", fake_stream)
+
+    async def read_all():
+        response = await stories.generate_story_stream(story_request, FakeUser())
+        return [event async for event in response.body_iterator]
+
+    events = asyncio.run(read_all())
+    assert events[-1].startswith("event: done")
+    assert not pending(fake_redis)
+    assert used(fake_redis) == 1
+
+
+def test_stream_is_rejected_while_a_generation_is_pending(fake_redis, story_request):
+    redis_quota.start_generation("u1", "story")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(stories.generate_story_stream(story_request, FakeUser()))
+    assert error.value.status_code == 429
+
+
+def test_batch_reserves_nothing_until_iterated(fake_redis, story_request, monkeypatch):
+    monkeypatch.setattr(stories, "generate_story_text", fake_generate)
+    batch = StoryBatchGenerationRequest(requests=[story_request, story_request])
+
+    async def disconnect_before_reading():
+        response = await stories.generate_story_batch(batch, FakeUser())
+        assert not pending(fake_redis) and used(fake_redis) == 0
+        await response.body_iterator.aclose()
+
+    asyncio.run(disconnect_before_reading())
+    assert not pending(fake_redis)
+    assert used(fake_redis) == 0
+
+
+def test_batch_refunds_stories_it_did_not_deliver(fake_redis, story_request, monkeypatch):
+    monkeypatch.setattr(stories, "generate_story_text", fake_generate)
+    batch = StoryBatchGenerationRequest(requests=[story_request, story_request, story_request])
+
+    async def read_one_result():
+        response = await stories.generate_story_batch(batch, FakeUser())
+        first = await response.body_iterator.__anext__()
+        assert pending(fake_redis)
+        await response.body_iterator.aclose()
+        return first
+
+    assert asyncio.run(read_one_result()).startswith("event: result")
+    assert not pending(fake_redis)
+    assert used(fake_redis) == 1
+
+
+def test_batch_larger_than_the_remaining_quota_is_rejected(fake_redis, story_request):
+    redis_quota.reserve_quota("u1", "story", 4)
+    batch = StoryBatchGenerationRequest(requests=[story_request, story_request])
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(stories.generate_story_batch(batch, FakeUser()))
+    assert error.value.status_code == 429
+    assert used(fake_redis) == 4
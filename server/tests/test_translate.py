@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import Response
+
+from app.routes import translate
+from app.routes.translate import TranslateResponse, etag_matches, translation_etag
+
+
+def make_response(**overrides):
+    fields = {
+        "translation": "gato",
+        "explanation": "A cat",
+        "examples": ["El gato duerme."],
+        "cached": True,
+    }
+    fields.update(overrides)
+    return TranslateResponse(**fields)
+
+
+def get_translation(term, if_none_match=None, db=None):
+    response = Response()
+    result = asyncio.run(translate.translate_anonymous(
+        response, term=term, language="Spanish", if_none_match=if_none_match, db=db
+    ))
+    return result, response
+
+
+def test_translation_etag_is_stable_for_the_same_body():
+    assert translation_etag(make_response()) == translation_etag(make_response())
+
+
+def test_translation_etag_differs_between_cached_and_generated_bodies():
+    assert translation_etag(make_response(cached=True)) != translation_etag(make_response(cached=False))
+    assert translation_etag(make_response()) != translation_etag(make_response(examples=[]))
+
+
+def test_translation_etag_is_a_strong_validator():
+    etag = translation_etag(make_response())
+    assert etag.startswith('"') and etag.endswith('"')
+    assert not etag.startswith("W/")
+
+
+def test_etag_matches():
+    etag = translation_etag(make_response())
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_lexicon_translation_revalidates(monkeypatch):
+    monkeypatch.setattr(translate.lexicon, "lookup", lambda term, language: SimpleNamespace(
+        translation="gato", explanation="A cat", examples=("El gato duerme.",)
+    ))
+    body, response = get_translation("cat")
+    etag = response.headers["ETag"]
+
+    revalidated, _ = get_translation("cat", if_none_match=etag)
+
+    assert isinstance(body, TranslateResponse)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+
+def test_not_modified_only_while_the_cache_row_exists(monkeypatch):
+    monkeypatch.setattr(translate.lexicon, "lookup", lambda term, language: None)
+    monkeypatch.setattr(translate, "get_gemini_api_key", lambda: None)
+    row = SimpleNamespace(response_json={"translation": "mesa", "explanation": "A table", "examples": []})
+    cache = {"row": row}
+    monkeypatch.setattr(translate, "get_cached_translation", lambda db, prompt_hash: cache["row"])
+
+    _, response = get_translation("table")
+    etag = response.headers["ETag"]
+    revalidated, _ = get_translation("table", if_none_match=etag)
+    assert revalidated.status_code == 304
+
+    # Once the row is gone the old validator must not be confirmed
+    cache["row"] = None
+    body, response = get_translation("table", if_none_match=etag)
+    assert isinstance(body, TranslateResponse)
+    assert "ETag" not in response.headers